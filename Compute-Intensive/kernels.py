@@ -0,0 +1,316 @@
+"""Compute kernels for the Compute-Intensive benchmark.
+
+Every kernel is a setup function taking a problem ``size`` and returning
+a ``run()`` callable that does the work once and returns the number of
+work units it processed, so setup (allocating and filling inputs) stays
+outside the timed region. ``KERNELS`` maps each name to its setup
+function, default size and work unit, and whether it releases the GIL
+(and so can be scaled with threads as well as processes).
+"""
+import hashlib
+import json
+import multiprocessing
+import os
+import queue
+import random
+import re
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+
+Kernel = namedtuple("Kernel", ["setup", "size", "unit", "threads"],
+                    defaults=(False,))
+
+# Marks result lines in the console output, which under nanos is mixed
+# with kernel trace and debugsyscalls output.
+RESULT_PREFIX = "kernel-result: "
+
+SEGMENT_SIZE = 1 << 18
+
+
+def trial_division(size):
+    """The original workload: primes below ``size`` by trial division."""
+    def run():
+        for num in range(2, size):
+            for i in range(2, int(num ** 0.5) + 1):
+                if num % i == 0:
+                    break
+        return size
+    return run
+
+
+def sieve(size):
+    """Segmented sieve of Eratosthenes marking the primes below ``size``."""
+    limit = int(size ** 0.5) + 1
+    small = bytearray([1]) * (limit + 1)
+    small[:2] = b"\0\0"
+    for p in range(2, int(limit ** 0.5) + 1):
+        if small[p]:
+            small[p * p::p] = bytes(len(range(p * p, limit + 1, p)))
+    base = [p for p in range(2, limit + 1) if small[p]]
+
+    def run():
+        for low in range(0, size, SEGMENT_SIZE):
+            high = min(low + SEGMENT_SIZE, size)
+            segment = bytearray([1]) * (high - low)
+            for p in base:
+                if p * p >= high:
+                    break
+                # a short last segment may hold no multiple of p but
+                # still hold some of a larger base prime
+                start = max(p * p, -(-low // p) * p)
+                segment[start - low::p] = bytes(
+                    len(range(start - low, high - low, p)))
+        return size
+    return run
+
+
+def matmul(size):
+    """Dense ``size`` x ``size`` float64 matrix product; units are flops."""
+    rng = np.random.default_rng(0)
+    a = rng.random((size, size))
+    b = rng.random((size, size))
+
+    def run():
+        np.dot(a, b)
+        return 2 * size ** 3
+    return run
+
+
+def stream(size):
+    """STREAM copy/scale/add/triad over ``size`` float64s; units are bytes.
+
+    NumPy has no fused multiply-add, so the triad is a multiply and an
+    in-place add: five arrays' worth of traffic, not STREAM's three. The
+    bytes counted are the ones actually moved.
+    """
+    a = np.full(size, 1.0)
+    b = np.full(size, 2.0)
+    c = np.zeros(size)
+    scalar = 3.0
+
+    def run():
+        np.copyto(c, a)                 # copy:  c = a
+        np.multiply(c, scalar, out=b)   # scale: b = s * c
+        np.add(a, b, out=c)             # add:   c = a + b
+        np.multiply(c, scalar, out=a)   # triad: a = b + s * c
+        np.add(a, b, out=a)
+        return (2 + 2 + 3 + 5) * 8 * size
+    return run
+
+
+def sha256(size):
+    """SHA-256 over ``size`` MiB in 1 MiB updates; units are bytes."""
+    chunk = random.Random(0).randbytes(1 << 20)
+
+    def run():
+        digest = hashlib.sha256()
+        for _ in range(size):
+            digest.update(chunk)
+        digest.hexdigest()
+        return size << 20
+    return run
+
+
+def json_roundtrip(size):
+    """Encode and decode a 1000-record document ``size`` times."""
+    document = {"items": [
+        {"id": i, "name": f"item-{i}", "price": i * 0.25,
+         "tags": ["a", "b", "c"], "active": i % 2 == 0}
+        for i in range(1000)]}
+
+    def run():
+        for _ in range(size):
+            json.loads(json.dumps(document))
+        return size
+    return run
+
+
+def regex(size):
+    """Find e-mail addresses in ``size`` bytes of text; units are bytes."""
+    rng = random.Random(0)
+    words = ["alpha", "beta", "gamma", "delta", "user@example.com",
+             "first.last@mail.org", "0123", "nanos"]
+    text = " ".join(rng.choice(words) for _ in range(size // 8))
+    pattern = re.compile(r"[\w.]+@\w+\.\w+")
+
+    def run():
+        pattern.findall(text)
+        return len(text)
+    return run
+
+
+def sort(size):
+    """Sort ``size`` random integers with ``sorted``."""
+    rng = random.Random(0)
+    values = [rng.randrange(1 << 30) for _ in range(size)]
+
+    def run():
+        sorted(values)
+        return size
+    return run
+
+
+KERNELS = {
+    "trial_division": Kernel(trial_division, 5_000_000, "numbers"),
+    "sieve": Kernel(sieve, 100_000_000, "numbers"),
+    "matmul": Kernel(matmul, 1500, "flops", threads=True),
+    "stream": Kernel(stream, 10_000_000, "bytes", threads=True),
+    "sha256": Kernel(sha256, 1024, "bytes", threads=True),
+    "json": Kernel(json_roundtrip, 200, "documents"),
+    "regex": Kernel(regex, 20_000_000, "bytes"),
+    "sort": Kernel(sort, 1_000_000, "items"),
+}
+
+# Everything but the slow legacy workload.
+DEFAULT_SUITE = ["sieve", "matmul", "stream", "sha256", "json", "regex",
+                 "sort"]
+
+
+def parse_selection(args):
+    """``["sieve", "matmul=800"]`` -> ``[("sieve", 100000000), ("matmul", 800)]``.
+
+    An empty selection means ``DEFAULT_SUITE`` at default sizes.
+    """
+    selection = []
+    for arg in args or DEFAULT_SUITE:
+        name, _, size = arg.partition("=")
+        if name not in KERNELS:
+            raise ValueError(f"unknown kernel {name!r}, "
+                             f"choose from {', '.join(KERNELS)}")
+        selection.append((name, int(size) if size else KERNELS[name].size))
+    return selection
+
+
+def run_kernel(name, size=None):
+    """Set up and time one kernel; return its result record."""
+    kernel = KERNELS[name]
+    size = kernel.size if size is None else size
+    run = kernel.setup(size)
+    started = time.time()
+    start = time.perf_counter()
+    ops = run()
+    seconds = time.perf_counter() - start
+    return {"kernel": name, "size": size, "unit": kernel.unit, "ops": ops,
+            "seconds": seconds, "ops_per_sec": ops / seconds,
+            "started": started}
+
+
+def parse_results(lines):
+    """Pick the kernel result records out of console output lines."""
+    results = []
+    for line in lines:
+        start = line.find(RESULT_PREFIX)
+        if start >= 0:
+            results.append(json.loads(line[start + len(RESULT_PREFIX):]))
+    return results
+
+
+def worker_counts(max_workers=None):
+    """1, 2, 4, ... up to ``max_workers`` (default: the CPU count)."""
+    max_workers = max_workers or os.cpu_count()
+    counts = []
+    workers = 1
+    while workers < max_workers:
+        counts.append(workers)
+        workers *= 2
+    return counts + [max_workers]
+
+
+def _scaling_worker(name, size, barrier, results):
+    try:
+        run = KERNELS[name].setup(size)
+        barrier.wait()
+        start = time.perf_counter()
+        ops = run()
+    except Exception as e:  # MemoryError in setup, a broken barrier, ...
+        barrier.abort()
+        results.put(("error", f"{type(e).__name__}: {e}", None))
+        return
+    results.put((ops, start, time.perf_counter()))
+
+
+def run_parallel(name, size, workers, pool="process", timeout=300.0):
+    """Run ``workers`` copies of a kernel at once on processes or threads.
+
+    Every worker sets up its own inputs, then all of them start together
+    behind a barrier, so the wall time spans the first start to the last
+    finish. Returns a result record like :func:`run_kernel` with the
+    combined ops of all workers; ``started`` (epoch seconds, taken before
+    the workers are launched) lines it up with the monitor's samples.
+
+    Raises ``RuntimeError`` if a worker fails and ``TimeoutError`` if the
+    workers have not all finished within ``timeout`` seconds (one killed
+    by the platform never reports back), instead of waiting forever.
+    """
+    started = time.time()
+    if pool == "process":
+        context = multiprocessing.get_context()
+        barrier = context.Barrier(workers, timeout=timeout)
+        results = context.Queue()
+        spawn = context.Process
+    else:
+        barrier = threading.Barrier(workers, timeout=timeout)
+        results = queue.Queue()
+        spawn = threading.Thread
+    jobs = [spawn(target=_scaling_worker, args=(name, size, barrier, results),
+                  daemon=True)
+            for _ in range(workers)]
+    for job in jobs:
+        job.start()
+    deadline = time.monotonic() + timeout
+    runs = []
+    try:
+        while len(runs) < workers:
+            try:
+                runs.append(results.get(
+                    timeout=max(deadline - time.monotonic(), 0.001)))
+            except queue.Empty:
+                raise TimeoutError(
+                    f"{workers - len(runs)} of {workers} {pool} workers did "
+                    f"not finish within {timeout:g} s") from None
+            if runs[-1][0] == "error":
+                raise RuntimeError(f"a {pool} worker failed: {runs[-1][1]}")
+    finally:
+        barrier.abort()  # release workers still waiting for a dead one
+        for job in jobs:
+            job.join(timeout=5)
+            if pool == "process" and job.is_alive():
+                job.terminate()
+                job.join()
+    seconds = max(run[2] for run in runs) - min(run[1] for run in runs)
+    ops = sum(run[0] for run in runs)
+    return {"kernel": name, "size": size, "unit": KERNELS[name].unit,
+            "pool": pool, "workers": workers, "ops": ops,
+            "seconds": seconds, "ops_per_sec": ops / seconds,
+            "started": started}
+
+
+def run_scaling(name, size=None, counts=None):
+    """Scale a kernel over ``counts`` workers; yield one record per step.
+
+    Every kernel runs on a process pool; kernels that release the GIL
+    also run on a thread pool. ``speedup`` is throughput relative to one
+    worker of the same pool and ``efficiency`` is speedup per worker. A
+    pool the platform cannot start (no ``fork`` on a unikernel, say), or
+    whose workers fail or time out, yields a single record with its
+    ``error`` instead.
+    """
+    kernel = KERNELS[name]
+    size = kernel.size if size is None else size
+    pools = ["process", "thread"] if kernel.threads else ["process"]
+    for pool in pools:
+        baseline = None
+        for workers in counts or worker_counts():
+            try:
+                result = run_parallel(name, size, workers, pool)
+            except (OSError, RuntimeError) as e:
+                yield {"kernel": name, "size": size, "pool": pool,
+                       "workers": workers, "error": str(e)}
+                break
+            baseline = baseline or result["ops_per_sec"]
+            result["speedup"] = result["ops_per_sec"] / baseline
+            result["efficiency"] = result["speedup"] / workers
+            yield result
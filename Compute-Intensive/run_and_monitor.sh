@@ -6,15 +6,38 @@ OPS_PID=$!
 
 echo "✅ OPS started with PID: $OPS_PID"
 
-# Get the actual QEMU PID (child of OPS)
-while [ -z "$QEMU_PID" ]; do
-    QEMU_PID=$(pgrep -f -P $OPS_PID qemu-system-x86_64)
+# Find QEMU among the descendants of OPS through their /proc children
+# lists, backing off from 1 ms to 100 ms between looks instead of spinning.
+find_child() {
+    local pid child found
+    for pid in $(cat /proc/$1/task/*/children 2>/dev/null); do
+        if tr '\0' ' ' < /proc/$pid/cmdline 2>/dev/null | grep -q "$2"; then
+            echo $pid
+            return
+        fi
+        found=$(find_child $pid "$2")
+        if [ -n "$found" ]; then
+            echo $found
+            return
+        fi
+    done
+}
+
+DELAY_MS=1
+DEADLINE=$((SECONDS + 60))
+while [ -z "$QEMU_PID" ] && [ $SECONDS -lt $DEADLINE ] && kill -0 $OPS_PID 2>/dev/null; do
+    QEMU_PID=$(find_child $OPS_PID qemu-system-x86_64)
+    if [ -z "$QEMU_PID" ]; then
+        sleep $(printf "0.%03d" $DELAY_MS)
+        DELAY_MS=$((DELAY_MS * 2 > 100 ? 100 : DELAY_MS * 2))
+    fi
 done
 
 if [ -z "$QEMU_PID" ]; then
     echo "QEMU process not found!"
     exit 1
 fi
+echo "✅ QEMU started with PID: $QEMU_PID at $(date +%s.%N)"
 
 
 START_TIMESTAMP=$(date +%s)
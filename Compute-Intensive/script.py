@@ -1,33 +1,36 @@
-# import numpy as np
+import json
+import os
+import sys
 import time
 
+# "--scale" or "--scale=N": scale each kernel up to N (default: all CPUs)
+SCALE = next((arg for arg in sys.argv[1:] if arg.startswith("--scale")), None)
+if SCALE:
+    # one BLAS thread per worker, so the pool size is the only parallelism
+    for var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ.setdefault(var, "1")
 
-# Measure startup time
-start_time = time.time()
-
+from kernels import (RESULT_PREFIX, parse_selection, run_kernel,  # noqa: E402
+                     run_scaling, worker_counts)
 
-def generate_primes(n):
-    for num in range(2, n):
-        is_prime = True
-        for i in range(2, int(num ** 0.5) + 1):
-            if num % i == 0:
-                is_prime = False
-                break
-        if is_prime:
-            yield num  # Use a generator instead of appending to a list
 
-# Function to perform matrix multiplication
-# def matrix_multiplication(size):
-#     A = np.random.randint(0, 100, (size, size))
-#     B = np.random.randint(0, 100, (size, size))
-#     return np.dot(A, B)
+# Measure startup time
+start_time = time.time()
 
 
 if __name__ == "__main__":
+    # kernels to run come from the command line (myconfig.json "Args" or
+    # the Dockerfile CMD), e.g. "sieve matmul=800"; none means the full
+    # suite. "--scale" runs each kernel at 1, 2, 4... workers instead.
+    selection = parse_selection([arg for arg in sys.argv[1:]
+                                 if arg != SCALE])
+    counts = worker_counts(int(SCALE.partition("=")[2] or 0)) if SCALE else None
     print("Starting computation...")
-    # Compute intensive tasks
-    primes = list(generate_primes(5000000))
-    # matrix_result = matrix_multiplication(500)
+    for name, size in selection:
+        results = (run_scaling(name, size, counts) if SCALE
+                   else [run_kernel(name, size)])
+        for result in results:
+            print(RESULT_PREFIX + json.dumps(result), flush=True)
 
     # Measure execution time
     execution_time = time.time() - start_time
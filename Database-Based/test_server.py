@@ -1,12 +1,29 @@
-import subprocess
+import os
 import sys
 import time
 import csv
-from datetime import datetime
-from math import log
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from nanos_eval.events import EventLog  # noqa: E402
+from nanos_eval.histogram import SUMMARY_PERCENTILES, save_histograms  # noqa: E402
+from nanos_eval.matrix import select_loads  # noqa: E402
+from nanos_eval.phases import PHASE_IDLE  # noqa: E402
+from nanos_eval.respload import benchmark_rows, run_resp_load  # noqa: E402
+from nanos_eval.startup import wait_ready  # noqa: E402
+
 FIELDNAMES = ['test', 'rps', 'avg_latency_ms', 'min_latency_ms', 'p50_latency_ms',
-              'p95_latency_ms', 'p99_latency_ms', 'max_latency_ms', 'connection', 'requests']
+              'p95_latency_ms', 'p99_latency_ms', 'max_latency_ms', 'connection', 'requests',
+              'errors']
 # CONFIG
+LOAD_WORKERS = 4  # load generator processes
+PIPELINE = 1  # commands in flight per connection, like redis-benchmark's -P
+VALUE_SIZE = 3  # bytes per SET/LPUSH/HSET value, like redis-benchmark's -d
+KEYSPACE = 100000
+KEY_DISTRIBUTION = "uniform"  # or "zipfian"
+# each mix runs as its own test, one after the other, like -t set,get;
+# a mix with several commands (e.g. {"GET": 9, "SET": 1}) runs them interleaved
+TESTS = [{"SET": 1}, {"GET": 1}]
+
 TARGETS = {
     "nanos": {"host": "127.0.0.1", "port": 6379},
     "docker": {"host": "127.0.0.1", "port": 6379}
@@ -19,54 +36,81 @@ LOADS = [
     for conn in [10, 50, 100]
     for _ in range(10)
 ]
+# a matrix cell (see nanos_eval.matrix) may run only some connection levels
+LOADS = select_loads(LOADS)
 
 
-def run_redis_benchmark(host, port, connections, requests):
-    cmd = [
-        "redis-benchmark",
-        "-h", host,
-        "-p", str(port),
-        "-c", str(connections),
-        "-n", str(requests),
-        "--csv",
-        "-t", "set,get"  # test SET and GET commands
-    ]
-    print(f"Running: {' '.join(cmd)}")
-    result = subprocess.run(cmd, stdout=subprocess.PIPE,
-                            stderr=subprocess.PIPE, text=True)
-    return result.stdout
+def run_redis_load(host, port, connections, requests, mix):
+    print(f"Running: {'/'.join(mix)} with {connections} connections, "
+          f"{requests} requests against {host}:{port}")
+    return run_resp_load(host, port, connections, requests, mix=mix,
+                         pipeline=PIPELINE, value_size=VALUE_SIZE,
+                         keyspace=KEYSPACE, distribution=KEY_DISTRIBUTION,
+                         workers=min(LOAD_WORKERS, connections))
 
 
-def run_benchmark(platform):
+def run_benchmark(platform, phase=None):
+    """Run every step of ``LOADS`` against ``platform``.
+
+    When given, ``phase`` (a shared ``multiprocessing.Value``) is set to
+    the index of the running step and back to ``PHASE_IDLE`` between steps.
+    """
     target = TARGETS.get(platform)
     log_file = f"metrics/database/redis_metrics_{platform}.csv"
+    steps = []
+    events = EventLog(f"metrics/{platform}_events.jsonl")
+    ready = wait_ready(target["host"], target["port"], probe="resp")
+    if ready is not None:
+        events.record("service_ready", ready)
+    events.record("load_started")
     with open(log_file, "w", newline="") as csvfile:
         writer = csv.DictWriter(
             csvfile, fieldnames=FIELDNAMES)
         writer.writeheader()
-        for load in LOADS:
-            output = run_redis_benchmark(
-                target["host"],
-                target["port"],
-                load["connection"],
-                load["requests"]
-            ).splitlines()
-            metrics = [
-                x + f",{load['connection']},{load['requests']}" for x in output[1:]]
-            for idx, row in enumerate(metrics):
-                processed_row = []
-                for x in row.split(","):
-                    x = x.strip('"')
-                    try:
-                        x = float(x)
-                    except ValueError:
-                        pass
-                    processed_row.append(x)
-                metrics[idx] = dict(zip(FIELDNAMES, processed_row))
-                if not load.get("warm_up"):
-                    writer.writerow(metrics[idx])
+        for step, load in enumerate(LOADS):
+            events.record("load_step", step=step, connection=load["connection"],
+                          warm_up=bool(load.get("warm_up")))
+            if phase is not None:
+                phase.value = step
+            requests = 0
+            for mix in TESTS:
+                result = run_redis_load(target["host"], target["port"],
+                                        load["connection"], load["requests"],
+                                        mix)
+                requests += sum(stats["requests"]
+                                for stats in result["tests"].values())
+                kinds = result["errors"]
+                if kinds["connect"] or kinds["read"] or kinds["unsent"]:
+                    print(f"⚠️ {kinds['connect']} connect and "
+                          f"{kinds['read']} read errors, "
+                          f"{kinds['unsent']} commands never sent")
+                if load.get("warm_up"):
+                    continue
+                writer.writerows(benchmark_rows(result, load["connection"]))
+                for test, stats in result["tests"].items():
+                    group = f"{test}@{load['connection']}"
+                    repetition = sum(done["group"] == group for done in steps)
+                    steps.append({"group": group, "test": test,
+                                  "connection": load["connection"],
+                                  "repetition": repetition,
+                                  "errors": stats["errors"],
+                                  "histogram": stats["histogram"]})
 
+            if phase is not None:
+                phase.value = PHASE_IDLE
+            events.record("step_done", step=step, requests=requests)
             time.sleep(1)
+    events.record("load_finished")
+    events.close()
+
+    histogram_file = log_file.replace(".csv", "_histograms.json")
+    merged = save_histograms(histogram_file, steps, group_by="group")
+    for group, histogram in merged.items():
+        summary = histogram.summary()
+        print(f"📊 {platform} {group} connections: " + ", ".join(
+            f"{name} {summary[f'latency_{name}_ms']} ms"
+            for name in SUMMARY_PERCENTILES))
+    print(f"📄 Latency histograms saved to {histogram_file}")
     return False
 
 
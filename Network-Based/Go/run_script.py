@@ -1,143 +1,21 @@
-import multiprocessing
+import os
 import sys
-import time
-import psutil
-import pandas as pd
-import matplotlib.pyplot as plt
-import subprocess
-import docker
-from plot_usage import comparative_plot
-from test_server import run_benchmark
+from test_server import LOADS, run_benchmark
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from nanos_eval.runner import Category, main  # noqa: E402
 
-def monitor(start_mem_kb, running_process, process_name, container=None):
-    start_timestamp = time.time()
-    log_file = f"metrics/{process_name}_usage_log.csv"
-    with open(log_file, "w") as f:
-        f.write("Time Stamp,CPU,Memory(KB)\n")
+SAMPLE_INTERVAL = 0.1
 
-    print(f"Monitoring {process_name} PID: {running_process.pid}")
-    process = multiprocessing.Process(
-        target=run_benchmark, args=(process_name,))
-    process.start()
-    try:
-        while process.is_alive():
-            cpu = running_process.cpu_percent(interval=1)
-            mem_kb = running_process.memory_info().rss
-            timestamp = time.time()
-
-            with open(log_file, "a") as f:
-                f.write(f"{timestamp}, {cpu}, {mem_kb}\n")
-
-    except psutil.NoSuchProcess as e:
-        print(f"Error: {e}")
-    if container:
-        container.kill()
-    else:
-        running_process.kill()
-    print(
-        f"Monitoring {running_process.is_running()}")
-    print(f"✅ Monitoring complete. Log saved to {log_file}")
-    process_metrics(log_file, start_mem_kb, start_timestamp, process_name)
-    plot_metrics(log_file, process_name)
-
-
-def run_docker_and_monitor(process_name, image_name="host_go_run"):
-    print(f"Starting {process_name} : Image Name {image_name}")
-    client = docker.from_env()
-    container = client.containers.run(
-        image=image_name,
-        detach=True,
-        remove=True,
-        cpu_count=4,
-        mem_limit="2g",
-        ports={'8080': '8080'},
-        name="sdk_monitor_container"
-    )
-    container.reload()
-    container_process = psutil.Process(container.attrs["State"]["Pid"])
-    monitor(container_process.memory_info().rss,
-            container_process, process_name, container)
-
-
-def process_metrics(raw_log, start_mem_kb, start_timestamp, process_name):
-    df = pd.read_csv(raw_log)
-    df["Memory(KB)"] = (df["Memory(KB)"] // 1024) - (start_mem_kb // 1024)
-    df["Memory(MB)"] = df["Memory(KB)"] // 1024
-    df["Time Stamp"] = df["Time Stamp"] - start_timestamp
-
-    df.rename(columns={"CPU": "CPU%",
-              "Time Stamp": "Time Elapsed"}, inplace=True)
-
-    final_log = f"metrics/{process_name}_usage_log.csv"
-    df[["Time Elapsed", "CPU%", "Memory(KB)", "Memory(MB)"]].to_csv(
-        final_log, index=False)
-    print(f"📄 Processed metrics saved to {final_log}")
-    plot_metrics(final_log, process_name)
-
-
-def plot_metrics(log_file, process_name):
-    df = pd.read_csv(log_file)
-
-    plt.figure(figsize=(12, 6))
-    plt.plot(df["Time Elapsed"], df["CPU%"],
-             label=f"{process_name} CPU Usage (%)")
-    plt.plot(df["Time Elapsed"], df["Memory(MB)"],
-             label=f"{process_name} Memory Usage (MB)")
-
-    plt.title(f"{process_name} Resource Usage Over Time")
-    plt.xlabel("Time Elapsed (s)")
-    plt.ylabel("Usage")
-    plt.legend()
-    plt.grid(True)
-    plt.tight_layout()
-
-    plot_path = f"metrics/plots/{process_name}_usage_plot.png"
-    plt.savefig(plot_path)
-    plt.close()
-    print(f"📈 Plot saved to {plot_path}")
-
-
-def run_script_and_monitor(command):
-    original_process = subprocess.Popen(command)
-    running_pid = original_process.pid
-    process = psutil.Process(running_pid)
-    starting_memory = 0
-    print(f"✅ Command started with PID: {running_pid}")
-
-    if sys.platform == "linux" or sys.platform == "linux2":
-        qemu_process_name = "qemu-system-x86_64"
-    else:
-        qemu_process_name = "qemu-system-aarch64"
-    qemu_proc = None
-    while qemu_proc is None:
-        filtered_proc = filter(
-            lambda proc: proc.info["ppid"] == running_pid and qemu_process_name in proc.info["name"],
-            psutil.process_iter(attrs=["ppid", "name"]))
-        qemu_proc = next(filtered_proc, None)
-    running_pid = qemu_proc.pid
-    if running_pid is None:
-        print("QEMU process not found!")
-        original_process.terminate()
-        return
-    starting_memory = process.memory_info().rss
-
-    process = psutil.Process(running_pid)
-    monitor(starting_memory, process, "nanos")
+GO = Category(
+    "go", ["ops", "run", "-c", "myconfig.json", "nanos_run"], "host_go_run",
+    SAMPLE_INTERVAL, benchmark=run_benchmark, loads=LOADS,
+    docker_options={"mem_limit": "2g", "ports": {"8080": "8080"}},
+    port=8080, probe="http", publish="8080:8080",
+    results=("metrics/webserver/webserver_metrics_{}.csv", "connection",
+             ["requests_per_sec", "latency_avg_ms", "latency_p99_ms"],
+             "metrics/webserver/webserver_comparison.csv"))
 
 
 if __name__ == "__main__":
-    nanos_command = ["ops", "run", "-c", "myconfig.json", "nanos_run"]
-    if len(sys.argv) > 1:
-        command_type = sys.argv[1]
-        if command_type == "nanos":
-            run_script_and_monitor(nanos_command)
-        else:
-            run_docker_and_monitor("docker")
-    else:
-        run_script_and_monitor(nanos_command)
-        run_docker_and_monitor("docker")
-    original_process_log = (
-        "metrics/docker_usage_log.csv", "docker")
-    ops_process_log = ("metrics/nanos_usage_log.csv", "nanos")
-    comparative_plot(original_process_log, ops_process_log)
+    main(GO)
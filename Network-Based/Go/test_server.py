@@ -1,11 +1,20 @@
-import subprocess
+import os
 import sys
 import time
 import csv
-from datetime import datetime
-from math import log
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from nanos_eval.events import EventLog  # noqa: E402
+from nanos_eval.histogram import SUMMARY_PERCENTILES, save_histograms  # noqa: E402
+from nanos_eval.httpload import run_load  # noqa: E402
+from nanos_eval.matrix import select_loads  # noqa: E402
+from nanos_eval.phases import PHASE_IDLE  # noqa: E402
+from nanos_eval.startup import wait_ready  # noqa: E402
 
 # CONFIG
+LOAD_WORKERS = 4  # load generator processes, like wrk's -t
+
 TARGETS = {
     "nanos": "http://localhost:8080",
     "docker": "http://localhost:8080"
@@ -18,53 +27,72 @@ LOADS = [
     for conn in [10, 50, 100]
     for _ in range(10)
 ]
+# a matrix cell (see nanos_eval.matrix) may run only some connection levels
+LOADS = select_loads(LOADS)
 
 
-def run_wrk(target, connection, duration):
-    cmd = [
-        "wrk",
-        "-t", str(min(4, connection)),  # threads
-        "-c", str(connection),
-        "-d", duration,
-        target
-    ]
-    print(f"Running: {' '.join(cmd)}")
-    result = subprocess.run(cmd, stdout=subprocess.PIPE,
-                            stderr=subprocess.PIPE, text=True)
-    return result.stdout
+def run_http_load(target, connection, duration):
+    print(f"Running: {connection} connections for {duration} against {target}")
+    return run_load(target, connection, duration,
+                    workers=min(LOAD_WORKERS, connection))
 
 
-def parse_wrk_output(output):
-    lines = output.splitlines()
-    metrics = {}
-    for line in lines:
-        if "Requests/sec:" in line:
-            metrics["requests_per_sec"] = float(line.split(":")[1].strip())
-        elif "Latency" in line:
-            metrics["latency_avg"] = line.split()[1]
-        elif "Socket errors" in line:
-            metrics["errors"] = line
-    return metrics
+def run_benchmark(platform, phase=None):
+    """Run every step of ``LOADS`` against ``platform``.
 
-
-def run_benchmark(platform):
+    When given, ``phase`` (a shared ``multiprocessing.Value``) is set to
+    the index of the running step and back to ``PHASE_IDLE`` between steps.
+    """
     log_file = f"metrics/webserver/webserver_metrics_{platform}.csv"
+    steps = []
+    target = urlsplit(TARGETS.get(platform))
+    events = EventLog(f"metrics/{platform}_events.jsonl")
+    ready = wait_ready(target.hostname, target.port or 80, probe="http")
+    if ready is not None:
+        events.record("service_ready", ready)
+    events.record("load_started")
     with open(log_file, "w") as csvfile:
-        fieldnames = ["connection", "duration",
-                      "requests_per_sec", "latency_avg", "errors"]
+        fieldnames = ["connection", "duration", "requests_per_sec",
+                      "latency_avg_ms"] + [
+            f"latency_{name}_ms" for name in SUMMARY_PERCENTILES] + ["errors"]
         writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
         writer.writeheader()
-        for load in LOADS:
-            output = run_wrk(TARGETS.get(platform),
-                             load["connection"], load["duration"])
-            metrics = parse_wrk_output(output)
-            metrics |= {
+        for step, load in enumerate(LOADS):
+            events.record("load_step", step=step, connection=load["connection"],
+                          warm_up=bool(load.get("warm_up")))
+            if phase is not None:
+                phase.value = step
+            result = run_http_load(TARGETS.get(platform),
+                                   load["connection"], load["duration"])
+            if phase is not None:
+                phase.value = PHASE_IDLE
+            events.record("step_done", step=step, requests=result["requests"])
+            metrics = {
                 "connection": load["connection"],
                 "duration": load["duration"],
+                "requests_per_sec": round(result["requests_per_sec"], 2),
+                "errors": sum(result["errors"].values()),
             }
+            metrics |= result["histogram"].summary()
             if not load.get("warm_up"):
                 writer.writerow(metrics)
+                repetition = sum(done["connection"] == load["connection"]
+                                 for done in steps)
+                steps.append({"connection": load["connection"],
+                              "repetition": repetition,
+                              "histogram": result["histogram"]})
             time.sleep(2)
+    events.record("load_finished")
+    events.close()
+
+    histogram_file = log_file.replace(".csv", "_histograms.json")
+    merged = save_histograms(histogram_file, steps)
+    for connection, histogram in merged.items():
+        summary = histogram.summary()
+        print(f"📊 {platform} @ {connection} connections: " + ", ".join(
+            f"{name} {summary[f'latency_{name}_ms']} ms"
+            for name in SUMMARY_PERCENTILES))
+    print(f"📄 Latency histograms saved to {histogram_file}")
     return False
 
 
@@ -0,0 +1,8 @@
+"""Shared monitoring engine for the Nanos vs Docker evaluation harness.
+
+Each category's ``run_script.py`` describes its workload with a
+:class:`nanos_eval.runner.Category` and hands it to
+:func:`nanos_eval.runner.main`, which builds the samplers for the process
+(or container) under test and has them driven on a fixed, drift-free
+schedule, with the results written in batches.
+"""
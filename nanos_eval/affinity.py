@@ -0,0 +1,272 @@
+"""CPU pinning for the system under test, the load generator and the harness.
+
+Without pinning, QEMU's vCPU threads, the Docker container, the load
+generator's workers and the harness all float across the same host
+cores, and every run ends up with a different mix of them. A
+:class:`Pinning` splits the usable host CPUs into disjoint core sets,
+one per role:
+
+- ``sut``: the system under test (QEMU and its threads, or the
+  container through its cpuset),
+- ``monitor``: the sampling sidecar,
+- ``harness``: the run script itself (draining and writing the log),
+- ``load``: the load generator and its workers (everything left over).
+
+Whole physical cores are handed out, so SMT siblings never end up in two
+roles. ``NANOS_EVAL_PIN`` picks the mode: ``on`` (the default), ``off``,
+or ``verify``, which also checks, every ``every`` samples of the usage
+log (10 by default, see :class:`AffinitySampler`), that each pinned
+thread is still confined to its core set and records the count as
+``Unpinned``.
+"""
+import json
+import os
+import time
+
+from .samplers import Sampler
+
+PIN_ENV = "NANOS_EVAL_PIN"
+PIN_MODES = ("on", "off", "verify")
+
+# Order in which roles are given cores; ``load`` takes what is left.
+ROLES = ("sut", "monitor", "harness", "load")
+
+_CPU_DIR = "/sys/devices/system/cpu"
+
+
+def parse_cpu_list(text):
+    """``[0, 1, 2, 5]`` from a kernel CPU list such as ``"0-2,5"``."""
+    cpus = []
+    for part in text.strip().split(","):
+        if not part:
+            continue
+        first, _, last = part.partition("-")
+        cpus.extend(range(int(first), int(last or first) + 1))
+    return cpus
+
+
+def format_cpu_list(cpus):
+    """The kernel (and Docker ``--cpuset-cpus``) form of a set of CPUs."""
+    ranges = []
+    for cpu in sorted(cpus):
+        if ranges and cpu == ranges[-1][1] + 1:
+            ranges[-1][1] = cpu
+        else:
+            ranges.append([cpu, cpu])
+    return ",".join(str(a) if a == b else f"{a}-{b}" for a, b in ranges)
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def cpu_topology(cpus=None):
+    """Package and core of every CPU this process may run on."""
+    if cpus is None:
+        cpus = sorted(os.sched_getaffinity(0))
+    topology = []
+    for cpu in cpus:
+        base = f"{_CPU_DIR}/cpu{cpu}/topology"
+        package = _read(f"{base}/physical_package_id")
+        core = _read(f"{base}/core_id")
+        topology.append({
+            "cpu": cpu,
+            "package": int(package) if package is not None else 0,
+            # without sysfs, treat every CPU as a core of its own
+            "core": int(core) if core is not None else cpu,
+        })
+    return topology
+
+
+def plan_cores(sut, load=1, monitor=1, harness=1, topology=None):
+    """Disjoint CPU lists for each role, or None if there are too few cores.
+
+    Every role but ``load`` gets the fewest whole physical cores that
+    cover the CPUs it asks for. ``load`` needs at least ``load`` CPUs and
+    gets all the remaining ones; pass ``load=0`` for runs without a load
+    generator.
+    """
+    if topology is None:
+        topology = cpu_topology()
+    cores = {}
+    for entry in topology:
+        cores.setdefault((entry["package"], entry["core"]), []).append(
+            entry["cpu"])
+    cores = sorted(cores.values())
+    wanted = {"sut": sut, "monitor": monitor, "harness": harness}
+    plan = {}
+    for role in ROLES[:-1]:
+        plan[role] = []
+        while len(plan[role]) < wanted[role]:
+            if not cores:
+                return None
+            plan[role].extend(cores.pop(0))
+    if load:
+        plan["load"] = [cpu for core in cores for cpu in core]
+        if len(plan["load"]) < load:
+            return None
+    return plan
+
+
+def _tids(pid):
+    try:
+        return [int(tid) for tid in os.listdir(f"/proc/{pid}/task")]
+    except FileNotFoundError:
+        return []
+
+
+def pin_threads(pid, cpus):
+    """Confine every thread of ``pid`` to ``cpus``; return how many."""
+    pinned = 0
+    for tid in _tids(pid):
+        try:
+            os.sched_setaffinity(tid, cpus)
+        except ProcessLookupError:
+            continue
+        pinned += 1
+    return pinned
+
+
+def allowed_cpus(pid):
+    """``{tid: set of CPUs}`` from each thread's ``Cpus_allowed_list``."""
+    allowed = {}
+    for tid in _tids(pid):
+        status = _read(f"/proc/{pid}/task/{tid}/status")
+        if status is None:
+            continue
+        for line in status.splitlines():
+            if line.startswith("Cpus_allowed_list:"):
+                allowed[tid] = set(parse_cpu_list(line.split(":", 1)[1]))
+                break
+    return allowed
+
+
+def unpinned_threads(pid, cpus):
+    """Threads of ``pid`` allowed to run outside ``cpus``."""
+    cpus = set(cpus)
+    return sorted(tid for tid, allowed in allowed_cpus(pid).items()
+                  if not allowed <= cpus)
+
+
+class AffinitySampler(Sampler):
+    """Number of watched threads that may run outside their core set.
+
+    ``targets`` maps pids to their CPU lists. The check reads a
+    ``status`` file per thread, so it runs only every ``every`` samples
+    and the last count is repeated in between. A target that has exited
+    counts as pinned.
+    """
+
+    columns = ("Unpinned",)
+
+    def __init__(self, targets, every=10):
+        self.targets = dict(targets)
+        self.every = every
+        self._count = 0
+        self._row = [0]
+
+    def sample(self):
+        if self._count % self.every == 0:
+            self._row[0] = sum(len(unpinned_threads(pid, cpus))
+                               for pid, cpus in self.targets.items())
+        self._count += 1
+        return self._row
+
+
+class Pinning:
+    """The core sets of one run and the processes pinned to them.
+
+    ``sut`` is the number of CPUs of the system under test (the VM's
+    vCPUs or the container's CPUs) and ``load`` the fewest CPUs the load
+    generator may have. With pinning off, or on a host with too few
+    cores, every method does nothing and :meth:`cpus` returns None.
+    """
+
+    def __init__(self, sut, load=1, mode=None):
+        self.mode = mode or os.environ.get(PIN_ENV) or "on"
+        if self.mode not in PIN_MODES:
+            raise ValueError(f"{PIN_ENV} must be one of {PIN_MODES}, "
+                             f"not {self.mode!r}")
+        self.topology = cpu_topology()
+        self.plan = None
+        if self.mode != "off":
+            self.plan = plan_cores(sut, load, topology=self.topology)
+            if self.plan is None:
+                print(f"⚠️ {len(self.topology)} CPUs are too few to give "
+                      f"the system under test {sut} of its own beside the "
+                      f"monitor, harness and load generator; running "
+                      f"unpinned")
+        self.targets = {}
+
+    def __bool__(self):
+        return self.plan is not None
+
+    def cpus(self, role):
+        return self.plan.get(role) if self.plan else None
+
+    def cpuset(self, role="sut"):
+        """The role's CPUs as a Docker ``cpuset_cpus`` string."""
+        cpus = self.cpus(role)
+        return format_cpu_list(cpus) if cpus else None
+
+    def preexec(self, role="sut"):
+        """A ``Popen`` ``preexec_fn`` that starts the command pinned.
+
+        Processes and threads the command starts later (QEMU and its
+        vCPUs) inherit the core set.
+        """
+        cpus = self.cpus(role)
+        if not cpus:
+            return None
+        return lambda: os.sched_setaffinity(0, cpus)
+
+    def pin(self, pid, role):
+        """Pin the threads ``pid`` has now; new ones inherit the set."""
+        cpus = self.cpus(role)
+        if cpus:
+            pin_threads(pid, cpus)
+            self.targets[pid] = role
+
+    def watch(self, pid, role):
+        """Check ``pid`` against a core set it was given some other way."""
+        if self.plan:
+            self.targets[pid] = role
+
+    def pin_self(self):
+        self.pin(os.getpid(), "harness")
+
+    def samplers(self):
+        """An :class:`AffinitySampler` over the pinned pids, if verifying."""
+        if self.mode != "verify" or not self.plan:
+            return []
+        return [AffinitySampler({pid: self.plan[role]
+                                 for pid, role in self.targets.items()})]
+
+    def record(self, path):
+        """Save the topology, the plan and a final check of every target."""
+        unpinned = {}
+        for pid, role in self.targets.items():
+            tids = unpinned_threads(pid, self.plan[role])
+            if tids:
+                unpinned[str(pid)] = {"role": role, "threads": tids}
+        document = {
+            "mode": self.mode,
+            "recorded": time.time(),
+            "topology": self.topology,
+            "plan": self.plan and {role: format_cpu_list(cpus)
+                                   for role, cpus in self.plan.items()},
+            "targets": {str(pid): role for pid, role in self.targets.items()},
+            "unpinned": unpinned,
+        }
+        with open(path, "w") as f:
+            json.dump(document, f, indent=2)
+        if unpinned:
+            print(f"⚠️ pinning did not hold for {len(unpinned)} process(es), "
+                  f"see {path}")
+        elif self.plan:
+            print(f"📄 Pinning {document['plan']} recorded to {path}")
+        return document
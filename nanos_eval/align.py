@@ -0,0 +1,150 @@
+"""Put monitor series of different runs onto one common time grid.
+
+All runs are resampled in a single pass: each run's times are shifted
+into their own disjoint window (``run * span``) and concatenated, so one
+``np.interp``/``searchsorted``/``bincount`` call covers every run. Grid
+points outside a run's sampled range come back as NaN.
+"""
+import numpy as np
+import pandas as pd
+
+from .events import event_time, load_events
+
+ALIGN_EVENT = "load_started"
+
+AGGREGATIONS = ("mean", "max", "min", "sum", "count")
+
+
+def make_grid(start, stop, step):
+    """Evenly spaced times from ``start`` to ``stop`` (inclusive)."""
+    return start + step * np.arange(int(np.floor((stop - start) / step)) + 1)
+
+
+def resample(times, values, grid, how="linear"):
+    """Resample several runs onto ``grid``.
+
+    ``times`` is a list of increasing 1-D arrays, one per run, and
+    ``values`` the matching ``(n)`` or ``(n, k)`` arrays. ``how`` is
+    ``"linear"`` (interpolate), ``"previous"`` (last sample at or before
+    each grid point) or one of ``AGGREGATIONS``, which reduce the samples
+    in ``[grid[i], grid[i] + step)`` bins. Returns ``(runs, len(grid), k)``.
+    """
+    grid = np.asarray(grid, dtype=np.float64)
+    lengths = np.array([len(t) for t in times])
+    runs = len(times)
+    run = np.repeat(np.arange(runs), lengths)
+    t = np.concatenate(times).astype(np.float64)
+    v = np.concatenate([np.asarray(x, dtype=np.float64).reshape(len(x), -1)
+                        for x in values])
+    columns = v.shape[1]
+    out = np.full((runs, len(grid), columns), np.nan)
+    if not len(t) or not len(grid):
+        return out
+
+    ends = np.cumsum(lengths)
+    starts = ends - lengths
+    nonempty = lengths > 0
+    first = np.full(runs, np.inf)
+    last = np.full(runs, -np.inf)
+    first[nonempty] = t[starts[nonempty]]
+    last[nonempty] = t[ends[nonempty] - 1]
+
+    if how in AGGREGATIONS:
+        step = grid[1] - grid[0] if len(grid) > 1 else np.inf
+        bins = np.floor((t - grid[0]) / step).astype(np.int64)
+        keep = (bins >= 0) & (bins < len(grid))
+        key = run[keep] * len(grid) + bins[keep]
+        size = runs * len(grid)
+        count = np.bincount(key, minlength=size)
+        for j in range(columns):
+            col = v[keep, j]
+            if how == "count":
+                result = count.astype(np.float64)
+            elif how in ("mean", "sum"):
+                result = np.bincount(key, weights=col, minlength=size)
+                if how == "mean":
+                    with np.errstate(invalid="ignore", divide="ignore"):
+                        result = result / count
+            else:
+                result = np.full(size, -np.inf if how == "max" else np.inf)
+                (np.maximum if how == "max" else np.minimum).at(result, key, col)
+            if how != "count":
+                result[count == 0] = np.nan
+            out[:, :, j] = result.reshape(runs, len(grid))
+        return out
+
+    span = (max(t.max(), grid[-1]) - min(t.min(), grid[0])) + 1.0
+    shifted = t + run * span
+    targets = (np.arange(runs)[:, None] * span + grid[None, :]).ravel()
+    inside = ((grid[None, :] >= first[:, None])
+              & (grid[None, :] <= last[:, None])).ravel()
+    if how == "linear":
+        for j in range(columns):
+            column = np.interp(targets, shifted, v[:, j])
+            column[~inside] = np.nan
+            out[:, :, j] = column.reshape(runs, len(grid))
+    elif how == "previous":
+        index = np.searchsorted(shifted, targets, side="right") - 1
+        result = v[index.clip(0)]
+        result[~inside] = np.nan
+        out[:] = result.reshape(runs, len(grid), columns)
+    else:
+        raise ValueError(f"unknown resampling method {how!r}")
+    return out
+
+
+def event_offset(frame, events, event=ALIGN_EVENT):
+    """Seconds from a processed log's start to ``event`` (0 if unknown)."""
+    when = event_time(events, event)
+    if when is None or "Time Stamp" not in frame.columns or frame.empty:
+        return 0.0
+    started = frame["Time Stamp"].iloc[0] - frame["Time Elapsed"].iloc[0]
+    return when - started
+
+
+def align_frames(frames, offsets=None, columns=None, step=None,
+                 how="linear"):
+    """Resample processed usage logs onto one shared grid.
+
+    ``offsets`` are subtracted from each frame's ``Time Elapsed`` so that
+    zero becomes a shared event. ``step`` defaults to the coarsest median
+    sampling interval of the frames; the grid spans all of them, with a
+    point at zero.
+    Returns new frames with ``Time Elapsed`` set to the grid.
+    """
+    offsets = offsets if offsets is not None else [0.0] * len(frames)
+    if columns is None:
+        # every column of any frame; frames lacking one get NaNs
+        columns = list(dict.fromkeys(
+            c for frame in frames for c in frame.columns
+            if c not in ("Time Elapsed", "Time Stamp")))
+    times = [frame["Time Elapsed"].to_numpy(dtype=np.float64) - offset
+             for frame, offset in zip(frames, offsets)]
+    if step is None:
+        step = max(float(np.median(np.diff(t))) if len(t) > 1 else 0.0
+                   for t in times) or 1.0
+    nonempty = [t for t in times if len(t)]
+    if not nonempty:
+        return [pd.DataFrame(columns=["Time Elapsed"] + columns)
+                for _ in frames]
+    # grid points fall on multiples of ``step`` from the event
+    start = np.floor(min(t[0] for t in nonempty) / step) * step
+    grid = make_grid(start, max(t[-1] for t in nonempty), step)
+    values = resample(times, [frame.reindex(columns=columns)
+                              .to_numpy(dtype=np.float64)
+                              for frame in frames], grid, how)
+    return [pd.DataFrame(np.column_stack([grid, run]),
+                         columns=["Time Elapsed"] + columns)
+            for run in values]
+
+
+def align_logs(log_files, events_files, event=ALIGN_EVENT, **kwargs):
+    """Load processed usage logs and align them on ``event``.
+
+    Logs without the event (or without events at all) stay relative to
+    their own monitor start. Keyword arguments go to :func:`align_frames`.
+    """
+    frames = [pd.read_csv(path) for path in log_files]
+    offsets = [event_offset(frame, load_events(path), event)
+               for frame, path in zip(frames, events_files)]
+    return align_frames(frames, offsets, **kwargs)
@@ -0,0 +1,159 @@
+"""Content-addressed store of benchmark cell results.
+
+A cell's key is a hash of everything that can change its measurements:
+
+- the cell itself (workload, platform, load levels, repetition),
+- every input file of its category directory (``myconfig.json``, the
+  Dockerfile, the workload's source, ``test_server.py`` and its ``LOADS``),
+  leaving out ``metrics/`` and the plotting script,
+- the harness modules that generate load and take samples,
+- the versions of ops, Docker, QEMU and Python,
+- the run settings taken from the environment (CPU pinning).
+
+Results are kept under ``<root>/<key>/`` with a ``manifest.json`` of the
+inputs they were measured with, so an unchanged cell can be restored
+instead of re-run and a changed one can say what changed.
+"""
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+
+from .affinity import PIN_ENV
+
+# Category files that do not affect what is measured.
+INPUT_EXCLUDE = {"metrics", "__pycache__", "plot_usage.py"}
+
+# Harness modules whose changes invalidate measured results.
+HARNESS_SOURCES = ("affinity.py", "cgroup.py", "discovery.py", "events.py",
+                   "histogram.py", "httpload.py", "memory.py", "monitor.py",
+                   "phases.py", "processing.py", "procfs.py", "respload.py",
+                   "runner.py", "samplers.py", "sidecar.py", "startup.py",
+                   "storage.py", "threads.py", "trace.py")
+
+MANIFEST = "manifest.json"
+
+
+def file_digest(path):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def tree_digests(directory, exclude=INPUT_EXCLUDE):
+    """``{relative path: digest}`` of every file below ``directory``."""
+    digests = {}
+    for parent, dirs, names in os.walk(directory):
+        dirs[:] = sorted(d for d in dirs if d not in exclude)
+        for name in sorted(names):
+            if name in exclude or name.endswith(".pyc"):
+                continue
+            path = os.path.join(parent, name)
+            digests[os.path.relpath(path, directory)] = file_digest(path)
+    return digests
+
+
+def _version(command):
+    try:
+        output = subprocess.run(command, capture_output=True, text=True,
+                                timeout=30).stdout
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    lines = output.strip().splitlines()
+    return lines[0] if lines else None
+
+
+def tool_versions():
+    """Versions of the tools a run depends on (None where missing)."""
+    qemu = ("qemu-system-x86_64" if sys.platform.startswith("linux")
+            else "qemu-system-aarch64")
+    return {
+        "ops": _version(["ops", "version"]),
+        "docker": _version(["docker", "version", "--format",
+                            "{{.Server.Version}}"]),
+        "qemu": _version([qemu, "--version"]),
+        "python": sys.version.split()[0],
+    }
+
+
+class ResultCache:
+    """Results of matrix cells, addressed by the hash of their inputs.
+
+    ``categories`` maps each workload to its category directory. Input
+    digests and tool versions are worked out once per cache object.
+    """
+
+    def __init__(self, root, categories, tools=None):
+        self.root = root
+        self.categories = categories
+        self._tools = tools
+        self._inputs = {}
+        harness = os.path.dirname(os.path.abspath(__file__))
+        self._harness = {name: file_digest(os.path.join(harness, name))
+                         for name in HARNESS_SOURCES}
+
+    def inputs(self, cell):
+        if self._tools is None:
+            self._tools = tool_versions()
+        if cell.workload not in self._inputs:
+            self._inputs[cell.workload] = tree_digests(
+                self.categories[cell.workload])
+        return {"cell": cell._asdict(), "files": self._inputs[cell.workload],
+                "harness": self._harness, "tools": self._tools,
+                "settings": {"pin": os.environ.get(PIN_ENV) or "on"}}
+
+    def key(self, cell):
+        """``(key, inputs)`` of a cell."""
+        inputs = self.inputs(cell)
+        encoded = json.dumps(inputs, sort_keys=True).encode()
+        return hashlib.blake2b(encoded, digest_size=16).hexdigest(), inputs
+
+    def path(self, key):
+        return os.path.join(self.root, key)
+
+    def has(self, key):
+        return os.path.exists(os.path.join(self.path(key), MANIFEST))
+
+    def manifest(self, key):
+        try:
+            with open(os.path.join(self.path(key), MANIFEST)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def store(self, key, inputs, src):
+        """Copy a finished cell's results from ``src`` into the cache."""
+        final = self.path(key)
+        tmp = f"{final}.tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        shutil.copytree(src, tmp)
+        with open(os.path.join(tmp, MANIFEST), "w") as f:
+            json.dump(inputs, f, indent=2, sort_keys=True)
+        shutil.rmtree(final, ignore_errors=True)
+        os.replace(tmp, final)
+        return final
+
+    def restore(self, key, dst):
+        """Copy cached results into ``dst``; return the files restored."""
+        src = self.path(key)
+        shutil.copytree(src, dst, dirs_exist_ok=True,
+                        ignore=shutil.ignore_patterns(MANIFEST))
+        return sorted(os.path.relpath(os.path.join(parent, name), src)
+                      for parent, _, names in os.walk(src)
+                      for name in names if name != MANIFEST)
+
+
+def changed_inputs(old, new):
+    """Names of the inputs that differ between two manifests."""
+    changed = []
+    for section in ("cell", "files", "harness", "tools", "settings"):
+        before, after = old.get(section, {}), new.get(section, {})
+        for name in sorted(set(before) | set(after)):
+            if before.get(name) != after.get(name):
+                changed.append(name if section == "files"
+                               else f"{section}.{name}")
+    return changed
@@ -0,0 +1,366 @@
+"""``python -m nanos_eval``: one entry point for the harness.
+
+Subcommands:
+
+- ``run``: run a category's ``run_script.py`` from inside its directory,
+- ``monitor``: sample an already running process into a usage log,
+- ``analyze``: compare two result CSVs (see :mod:`nanos_eval.stats`),
+- ``plot``: render every figure for a ``metrics`` directory,
+- ``trace``: profile a nanos console log (see :mod:`nanos_eval.trace`),
+- ``startup-bench``: time repeated launches of a command,
+- ``matrix``: run a benchmark matrix file (see :mod:`nanos_eval.matrix`),
+- ``ingest``, ``trend``, ``regress``: load runs into the results
+  warehouse and query it (see :mod:`nanos_eval.warehouse`).
+
+Only the standard library is imported up front; each subcommand imports
+what it needs when it runs, so ``--help`` and ``monitor`` never pay for
+pandas or matplotlib.
+"""
+import argparse
+import os
+import sys
+
+CATEGORIES = {
+    "compute": "Compute-Intensive",
+    "database": "Database-Based",
+    "go": os.path.join("Network-Based", "Go"),
+    "nginx": os.path.join("Network-Based", "Nginx"),
+}
+
+
+def _default_root():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if all(os.path.isdir(os.path.join(root, d)) for d in CATEGORIES.values()):
+        return root
+    return os.getcwd()
+
+
+def cmd_run(args):
+    import runpy
+
+    directory = os.path.join(args.root, CATEGORIES[args.category])
+    script = os.path.join(directory, "run_script.py")
+    if args.pin:
+        from .affinity import PIN_ENV
+        os.environ[PIN_ENV] = args.pin
+    os.chdir(directory)
+    # the run scripts import their neighbours (test_server, plot_usage)
+    sys.path.insert(0, directory)
+    sys.argv = [script] + args.args
+    runpy.run_path(script, run_name="__main__")
+
+
+def cmd_monitor(args):
+    import time
+
+    import psutil
+
+    from .monitor import run_monitor
+    from .samplers import process_sampler
+
+    os.makedirs("metrics", exist_ok=True)
+    process = psutil.Process(args.pid)
+    samplers = [process_sampler(process)]
+    if args.vcpus:
+        from .threads import ThreadSampler
+        samplers.append(ThreadSampler(
+            args.pid, args.vcpus,
+            thread_log=f"metrics/{args.name}_threads_log.csv"))
+    log_file = f"metrics/raw_{args.name}_usage_log.col"
+    start_timestamp = time.time()
+    print(f"Monitoring {args.name} PID: {args.pid}")
+    duration = args.duration
+    keep_running = (None if duration is None else
+                    lambda: time.time() - start_timestamp < duration)
+    sample = run_monitor
+    follower = None
+    if args.sidecar:
+        from concurrent.futures import ThreadPoolExecutor
+        from threading import Event
+
+        from .processing import follow_metrics
+        from .sidecar import run_sidecar_monitor
+        sample = run_sidecar_monitor
+        # the sidecar samples in a process of its own, so the raw log is
+        # processed here while it is written; a log left by an earlier
+        # run must not be read as this one's
+        if os.path.exists(log_file):
+            os.remove(log_file)
+        sampling = Event()
+        sampling.set()
+        pool = ThreadPoolExecutor(1)
+        follower = pool.submit(follow_metrics, log_file, 0, start_timestamp,
+                               args.name, sampling.is_set)
+    try:
+        stats = sample(samplers, log_file, args.interval,
+                       keep_running=keep_running)
+    except KeyboardInterrupt:
+        stats = None
+    if stats is not None:
+        print(f"✅ Monitoring complete. {stats.samples} samples "
+              f"({stats.missed} missed ticks). Log saved to {log_file}")
+
+    if follower is not None:
+        sampling.clear()
+        final_log = follower.result()
+        pool.shutdown()
+    else:
+        from .processing import process_metrics
+        final_log = process_metrics(log_file, 0, start_timestamp, args.name)
+    if args.plot:
+        from .plotting import plot_metrics
+        plot_metrics(final_log, args.name)
+
+
+def cmd_analyze(args):
+    from .stats import compare_files
+
+    by = [col for col in args.by.split(",") if col]
+    compare_files(args.baseline, args.candidate, by, args.metrics.split(","),
+                  args.out, baseline=args.baseline_name,
+                  candidate=args.candidate_name, seed=args.seed)
+
+
+def cmd_plot(args):
+    from .plotting import metrics_figures, render_figures
+
+    root, figures = metrics_figures(args.metrics_dir, args.baseline)
+    os.chdir(root)
+    render_figures(figures, workers=args.workers, force=args.force)
+
+
+def cmd_trace(args):
+    from .trace import profile_console
+
+    profile_console(args.console_log, args.name, args.out, args.bucket,
+                    usage_log=args.usage_log)
+
+
+def cmd_startup_bench(args):
+    from .startup import run_startup_bench
+
+    command = args.command[1:] if args.command[:1] == ["--"] else args.command
+    if not command:
+        sys.exit("startup-bench: no command given")
+    os.makedirs(os.path.dirname(args.log) or ".", exist_ok=True)
+    run_startup_bench(command, runs=args.runs, log_file=args.log,
+                      port=args.port, probe=args.probe,
+                      child_name=args.child_name,
+                      stop_command=(args.stop_command.split()
+                                    if args.stop_command else None))
+
+
+def cmd_matrix(args):
+    from . import matrix
+
+    spec = matrix.load_matrix(args.matrix)
+    order = args.order or spec.get("order", "interleaved")
+    seed = args.seed if args.seed is not None else spec.get("seed")
+    cells = matrix.order_cells(matrix.expand(spec), order, seed)
+    if args.dry_run:
+        for index, cell in enumerate(cells, 1):
+            print(f"{index:4d} {matrix.cell_id(cell)}")
+        return
+    categories = {name: os.path.join(args.root, directory)
+                  for name, directory in CATEGORIES.items()}
+    if args.pin:
+        from .affinity import PIN_ENV
+        # the run scripts inherit it, and it is part of each cell's key
+        os.environ[PIN_ENV] = args.pin
+    if args.fake is not None:
+        driver = matrix.FakeDriver(duration=args.fake)
+    else:
+        driver = matrix.ScriptDriver(categories)
+    cache = None
+    if not args.no_cache:
+        from .cache import ResultCache
+        cache = ResultCache(args.cache, categories)
+    checkpoint = os.path.join(args.out, "checkpoint.jsonl")
+    with matrix.Checkpoint(checkpoint) as done:
+        matrix.run_matrix(cells, driver, done, args.out,
+                          keep_going=not args.stop_on_failure,
+                          cache=cache, force=args.force)
+
+
+def cmd_ingest(args):
+    from .warehouse import ingest_run
+
+    ingest_run(args.workload, args.platform, args.metrics_dir, args.db,
+               label=args.label)
+
+
+def cmd_trend(args):
+    from .warehouse import connect, trend
+
+    db = connect(args.db)
+    frame = trend(db, args.workload, args.metric, platform=args.platform,
+                  test=args.test, connection=args.connection)
+    print(frame.to_string(index=False))
+
+
+def cmd_regress(args):
+    from .warehouse import check_regressions, connect
+
+    db = connect(args.db)
+    metrics = args.metrics.split(",") if args.metrics else None
+    result = check_regressions(db, args.run, args.baseline, metrics,
+                               alpha=args.alpha, seed=args.seed)
+    if result is not None and result["regression"].any():
+        sys.exit(1)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="nanos_eval", description="Nanos vs Docker evaluation harness.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser(
+        "run", help="run a category's benchmark (its run_script.py)")
+    run.add_argument("category", choices=CATEGORIES)
+    run.add_argument("args", nargs=argparse.REMAINDER,
+                     help="passed on to run_script.py, e.g. nanos or startup")
+    run.add_argument("--root", default=_default_root(),
+                     help="repository root holding the category directories")
+    run.add_argument("--pin", choices=["on", "off", "verify"],
+                     help="CPU pinning of the system under test, load "
+                          "generator and monitor (default: on)")
+    run.set_defaults(func=cmd_run)
+
+    monitor = commands.add_parser(
+        "monitor", help="sample a running process into metrics/")
+    monitor.add_argument("pid", type=int)
+    monitor.add_argument("--name", default="process",
+                         help="label used in the log file names")
+    monitor.add_argument("--interval", type=float, default=0.1)
+    monitor.add_argument("--duration", type=float,
+                         help="stop after this many seconds "
+                              "(default: until the process exits or Ctrl-C)")
+    monitor.add_argument("--vcpus", type=int, default=0,
+                         help="also break QEMU's CPU down per vCPU thread")
+    monitor.add_argument("--sidecar", action="store_true",
+                         help="sample from a separate process through a "
+                              "shared-memory ring buffer")
+    monitor.add_argument("--plot", action="store_true")
+    monitor.set_defaults(func=cmd_monitor)
+
+    analyze = commands.add_parser(
+        "analyze", help="compare a candidate's results against a baseline")
+    analyze.add_argument("baseline")
+    analyze.add_argument("candidate")
+    analyze.add_argument("--by", default="",
+                         help="comma-separated grouping columns")
+    analyze.add_argument("--metrics", required=True,
+                         help="comma-separated columns to compare")
+    analyze.add_argument("--out", default="metrics/comparison.csv")
+    analyze.add_argument("--baseline-name", default="docker")
+    analyze.add_argument("--candidate-name", default="nanos")
+    analyze.add_argument("--seed", type=int)
+    analyze.set_defaults(func=cmd_analyze)
+
+    plot = commands.add_parser(
+        "plot", help="render the figures of a metrics directory")
+    plot.add_argument("metrics_dir", nargs="?", default="metrics")
+    plot.add_argument("--baseline", default="docker")
+    plot.add_argument("--workers", type=int)
+    plot.add_argument("--force", action="store_true",
+                      help="redraw figures whose inputs are unchanged")
+    plot.set_defaults(func=cmd_plot)
+
+    trace = commands.add_parser(
+        "trace", help="profile a nanos console log (syscalls, faults, threads)")
+    trace.add_argument("console_log", help="e.g. metrics/nanos_console.log")
+    trace.add_argument("--name", default="nanos",
+                       help="prefix of the profile files")
+    trace.add_argument("--out", default="metrics")
+    trace.add_argument("--bucket", type=float, default=0.1,
+                       help="seconds per trace rate bucket")
+    trace.add_argument("--usage-log",
+                       help="processed usage log to add the rates to")
+    trace.set_defaults(func=cmd_trace)
+
+    startup = commands.add_parser(
+        "startup-bench", help="time repeated launches of a command")
+    startup.add_argument("--runs", type=int, default=10)
+    startup.add_argument("--log", default="metrics/startup/startup.csv")
+    startup.add_argument("--port", type=int)
+    startup.add_argument("--probe", choices=["http", "resp"])
+    startup.add_argument("--child-name",
+                         help="time the appearance of a descendant process, "
+                              "e.g. qemu-system-x86_64")
+    startup.add_argument("--stop-command",
+                         help="run after every launch, "
+                              "e.g. 'docker rm -f my_container'")
+    startup.add_argument("command", nargs=argparse.REMAINDER)
+    startup.set_defaults(func=cmd_startup_bench)
+
+    matrix = commands.add_parser(
+        "matrix", help="run a workload x platform x load x repetition matrix")
+    matrix.add_argument("matrix", help="matrix file (JSON)")
+    matrix.add_argument("--order", choices=["interleaved", "randomized",
+                                            "sequential"],
+                        help="overrides the file's order")
+    matrix.add_argument("--seed", type=int, help="overrides the file's seed")
+    matrix.add_argument("--out", default="metrics/matrix",
+                        help="cell results and checkpoint.jsonl go here")
+    matrix.add_argument("--root", default=_default_root(),
+                        help="repository root holding the category directories")
+    matrix.add_argument("--dry-run", action="store_true",
+                        help="only print the cells in the order they would run")
+    matrix.add_argument("--fake", type=float, nargs="?", const=0.0,
+                        metavar="SECONDS",
+                        help="use the fake driver (no QEMU or Docker), "
+                             "sleeping SECONDS per cell")
+    matrix.add_argument("--stop-on-failure", action="store_true")
+    matrix.add_argument("--pin", choices=["on", "off", "verify"],
+                        help="CPU pinning for every cell (default: on)")
+    matrix.add_argument("--cache", default="metrics/cache",
+                        help="content-addressed store of cell results")
+    matrix.add_argument("--no-cache", action="store_true")
+    matrix.add_argument("--force", action="store_true",
+                        help="re-run every cell, even unchanged ones")
+    matrix.set_defaults(func=cmd_matrix)
+
+    # nanos_eval.warehouse.DEFAULT_DB, without importing pandas for --help
+    default_db = os.path.join(_default_root(), "metrics", "results.db")
+    ingest = commands.add_parser(
+        "ingest", help="add a run's metrics directory to the warehouse")
+    ingest.add_argument("workload", choices=CATEGORIES)
+    ingest.add_argument("platform")
+    ingest.add_argument("metrics_dir", nargs="?", default="metrics")
+    ingest.add_argument("--label")
+    ingest.add_argument("--db", default=default_db)
+    ingest.set_defaults(func=cmd_ingest)
+
+    trend = commands.add_parser(
+        "trend", help="a metric of every run of a workload, oldest first")
+    trend.add_argument("workload", choices=CATEGORIES)
+    trend.add_argument("metric", help="rps, latency_p99_ms, ... or rss")
+    trend.add_argument("--platform")
+    trend.add_argument("--test")
+    trend.add_argument("--connection", type=int)
+    trend.add_argument("--db", default=default_db)
+    trend.set_defaults(func=cmd_trend)
+
+    regress = commands.add_parser(
+        "regress", help="flag significant regressions of a run; exits 1 "
+                        "if any")
+    regress.add_argument("run", type=int)
+    regress.add_argument("--baseline", type=int,
+                         help="run to compare with (default: the previous "
+                              "run of the same workload and platform)")
+    regress.add_argument("--metrics",
+                         help="comma-separated (default: rps,latency_p99_ms,rss)")
+    regress.add_argument("--alpha", type=float, default=0.05)
+    regress.add_argument("--seed", type=int)
+    regress.add_argument("--db", default=default_db)
+    regress.set_defaults(func=cmd_regress)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
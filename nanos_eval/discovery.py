@@ -0,0 +1,185 @@
+"""Finding the QEMU process that ``ops`` starts, without busy-waiting.
+
+``ops run`` forks ``qemu-system-*`` a moment after it is launched, and
+the harness needs that pid. Scanning every process on the host in a tight
+loop burns a core while the guest boots. :func:`wait_for_child` instead
+walks only the launcher's descendants, through the
+``/proc/<pid>/task/<tid>/children`` lists. Between walks it backs off
+from half a millisecond to ``max_interval``, and it waits on a pidfd of
+the launcher, so a launcher that exits ends the wait at once. Kernels
+built without ``CONFIG_PROC_CHILDREN`` fall back to reading the parent
+pid of every process, at the same backed-off pace, and hosts without
+``/proc`` (macOS) to psutil.
+"""
+import collections
+import os
+import select
+import time
+
+from .procfs import CLK_TCK
+
+# ``seen`` is the time.time() at which the child was found, ``started``
+# the time.time() its process was created (from /proc/<pid>/stat, to
+# CLK_TCK resolution).
+Child = collections.namedtuple("Child", "pid name seen started")
+
+
+def _read(path):
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+# Root of the process tree that is walked; tests point it at a fake one.
+PROC = "/proc"
+HAS_PROC = os.path.isdir("/proc/self")
+# Whether this kernel has the children lists (CONFIG_PROC_CHILDREN).
+HAS_CHILDREN_LIST = os.path.exists(f"/proc/self/task/{os.getpid()}/children")
+
+
+def _children(pid):
+    children = []
+    try:
+        tids = os.listdir(f"{PROC}/{pid}/task")
+    except FileNotFoundError:
+        return children
+    for tid in tids:
+        data = _read(f"{PROC}/{pid}/task/{tid}/children")
+        if data:
+            children.extend(int(child) for child in data.split())
+    return children
+
+
+def _parent_pids():
+    """``{ppid: [pid, ...]}`` for every process on the host."""
+    parents = collections.defaultdict(list)
+    for name in os.listdir(PROC):
+        if not name.isdigit():
+            continue
+        stat = _read(f"{PROC}/{name}/stat")
+        if stat is None:
+            continue
+        ppid = int(stat[stat.rindex(b")") + 2:].split()[1])
+        parents[ppid].append(int(name))
+    return parents
+
+
+def descendants(pid):
+    """Pids of every process below ``pid``, closest first."""
+    if not HAS_PROC:
+        import psutil
+        try:
+            return [child.pid
+                    for child in psutil.Process(pid).children(recursive=True)]
+        except psutil.NoSuchProcess:
+            return []
+    if HAS_CHILDREN_LIST:
+        children = _children
+    else:
+        children = _parent_pids().get
+    found = []
+    pending = collections.deque([pid])
+    while pending:
+        for child in children(pending.popleft()) or ():
+            found.append(child)
+            pending.append(child)
+    return found
+
+
+def process_name(pid):
+    """The executable name of ``pid``: argv[0] without its directory.
+
+    ``comm`` is cut to 15 characters (``qemu-system-x86``), so the command
+    line is read first.
+    """
+    if not HAS_PROC:
+        import psutil
+        try:
+            return psutil.Process(pid).name()
+        except psutil.NoSuchProcess:
+            return None
+    cmdline = _read(f"{PROC}/{pid}/cmdline")
+    if cmdline:
+        return os.path.basename(cmdline.split(b"\0")[0].decode(errors="replace"))
+    comm = _read(f"{PROC}/{pid}/comm")
+    return comm.decode(errors="replace").strip() if comm else None
+
+
+def start_time(pid):
+    """The ``time.time()`` at which ``pid`` was created, or None."""
+    if not HAS_PROC:
+        import psutil
+        try:
+            return psutil.Process(pid).create_time()
+        except psutil.NoSuchProcess:
+            return None
+    stat = _read(f"{PROC}/{pid}/stat")
+    if stat is None:
+        return None
+    # starttime counts clock ticks since boot, the epoch of CLOCK_BOOTTIME
+    ticks = int(stat[stat.rindex(b")") + 2:].split()[19])
+    age = time.clock_gettime(time.CLOCK_BOOTTIME) - ticks / CLK_TCK
+    return time.time() - age
+
+
+def find_child(pid, name):
+    """The first descendant of ``pid`` whose name contains ``name``."""
+    for child in descendants(pid):
+        child_name = process_name(child)
+        if child_name and name in child_name:
+            return child
+    return None
+
+
+def exit_waiter(pid):
+    """A ``(wait(seconds), close())`` pair that wakes early if ``pid`` exits."""
+    try:
+        fd = os.pidfd_open(pid)
+    except (AttributeError, OSError):
+        return time.sleep, lambda: None
+    poller = select.poll()
+    poller.register(fd, select.POLLIN)
+    return (lambda seconds: poller.poll(seconds * 1000),
+            lambda: os.close(fd))
+
+
+def wait_for_child(pid, name, timeout=60.0, interval=0.0005,
+                   max_interval=0.05):
+    """Wait for a descendant of ``pid`` named like ``name`` to appear.
+
+    Polls the descendants with an interval that doubles from ``interval``
+    up to ``max_interval``. Returns a :class:`Child`, or None if ``pid``
+    exits first or nothing turns up within ``timeout`` seconds.
+    """
+    wait, close = exit_waiter(pid)
+    deadline = time.monotonic() + timeout
+    try:
+        while True:
+            child = find_child(pid, name)
+            if child is not None:
+                seen = time.time()
+                return Child(child, process_name(child), seen,
+                             start_time(child) or seen)
+            if _exited(pid):
+                return None
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            wait(min(interval, remaining))
+            interval = min(interval * 2, max_interval)
+    finally:
+        close()
+
+
+def _exited(pid):
+    """True once ``pid`` is gone or a zombie (exited but not reaped)."""
+    if not HAS_PROC:
+        import psutil
+        try:
+            return psutil.Process(pid).status() == psutil.STATUS_ZOMBIE
+        except psutil.NoSuchProcess:
+            return True
+    stat = _read(f"{PROC}/{pid}/stat")
+    return stat is None or stat[stat.rindex(b")") + 2:][:1] in (b"Z", b"X")
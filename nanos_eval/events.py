@@ -0,0 +1,47 @@
+import json
+import time
+
+
+class EventLog:
+    """Append timestamped run events (``service_ready``, ``load_started``...)
+    to a JSON-lines file, one flushed line per event.
+
+    Timestamps are ``time.time()`` seconds, the clock of the monitor's
+    ``Time Stamp`` column, so events can be placed on the usage logs.
+    The file is truncated when the log is opened.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "w")
+
+    def record(self, name, timestamp=None, **fields):
+        event = {"event": name,
+                 "time": time.time() if timestamp is None else timestamp}
+        event.update(fields)
+        self._file.write(json.dumps(event) + "\n")
+        self._file.flush()
+        return event
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def load_events(path):
+    """Events of an :class:`EventLog` file, oldest first ([] if missing)."""
+    try:
+        with open(path) as f:
+            return [json.loads(line) for line in f if line.strip()]
+    except FileNotFoundError:
+        return []
+
+
+def event_time(events, name):
+    """Timestamp of the first event called ``name``, or None."""
+    return next((e["time"] for e in events if e["event"] == name), None)
@@ -0,0 +1,194 @@
+import json
+
+import numpy as np
+
+# Percentiles reported for every load step, keyed by their column suffix.
+SUMMARY_PERCENTILES = {"p50": 50, "p90": 90, "p99": 99, "p999": 99.9,
+                       "max": 100}
+
+
+class LatencyHistogram:
+    """Log-bucketed latency histogram in the spirit of HdrHistogram.
+
+    Values are integer microseconds. Values below ``2 ** sub_bucket_bits``
+    get a bucket each; above that every power of two is split into
+    ``2 ** (sub_bucket_bits - 1)`` linear sub-buckets, so any recorded
+    value is reported within ``2 ** (1 - sub_bucket_bits)`` (0.8% for the
+    default of 8 bits) of its true value. Values above ``2 ** max_bits``
+    microseconds are clamped into the last bucket. Exact count, sum, min
+    and max are kept alongside the buckets.
+    """
+
+    def __init__(self, sub_bucket_bits=8, max_bits=36):
+        self.sub_bucket_bits = sub_bucket_bits
+        self.max_bits = max_bits
+        self._linear = 1 << sub_bucket_bits
+        self._half = self._linear >> 1
+        self._max_value = (1 << max_bits) - 1
+        self.counts = np.zeros(self._index(self._max_value) + 1,
+                               dtype=np.int64)
+        self.total = 0
+        self.sum = 0
+        self.min = None
+        self.max = None
+
+    def _index(self, value):
+        if value < self._linear:
+            return value
+        shift = value.bit_length() - self.sub_bucket_bits
+        return (self._linear + (shift - 1) * self._half
+                + (value >> shift) - self._half)
+
+    def _indices(self, values):
+        shift = np.frexp(values.astype(np.float64))[1] - self.sub_bucket_bits
+        shift = np.maximum(shift, 1)
+        index = (self._linear + (shift - 1) * self._half
+                 + (values >> shift) - self._half)
+        return np.where(values < self._linear, values, index)
+
+    def _bounds(self, index):
+        """Lowest and highest value mapped to each bucket in ``index``."""
+        index = np.asarray(index, dtype=np.int64)
+        offset = np.maximum(index - self._linear, 0)
+        shift = offset // self._half + 1
+        mantissa = offset % self._half + self._half
+        low = np.where(index < self._linear, index, mantissa << shift)
+        high = np.where(index < self._linear, index,
+                        ((mantissa + 1) << shift) - 1)
+        return low, high
+
+    def record(self, value_us):
+        value_us = min(max(int(value_us), 0), self._max_value)
+        self.counts[self._index(value_us)] += 1
+        self.total += 1
+        self.sum += value_us
+        self.min = value_us if self.min is None else min(self.min, value_us)
+        self.max = value_us if self.max is None else max(self.max, value_us)
+
+    def record_many(self, values_us):
+        """Record an array of values at once."""
+        values = np.clip(np.asarray(values_us, dtype=np.int64),
+                         0, self._max_value)
+        if values.size == 0:
+            return
+        self.counts += np.bincount(self._indices(values),
+                                   minlength=len(self.counts))
+        self.total += int(values.size)
+        self.sum += int(values.sum())
+        low, high = int(values.min()), int(values.max())
+        self.min = low if self.min is None else min(self.min, low)
+        self.max = high if self.max is None else max(self.max, high)
+
+    @property
+    def mean(self):
+        return self.sum / self.total if self.total else 0.0
+
+    def percentiles(self, quantiles):
+        """Values (us) at each of ``quantiles`` (0-100), one array lookup."""
+        if not self.total:
+            return np.zeros(len(quantiles))
+        cumulative = np.cumsum(self.counts)
+        ranks = np.ceil(np.asarray(quantiles, dtype=np.float64) / 100.0
+                        * self.total).clip(1, self.total)
+        index = np.searchsorted(cumulative, ranks)
+        low, high = self._bounds(index)
+        # report the bucket midpoint, but never outside the observed range
+        values = np.clip((low + high) / 2.0, self.min, self.max)
+        values[ranks >= self.total] = self.max
+        return values
+
+    def percentile(self, quantile):
+        return float(self.percentiles([quantile])[0])
+
+    def merge(self, other):
+        """Add the counts of ``other`` (same bucket layout) into this one."""
+        if (other.sub_bucket_bits, other.max_bits) != (
+                self.sub_bucket_bits, self.max_bits):
+            raise ValueError("cannot merge histograms with different layouts")
+        if not other.total:
+            return self
+        self.counts += other.counts
+        self.total += other.total
+        self.sum += other.sum
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+        return self
+
+    def summary(self):
+        """Mean and ``SUMMARY_PERCENTILES`` latencies in milliseconds."""
+        values = self.percentiles(list(SUMMARY_PERCENTILES.values()))
+        summary = {"latency_avg_ms": round(self.mean / 1000.0, 3)}
+        for name, value in zip(SUMMARY_PERCENTILES, values):
+            summary[f"latency_{name}_ms"] = round(float(value) / 1000.0, 3)
+        return summary
+
+    def to_dict(self):
+        """Sparse, JSON-friendly form holding only the non-empty buckets."""
+        index = np.flatnonzero(self.counts)
+        return {
+            "sub_bucket_bits": self.sub_bucket_bits,
+            "max_bits": self.max_bits,
+            "total": self.total,
+            "sum": self.sum,
+            "min": self.min,
+            "max": self.max,
+            "index": index.tolist(),
+            "count": self.counts[index].tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        histogram = cls(data["sub_bucket_bits"], data["max_bits"])
+        histogram.counts[data["index"]] = data["count"]
+        histogram.total = data["total"]
+        histogram.sum = data["sum"]
+        histogram.min = data["min"]
+        histogram.max = data["max"]
+        return histogram
+
+
+def merge_histograms(histograms):
+    """Merge several histograms into a new one."""
+    merged = None
+    for histogram in histograms:
+        if merged is None:
+            merged = LatencyHistogram(histogram.sub_bucket_bits,
+                                      histogram.max_bits)
+        merged.merge(histogram)
+    return merged if merged is not None else LatencyHistogram()
+
+
+def save_histograms(path, steps, group_by="connection"):
+    """Serialize per-step histograms plus one merged histogram per group.
+
+    ``steps`` is a list of dicts holding the step's parameters and its
+    ``"histogram"``; steps sharing the same ``group_by`` value (e.g. the
+    repetitions of one connection level) are merged. Returns the merged
+    histograms keyed by group.
+    """
+    groups = {}
+    for step in steps:
+        groups.setdefault(step[group_by], []).append(step["histogram"])
+    merged = {key: merge_histograms(hists) for key, hists in groups.items()}
+    document = {
+        "group_by": group_by,
+        "steps": [dict(step, histogram=step["histogram"].to_dict())
+                  for step in steps],
+        "merged": [{group_by: key, "histogram": histogram.to_dict()}
+                   for key, histogram in merged.items()],
+    }
+    with open(path, "w") as f:
+        json.dump(document, f)
+    return merged
+
+
+def load_histograms(path):
+    """Inverse of :func:`save_histograms`: ``(steps, merged)``."""
+    with open(path) as f:
+        document = json.load(f)
+    group_by = document["group_by"]
+    steps = [dict(step, histogram=LatencyHistogram.from_dict(step["histogram"]))
+             for step in document["steps"]]
+    merged = {entry[group_by]: LatencyHistogram.from_dict(entry["histogram"])
+              for entry in document["merged"]}
+    return steps, merged
@@ -0,0 +1,159 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from array import array
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from .histogram import LatencyHistogram
+
+ERROR_KINDS = ("connect", "read", "timeout", "status")
+
+_DURATION_UNITS = (("ms", 0.001), ("s", 1.0), ("m", 60.0), ("h", 3600.0))
+
+
+def parse_duration(duration):
+    """Seconds in a wrk-style duration such as ``"10s"``, ``"2m"`` or ``5``."""
+    if isinstance(duration, (int, float)):
+        return float(duration)
+    for suffix, scale in _DURATION_UNITS:
+        if duration.endswith(suffix):
+            return float(duration[:-len(suffix)]) * scale
+    return float(duration)
+
+
+async def _read_response(reader):
+    """Read one HTTP/1.1 response; return ``(status, keep_alive)``."""
+    head = await reader.readuntil(b"\r\n\r\n")
+    status = int(head[9:12])
+    lower = head.lower()
+    keep_alive = b"connection: close" not in lower
+    start = lower.find(b"content-length:")
+    if start >= 0:
+        length = int(lower[start + 15:lower.index(b"\r\n", start)])
+        if length:
+            await reader.readexactly(length)
+    elif b"transfer-encoding: chunked" in lower:
+        while True:
+            line = await reader.readuntil(b"\r\n")
+            size = int(line[:-2].split(b";")[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    else:
+        await reader.read()
+        keep_alive = False
+    return status, keep_alive
+
+
+async def _connection(host, port, request, deadline, latencies, errors):
+    """Issue requests back to back on one keep-alive connection."""
+    clock = time.perf_counter_ns
+    writer = None
+    try:
+        while time.monotonic() < deadline:
+            if writer is None:
+                try:
+                    reader, writer = await asyncio.open_connection(host, port)
+                except OSError:
+                    errors["connect"] += 1
+                    await asyncio.sleep(0.01)
+                    continue
+            start = clock()
+            try:
+                writer.write(request)
+                status, keep_alive = await _read_response(reader)
+            except (OSError, ValueError, asyncio.IncompleteReadError,
+                    asyncio.LimitOverrunError):
+                errors["read"] += 1
+                writer.close()
+                writer = None
+                continue
+            latencies.append((clock() - start) // 1000)
+            if status >= 400:
+                errors["status"] += 1
+            if not keep_alive:
+                writer.close()
+                writer = None
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def _run_worker(job):
+    """Run one event loop's share of the connections (in a worker process)."""
+    host, port, request, connections, start_at, duration, timeout = job
+    latencies = array("q")
+    errors = dict.fromkeys(ERROR_KINDS, 0)
+
+    async def main():
+        delay = start_at - time.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        started = time.monotonic()
+        deadline = started + duration
+        tasks = [asyncio.ensure_future(_connection(
+            host, port, request, deadline, latencies, errors))
+            for _ in range(connections)]
+        # requests still in flight ``timeout`` seconds after the end are
+        # abandoned and counted as timeouts, like wrk does
+        _, pending = await asyncio.wait(tasks, timeout=duration + timeout)
+        for task in pending:
+            task.cancel()
+            errors["timeout"] += 1
+        await asyncio.gather(*pending, return_exceptions=True)
+        return min(time.monotonic() - started, duration + timeout)
+
+    elapsed = asyncio.run(main())
+    return latencies.tobytes(), errors, elapsed
+
+
+def run_load(url, connections, duration, workers=None, timeout=2.0):
+    """Drive ``url`` with keep-alive GETs and return structured results.
+
+    ``connections`` persistent connections are spread over ``workers``
+    processes (default: one per CPU, at most one per connection), each
+    running its own asyncio loop, so the generator scales past a single
+    core. ``duration`` is seconds or a wrk-style string (``"10s"``).
+    Every request's latency is recorded into a
+    :class:`~nanos_eval.histogram.LatencyHistogram`.
+
+    Returns a dict with ``connections``, ``duration_s``, ``requests``,
+    ``requests_per_sec``, ``latency_avg_ms``, ``errors`` (counts per kind
+    in ``ERROR_KINDS``) and ``histogram``.
+    """
+    seconds = parse_duration(duration)
+    parts = urlsplit(url)
+    request = (f"GET {parts.path or '/'} HTTP/1.1\r\n"
+               f"Host: {parts.netloc}\r\n\r\n").encode()
+    workers = max(1, min(workers or os.cpu_count(), connections))
+    shares = [connections // workers + (i < connections % workers)
+              for i in range(workers)]
+    # give forked workers a moment so they all start at the same instant
+    start_at = time.time() + (0.25 if workers > 1 else 0.0)
+    jobs = [(parts.hostname, parts.port or 80, request, share, start_at,
+             seconds, timeout) for share in shares]
+    if workers == 1:
+        outputs = [_run_worker(jobs[0])]
+    else:
+        with multiprocessing.Pool(workers) as pool:
+            outputs = pool.map(_run_worker, jobs)
+
+    histogram = LatencyHistogram()
+    errors = dict.fromkeys(ERROR_KINDS, 0)
+    for data, worker_errors, _ in outputs:
+        histogram.record_many(np.frombuffer(data, dtype=np.int64))
+        for kind, count in worker_errors.items():
+            errors[kind] += count
+    elapsed = max(output[2] for output in outputs)
+    return {
+        "connections": connections,
+        "duration_s": seconds,
+        "requests": histogram.total,
+        "requests_per_sec": histogram.total / elapsed if elapsed else 0.0,
+        "latency_avg_ms": histogram.mean / 1000.0,
+        "errors": errors,
+        "histogram": histogram,
+    }
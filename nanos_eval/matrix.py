@@ -0,0 +1,345 @@
+"""Run a workload x platform x load x repetition matrix, resumably.
+
+A matrix file (JSON) names the workloads to run and, per workload, the
+platforms, load levels and number of repetitions::
+
+    {"order": "interleaved", "repetitions": 3, "seed": 1,
+     "platforms": ["nanos", "docker"],
+     "workloads": {"go": {"loads": {"c10": [10], "c100": [100]}},
+                   "compute": {"repetitions": 5}}}
+
+A load is a list of connection levels picked out of the category's
+``LOADS`` (``null``, the default ``"all"`` load, keeps every step).
+:func:`expand` turns the file into :class:`Cell` s, :func:`order_cells`
+decides the order they run in and :func:`run_matrix` runs them through a
+driver, appending every finished cell to a JSON-lines checkpoint so an
+interrupted run picks up at the first cell it has not finished. With a
+:class:`~nanos_eval.cache.ResultCache`, cells whose inputs have not
+changed since they were last measured are restored instead of re-run.
+"""
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import time
+from collections import namedtuple
+
+from .cache import changed_inputs
+
+Cell = namedtuple("Cell", ["workload", "platform", "load", "connections",
+                           "repetition"])
+
+ORDERS = ("interleaved", "randomized", "sequential")
+
+# Connection levels of the running cell, read by the test servers.
+CONNECTIONS_ENV = "NANOS_EVAL_CONNECTIONS"
+# Id of the running cell, stored with the run in the results warehouse.
+CELL_ENV = "NANOS_EVAL_CELL"
+# Id of the running cell's pair: the same cell on every platform.
+PAIR_ENV = "NANOS_EVAL_PAIR"
+
+
+def cell_id(cell):
+    return f"{cell.workload}-{cell.platform}-{cell.load}-r{cell.repetition}"
+
+
+def pair_id(cell):
+    return f"{cell.workload}-{cell.load}-r{cell.repetition}"
+
+
+def load_matrix(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def expand(matrix):
+    """All cells of a matrix, workload by workload in file order."""
+    cells = []
+    for workload, spec in matrix["workloads"].items():
+        spec = spec or {}
+        platforms = spec.get("platforms", matrix.get("platforms",
+                                                     ["nanos", "docker"]))
+        loads = spec.get("loads", {"all": None})
+        repetitions = spec.get("repetitions", matrix.get("repetitions", 1))
+        for repetition in range(repetitions):
+            for load, connections in loads.items():
+                for platform in platforms:
+                    cells.append(Cell(workload, platform, load,
+                                      connections, repetition))
+    return cells
+
+
+def order_cells(cells, order="interleaved", seed=None):
+    """Order ``cells`` so platform drift does not land on one platform.
+
+    - ``sequential``: every run of one platform before the next, per
+      workload (how the run scripts used to do it),
+    - ``interleaved``: platforms alternate within each load and
+      repetition, and the platform that goes first swaps every block
+      (ABBA), which cancels a linear drift,
+    - ``randomized``: loads are shuffled within each repetition and
+      platforms within each block, from ``seed``.
+    """
+    if order not in ORDERS:
+        raise ValueError(f"unknown order {order!r}, choose from {', '.join(ORDERS)}")
+    if order == "sequential":
+        workloads = list(dict.fromkeys(c.workload for c in cells))
+        platforms = list(dict.fromkeys(c.platform for c in cells))
+        return sorted(cells, key=lambda c: (workloads.index(c.workload),
+                                            platforms.index(c.platform)))
+
+    rng = random.Random(seed)
+    blocks = {}
+    for cell in cells:
+        blocks.setdefault((cell.workload, cell.repetition), {}).setdefault(
+            cell.load, []).append(cell)
+    ordered = []
+    flip = False
+    for (workload, repetition), loads in blocks.items():
+        names = list(loads)
+        if order == "randomized":
+            rng.shuffle(names)
+        for name in names:
+            block = list(loads[name])
+            if order == "randomized":
+                rng.shuffle(block)
+            elif flip:
+                block.reverse()
+            flip = not flip
+            ordered.extend(block)
+    return ordered
+
+
+class Checkpoint:
+    """JSON-lines record of finished cells.
+
+    One line is appended (and synced) per finished cell; a line torn by a
+    crash is ignored on reading. Only cells recorded as ``done`` count as
+    finished, so failed cells are retried on the next run.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        torn = False
+        try:
+            with open(path) as f:
+                for line in f:
+                    torn = not line.endswith("\n")
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    self.entries[entry["cell"]] = entry
+        except FileNotFoundError:
+            pass
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._file = open(path, "a")
+        if torn:
+            # end the torn line so the next entry starts on its own
+            self._file.write("\n")
+
+    def done(self, cell, key=None):
+        """True if ``cell`` finished, with inputs hashing to ``key``."""
+        entry = self.entries.get(cell_id(cell))
+        return (entry is not None and entry["status"] == "done"
+                and entry.get("key") == key)
+
+    def record(self, cell, status, **fields):
+        entry = {"cell": cell_id(cell), "status": status, **cell._asdict(),
+                 "time": time.time(), **fields}
+        self._file.write(json.dumps(entry) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.entries[entry["cell"]] = entry
+        return entry
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class FakeDriver:
+    """Stand-in platform driver that only records what it was asked to run.
+
+    Each cell sleeps ``duration`` seconds and writes its description to
+    ``cell.json`` in the cell's output directory. Cells whose id is in
+    ``fail`` raise ``RuntimeError``.
+    """
+
+    def __init__(self, duration=0.0, fail=()):
+        self.duration = duration
+        self.fail = set(fail)
+        self.calls = []
+
+    def run(self, cell, out_dir):
+        self.calls.append(cell)
+        time.sleep(self.duration)
+        if cell_id(cell) in self.fail:
+            raise RuntimeError(f"{cell_id(cell)} failed")
+        with open(os.path.join(out_dir, "cell.json"), "w") as f:
+            json.dump(cell._asdict(), f)
+        return {"files": ["cell.json"]}
+
+
+class ScriptDriver:
+    """Run a cell with its category's ``run_script.py <platform>``.
+
+    The cell's connection levels are passed in ``NANOS_EVAL_CONNECTIONS``,
+    its id in ``NANOS_EVAL_CELL`` and its pair's in ``NANOS_EVAL_PAIR``.
+    Everything the run wrote to the category's ``metrics`` directory is
+    then copied into the cell's output directory, so later cells do not
+    overwrite it.
+    """
+
+    def __init__(self, categories, python=sys.executable):
+        self.categories = categories
+        self.python = python
+
+    def run(self, cell, out_dir):
+        directory = self.categories[cell.workload]
+        env = dict(os.environ, **{CELL_ENV: cell_id(cell),
+                                  PAIR_ENV: pair_id(cell)})
+        if cell.connections is not None:
+            env[CONNECTIONS_ENV] = ",".join(str(c) for c in cell.connections)
+        started = time.time()
+        subprocess.run([self.python, "run_script.py", cell.platform],
+                       cwd=directory, env=env, check=True)
+        return {"files": _copy_since(os.path.join(directory, "metrics"),
+                                     out_dir, started)}
+
+
+def _copy_since(src, dst, since):
+    copied = []
+    for parent, _, names in os.walk(src):
+        if os.path.relpath(parent, src).split(os.sep)[0] == "matrix":
+            continue
+        for name in names:
+            path = os.path.join(parent, name)
+            if os.path.getmtime(path) < since:
+                continue
+            relative = os.path.relpath(path, src)
+            os.makedirs(os.path.dirname(os.path.join(dst, relative)),
+                        exist_ok=True)
+            shutil.copy2(path, os.path.join(dst, relative))
+            copied.append(relative)
+    return sorted(copied)
+
+
+def mark_run(platform, metrics_dir="metrics"):
+    """Note which matrix pair the platform's files in ``metrics_dir`` are from.
+
+    Outside a matrix the note is removed, so files of a later manual run
+    are never mistaken for a matrix cell's.
+    """
+    path = os.path.join(metrics_dir, f"{platform}_cell.json")
+    pair = os.environ.get(PAIR_ENV)
+    if pair is None:
+        if os.path.exists(path):
+            os.remove(path)
+        return
+    with open(path, "w") as f:
+        json.dump({"cell": os.environ.get(CELL_ENV), "pair": pair}, f)
+
+
+def same_pair(platforms, metrics_dir="metrics"):
+    """True if every platform's latest run in ``metrics_dir`` is one pair.
+
+    The category ``metrics`` directory is shared by every matrix cell, so
+    the other platform's files there may come from a different load or
+    repetition. Runs made outside a matrix all count as one pair.
+    """
+    pairs = set()
+    for platform in platforms:
+        try:
+            with open(os.path.join(metrics_dir, f"{platform}_cell.json")) as f:
+                pairs.add(json.load(f)["pair"])
+        except (FileNotFoundError, ValueError, KeyError):
+            pairs.add(None)
+    return len(pairs) == 1
+
+
+def select_loads(loads, connections=None):
+    """The steps of ``loads`` at the given connection levels.
+
+    ``connections`` defaults to the levels in ``NANOS_EVAL_CONNECTIONS``;
+    with neither, ``loads`` is returned unchanged. Warm-up steps are kept.
+    """
+    if connections is None:
+        value = os.environ.get(CONNECTIONS_ENV)
+        if not value:
+            return loads
+        connections = [int(c) for c in value.split(",")]
+    return [load for load in loads
+            if load.get("warm_up") or load["connection"] in connections]
+
+
+def run_matrix(cells, driver, checkpoint, out_dir="metrics/matrix",
+               keep_going=True, cache=None, force=False):
+    """Run every cell the checkpoint has not seen finish, in order.
+
+    Each cell gets ``<out_dir>/<cell id>`` for its results. With a
+    :class:`~nanos_eval.cache.ResultCache`, a cell whose inputs hash to a
+    cached result is restored from it instead of run (unless ``force``),
+    and every cell that does run is added to it. A failing cell is
+    recorded as ``failed`` and, with ``keep_going``, the matrix moves on
+    to the next one. Returns ``(ran, cached, skipped, failed)`` counts.
+    """
+    ran = cached = skipped = failed = 0
+    for index, cell in enumerate(cells, 1):
+        name = cell_id(cell)
+        key = inputs = None
+        if cache is not None:
+            key, inputs = cache.key(cell)
+        if checkpoint.done(cell, key) and not force:
+            skipped += 1
+            continue
+        cell_dir = os.path.join(out_dir, name)
+        os.makedirs(cell_dir, exist_ok=True)
+        if cache is not None and not force and cache.has(key):
+            cached += 1
+            files = cache.restore(key, cell_dir)
+            checkpoint.record(cell, "done", key=key, cached=True,
+                              results=cell_dir, files=files)
+            print(f"♻️ [{index}/{len(cells)}] {name} unchanged, "
+                  f"restored from cache")
+            continue
+        print(f"🚀 [{index}/{len(cells)}] {name}{_why(checkpoint, cell, cache)}")
+        started = time.time()
+        try:
+            result = driver.run(cell, cell_dir) or {}
+        except Exception as e:
+            failed += 1
+            checkpoint.record(cell, "failed", key=key, started=started,
+                              finished=time.time(), error=str(e))
+            print(f"⚠️ {name} failed: {e}")
+            if not keep_going:
+                raise
+            continue
+        ran += 1
+        if cache is not None:
+            cache.store(key, inputs, cell_dir)
+        checkpoint.record(cell, "done", key=key, started=started,
+                          finished=time.time(), results=cell_dir, **result)
+    print(f"✅ Matrix complete: {ran} ran, {cached} from cache, "
+          f"{skipped} already done, {failed} failed")
+    return ran, cached, skipped, failed
+
+
+def _why(checkpoint, cell, cache):
+    """`` (changed: ...)`` when an earlier result of the cell is stale."""
+    entry = checkpoint.entries.get(cell_id(cell))
+    if cache is None or entry is None or not entry.get("key"):
+        return ""
+    old = cache.manifest(entry["key"])
+    if old is None:
+        return ""
+    changed = changed_inputs(old, cache.inputs(cell))
+    return f" (changed: {', '.join(changed)})" if changed else ""
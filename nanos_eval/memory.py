@@ -0,0 +1,209 @@
+"""Memory accounting with the same definitions for the VM and the container.
+
+The ``Memory`` column of the usage logs means different things on the
+two platforms. For nanos it is the QEMU RSS less the starting RSS of
+``ops``. For Docker it is the cgroup's ``memory.current``, which also
+counts the page cache. The samplers here report each part separately,
+defined the same way on both sides:
+
+- ``Mem Anon``: resident anonymous memory (QEMU ``RssAnon``; cgroup
+  ``anon``). Guest RAM that has been touched shows up here.
+- ``Mem File``: resident file-backed and shared memory mapped by the
+  processes (QEMU ``RssFile + RssShmem``; cgroup ``file_mapped``).
+- ``Mem Cache``: page cache charged to the workload but not mapped
+  (cgroup ``file - file_mapped``). It is always 0 for QEMU, whose guest
+  keeps its page cache inside guest RAM.
+- ``Mem USS`` / ``Mem PSS``: unique and proportional set size, summed
+  over the QEMU process or over every process in the container's
+  ``cgroup.procs``, from ``/proc/<pid>/smaps_rollup``.
+- ``Minor Faults/s`` / ``Major Faults/s``: page-fault rates (QEMU
+  ``minflt``/``majflt``; cgroup ``pgfault``/``pgmajfault``).
+
+``smaps_rollup`` walks the page tables, so USS and PSS are read only
+every ``every`` samples and repeated in between. Every value is a float;
+values that cannot be read (``smaps_rollup`` of another user's process,
+say) are NaN.
+"""
+import math
+import os
+import time
+
+from .cgroup import _read_keyed
+from .samplers import Sampler
+
+MEMORY_COLUMNS = ("Mem Anon", "Mem File", "Mem Cache", "Mem USS", "Mem PSS",
+                  "Minor Faults/s", "Major Faults/s")
+
+# Raw sampler column -> processed usage log column (bytes become MB).
+PROCESSED_COLUMNS = {"Mem Anon": "Anon(MB)", "Mem File": "File(MB)",
+                     "Mem Cache": "Page Cache(MB)", "Mem USS": "USS(MB)",
+                     "Mem PSS": "PSS(MB)", "Minor Faults/s": "Minor Faults/s",
+                     "Major Faults/s": "Major Faults/s"}
+
+# Processed columns compared across platforms, headline first.
+COMPARABLE_COLUMNS = ("PSS(MB)", "USS(MB)", "Anon(MB)", "File(MB)",
+                      "Page Cache(MB)", "Minor Faults/s", "Major Faults/s")
+
+_CGROUP_KEYS = ("anon", "file", "file_mapped", "pgfault", "pgmajfault")
+
+_SMAPS_FIELDS = {b"Pss:": "pss", b"Private_Clean:": "uss",
+                 b"Private_Dirty:": "uss", b"Private_Hugetlb:": "uss"}
+
+
+def read_smaps_rollup(pid):
+    """``(uss, pss)`` bytes of ``pid``, or None if it cannot be read."""
+    totals = {"uss": 0, "pss": 0}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", "rb") as f:
+            for line in f:
+                field = _SMAPS_FIELDS.get(line.split(None, 1)[0])
+                if field:
+                    totals[field] += int(line.split()[1]) * 1024
+    except (FileNotFoundError, ProcessLookupError, PermissionError):
+        return None
+    return totals["uss"], totals["pss"]
+
+
+class _MemorySampler(Sampler):
+    columns = MEMORY_COLUMNS
+
+    def __init__(self, every=10, buffer_size=16384):
+        self.every = every
+        self._buf = bytearray(buffer_size)
+        self._count = 0
+        self._sets = (math.nan, math.nan)
+        self._last = None
+        self._row = [0.0] * len(MEMORY_COLUMNS)
+
+    def _pread(self, fd):
+        size = os.preadv(fd, [self._buf], 0)
+        return bytes(self._buf[:size])
+
+    def _set_sizes(self):
+        uss = pss = 0
+        read = False
+        for pid in self.pids():
+            sizes = read_smaps_rollup(pid)
+            if sizes is not None:
+                uss, pss, read = uss + sizes[0], pss + sizes[1], True
+        return (float(uss), float(pss)) if read else (math.nan, math.nan)
+
+    def sample(self):
+        now = time.monotonic()
+        anon, mapped, cache, minor, major = self.counters()
+        if self._count % self.every == 0:
+            self._sets = self._set_sizes()
+        self._count += 1
+        row = self._row
+        row[0], row[1], row[2] = float(anon), float(mapped), float(cache)
+        row[3], row[4] = self._sets
+        if self._last is not None and now > self._last[0]:
+            elapsed = now - self._last[0]
+            row[5] = round((minor - self._last[1]) / elapsed, 1)
+            row[6] = round((major - self._last[2]) / elapsed, 1)
+        self._last = (now, minor, major)
+        return row
+
+
+class ProcessMemorySampler(_MemorySampler):
+    """Memory of one process (QEMU) from its ``/proc`` files."""
+
+    def __init__(self, pid, every=10):
+        super().__init__(every)
+        self.pid = pid
+        try:
+            self._stat = os.open(f"/proc/{pid}/stat", os.O_RDONLY)
+            self._status = os.open(f"/proc/{pid}/status", os.O_RDONLY)
+        except FileNotFoundError:
+            raise ProcessLookupError(f"process no longer exists (pid={pid})")
+
+    def pids(self):
+        return [self.pid]
+
+    def counters(self):
+        try:
+            stat = self._pread(self._stat)
+            status = self._pread(self._status)
+        except ProcessLookupError:
+            raise ProcessLookupError(
+                f"process no longer exists (pid={self.pid})")
+        fields = stat[stat.rindex(b")") + 2:].split()
+        if fields[0] in (b"Z", b"X"):
+            raise ProcessLookupError(f"process exited (pid={self.pid})")
+        rss = {}
+        for line in status.splitlines():
+            if line.startswith(b"Rss"):
+                key, value = line.split(b":", 1)
+                rss[key] = int(value.split()[0]) * 1024
+        return (rss.get(b"RssAnon", 0),
+                rss.get(b"RssFile", 0) + rss.get(b"RssShmem", 0), 0,
+                int(fields[7]), int(fields[9]))
+
+    def close(self):
+        for fd in (self._stat, self._status):
+            os.close(fd)
+        self._stat = self._status = None
+
+
+class CgroupMemorySampler(_MemorySampler):
+    """Memory of a container from its cgroup v2 ``memory.stat``."""
+
+    def __init__(self, cgroup_dir, every=10):
+        super().__init__(every)
+        self.cgroup_dir = cgroup_dir
+        self._stat = os.open(os.path.join(cgroup_dir, "memory.stat"),
+                             os.O_RDONLY)
+
+    def pids(self):
+        try:
+            with open(os.path.join(self.cgroup_dir, "cgroup.procs")) as f:
+                return [int(pid) for pid in f.read().split()]
+        except FileNotFoundError:
+            return []
+
+    def counters(self):
+        try:
+            stat = _read_keyed(self._pread(self._stat), _CGROUP_KEYS)
+        except OSError as e:
+            raise ProcessLookupError(
+                f"cgroup {self.cgroup_dir} is gone: {e}") from e
+        mapped = stat["file_mapped"]
+        return (stat["anon"], mapped, max(stat["file"] - mapped, 0),
+                stat["pgfault"], stat["pgmajfault"])
+
+    def close(self):
+        if self._stat is not None:
+            os.close(self._stat)
+            self._stat = None
+
+
+def memory_sampler(pid=None, cgroup_dir=None, every=10):
+    """The memory sampler for a container's cgroup or else a process.
+
+    Returns None where neither can be read (no ``/proc``, e.g. macOS).
+    """
+    if cgroup_dir is not None:
+        return CgroupMemorySampler(cgroup_dir, every)
+    if pid is not None and os.path.isdir(f"/proc/{pid}"):
+        return ProcessMemorySampler(pid, every)
+    return None
+
+
+def comparable_columns(first_log, second_log):
+    """The ``COMPARABLE_COLUMNS`` both processed usage logs have values in.
+
+    A column that is all NaN in either log is left out. That happens to
+    the Docker side's ``PSS(MB)`` and ``USS(MB)`` when the harness may not
+    read the container processes' ``smaps_rollup`` (not running as root),
+    and the headline then falls back to ``Anon(MB)``.
+    """
+    # imported here so the samplers stay light
+    import pandas as pd
+
+    logs = []
+    for log in (first_log, second_log):
+        header = set(pd.read_csv(log, nrows=0).columns)
+        columns = [c for c in COMPARABLE_COLUMNS if c in header]
+        values = pd.read_csv(log, usecols=columns)
+        logs.append({c for c in columns if values[c].notna().any()})
+    return [c for c in COMPARABLE_COLUMNS if c in logs[0] and c in logs[1]]
@@ -0,0 +1,53 @@
+import time
+from collections import namedtuple
+
+from .scheduler import FixedIntervalScheduler
+from .storage import open_writer
+from .threads import thread_logs
+
+MonitorStats = namedtuple("MonitorStats", ["samples", "missed", "columns"])
+
+
+def run_monitor(samplers, log_file, interval, keep_running=None,
+                batch_size=256, metadata=None):
+    """Sample every sampler each ``interval`` seconds into ``log_file``.
+
+    Each row starts with a wall-clock ``Time Stamp`` followed by the
+    columns of every sampler in order. Sampling stops when
+    ``keep_running()`` returns False or when a sampler's target exits.
+    A ``.col`` log is written in the binary columnar format of
+    :mod:`nanos_eval.storage` with ``metadata`` in its header; anything
+    else is written as CSV. Per-thread records of a
+    :class:`~nanos_eval.threads.ThreadSampler` go to its ``thread_log``.
+    """
+    columns = ["Time Stamp"]
+    for sampler in samplers:
+        columns.extend(sampler.columns)
+
+    metadata = dict(metadata or {}, interval=interval, started=time.time(),
+                    samplers=[type(sampler).__name__ for sampler in samplers])
+
+    scheduler = FixedIntervalScheduler(interval)
+    samples = 0
+    logs = thread_logs(samplers)
+    with open_writer(log_file, columns, metadata, batch_size) as writer:
+        try:
+            for _ in scheduler.ticks():
+                if keep_running is not None and not keep_running():
+                    break
+                row = [time.time()]
+                for sampler in samplers:
+                    row.extend(sampler.sample())
+                writer.write(row)
+                for sampler, log in logs:
+                    for tid, cpu in sampler.threads:
+                        log.write(row[0], tid, cpu)
+                samples += 1
+        except ProcessLookupError as e:
+            print(f"Error: {e}")
+        finally:
+            for sampler in samplers:
+                sampler.close()
+            for _, log in logs:
+                log.close()
+    return MonitorStats(samples, scheduler.missed, columns)
@@ -0,0 +1,97 @@
+from .events import load_events
+from .samplers import Sampler
+
+# Phase value while no LOADS step is running (startup, pauses, teardown).
+PHASE_IDLE = -1
+
+
+class PhaseSampler(Sampler):
+    """Tag each sample with the benchmark's current phase.
+
+    ``phase`` is a ``multiprocessing.Value("i")`` that the benchmark
+    process sets to the index of the running ``LOADS`` step (or
+    ``PHASE_IDLE``); reading it is a plain shared-memory load.
+    """
+
+    columns = ("Phase",)
+
+    def __init__(self, phase):
+        self.phase = phase
+        self._row = [PHASE_IDLE]
+
+    def sample(self):
+        self._row[0] = self.phase.value
+        return self._row
+
+
+def phase_summary(usage_log, events_file, loads, out_file):
+    """Per-phase resource use and efficiency of one run.
+
+    Joins the ``Phase``-tagged samples of a processed usage log with the
+    request counts the benchmark logged as ``step_done`` events. For every
+    phase it reports the mean CPU%, peak memory, CPU-seconds used
+    (CPU% integrated over the sample intervals), requests, requests per
+    CPU-second and requests per MB of peak memory. Steps of the same
+    connection level are also combined into ``<out_file>`` with a
+    ``_levels`` suffix. Returns the per-phase frame.
+    """
+    # imported here so the sampling side (PhaseSampler) stays light
+    import numpy as np
+    import pandas as pd
+
+    df = pd.read_csv(usage_log, usecols=["Time Elapsed", "CPU%",
+                                         "Memory(KB)", "Phase"])
+    elapsed = df["Time Elapsed"].to_numpy(dtype=np.float64)
+    steps = np.diff(elapsed)
+    dt = np.append(steps, np.median(steps) if len(steps) else 0.0)
+    df["dt"] = dt
+    df["cpu_s"] = df["CPU%"].to_numpy(dtype=np.float64) / 100.0 * dt
+
+    phases = df.groupby("Phase")
+    summary = pd.DataFrame({
+        "samples": phases.size(),
+        "duration_s": phases["dt"].sum(),
+        "mean_cpu": phases["CPU%"].mean(),
+        "peak_memory_mb": phases["Memory(KB)"].max() / 1024.0,
+        "cpu_seconds": phases["cpu_s"].sum(),
+    })
+    summary.index = summary.index.astype(int)
+    requests = {e["step"]: e["requests"] for e in load_events(events_file)
+                if e["event"] == "step_done"}
+    summary["connection"] = pd.array(
+        [loads[p]["connection"] if 0 <= p < len(loads) else None
+         for p in summary.index], dtype="Int64")
+    summary["warm_up"] = [bool(loads[p].get("warm_up"))
+                          if 0 <= p < len(loads) else False
+                          for p in summary.index]
+    summary["requests"] = [requests.get(p, 0) for p in summary.index]
+    summary = _efficiency(summary)
+    summary.to_csv(out_file, index_label="phase")
+
+    levels = summary[(summary.index != PHASE_IDLE) & ~summary["warm_up"]]
+    levels = levels.groupby("connection").agg(
+        steps=("samples", "size"), duration_s=("duration_s", "sum"),
+        peak_memory_mb=("peak_memory_mb", "max"),
+        cpu_seconds=("cpu_seconds", "sum"), requests=("requests", "sum"))
+    levels.insert(2, "mean_cpu",
+                  levels["cpu_seconds"] / levels["duration_s"] * 100.0)
+    levels = _efficiency(levels)
+    levels_file = out_file.replace(".csv", "_levels.csv")
+    levels.to_csv(levels_file)
+    for connection, row in levels.iterrows():
+        print(f"📊 {connection} connections: {row['requests_per_cpu_second']:.0f} "
+              f"requests/CPU-s, {row['requests_per_mb']:.0f} requests/MB, "
+              f"mean CPU {row['mean_cpu']:.1f}%, peak {row['peak_memory_mb']:.1f} MB")
+    print(f"📄 Phase metrics saved to {out_file} (per level in {levels_file})")
+    return summary
+
+
+def _efficiency(frame):
+    import numpy as np
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        frame["requests_per_sec"] = frame["requests"] / frame["duration_s"]
+        frame["requests_per_cpu_second"] = (frame["requests"]
+                                            / frame["cpu_seconds"])
+        frame["requests_per_mb"] = frame["requests"] / frame["peak_memory_mb"]
+    return frame
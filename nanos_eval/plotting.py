@@ -0,0 +1,261 @@
+"""Every usage figure of the harness, rendered headless and in parallel.
+
+Figures are described as :class:`Figure` jobs (what to draw, from which
+input files, into which PNG) and drawn by :func:`render_figures` in a
+process pool on the Agg backend. A figure is skipped when its PNG exists
+and a hash of its inputs and options matches the one stored beside it
+(``.<name>.png.sha``) by the last render.
+"""
+import glob
+import hashlib
+import multiprocessing
+import os
+from collections import namedtuple
+
+import matplotlib
+
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from .align import align_logs  # noqa: E402
+from .memory import comparable_columns  # noqa: E402
+
+Figure = namedtuple("Figure", ["kind", "inputs", "plot_path", "options"])
+
+COMPARATIVE_DIR = "metrics/plots/comparitive"
+
+
+def _finish(title, ylabel, plot_path):
+    plt.title(title)
+    plt.xlabel("Time Elapsed (s)")
+    plt.ylabel(ylabel)
+    plt.legend()
+    plt.grid(True)
+    plt.tight_layout()
+    plt.savefig(plot_path)
+    plt.close()
+
+
+def draw_usage(log_file, process_name, plot_path):
+    """CPU and memory of a single processed usage log."""
+    df = pd.read_csv(log_file, usecols=["Time Elapsed", "CPU%", "Memory(MB)"])
+    plt.figure(figsize=(12, 6))
+    plt.plot(df["Time Elapsed"], df["CPU%"],
+             label=f"{process_name} CPU Usage (%)")
+    plt.plot(df["Time Elapsed"], df["Memory(MB)"],
+             label=f"{process_name} Memory Usage (MB)")
+    _finish(f"{process_name} Resource Usage Over Time", "Usage", plot_path)
+
+
+def draw_comparison(first_log, second_log, first_events, second_events,
+                    column, labels, title, ylabel, plot_path):
+    """One column of two usage logs, aligned on their load start."""
+    first_df, second_df = align_logs([first_log, second_log],
+                                     [first_events, second_events],
+                                     columns=[column])
+    plt.figure(figsize=(12, 6))
+    plt.plot(first_df["Time Elapsed"], first_df[column], label=labels[0],
+             marker='o')
+    plt.plot(second_df["Time Elapsed"], second_df[column], label=labels[1],
+             marker='x')
+    plt.ylim(0, None)  # Set y-axis limit to start from 0
+    _finish(title, ylabel, plot_path)
+
+
+def draw_smp_scaling(vm_log, container_log, vm_events, container_events,
+                     labels, plot_path):
+    """How many cores each platform keeps busy over time.
+
+    The VM side is drawn as a stack of its per-vCPU utilisation (from the
+    ``vCPUn%`` columns), the container side as a line of its total CPU%,
+    both in units of cores.
+    """
+    vm_df, container_df = align_logs([vm_log, container_log],
+                                     [vm_events, container_events])
+    vcpu_cols = [c for c in vm_df.columns if c.startswith("vCPU")]
+    plt.figure(figsize=(12, 6))
+    plt.stackplot(vm_df["Time Elapsed"],
+                  *(vm_df[c].fillna(0) / 100.0 for c in vcpu_cols),
+                  labels=[f"{labels[0]} {c.rstrip('%')}" for c in vcpu_cols],
+                  alpha=0.6)
+    if "IO%" in vm_df.columns:
+        plt.plot(vm_df["Time Elapsed"], vm_df["IO%"] / 100.0, linestyle="--",
+                 label=f"{labels[0]} I/O threads")
+    plt.plot(container_df["Time Elapsed"], container_df["CPU%"] / 100.0,
+             color="black", label=f"{labels[1]} total")
+    plt.ylim(0, None)
+    _finish("Guest SMP Scaling (cores busy)", "Cores", plot_path)
+
+
+RENDERERS = {
+    "usage": draw_usage,
+    "comparison": draw_comparison,
+    "smp_scaling": draw_smp_scaling,
+}
+
+
+def events_file(process):
+    """Events file of a ``(usage log, label[, events file])`` tuple."""
+    return (process[2] if len(process) > 2
+            else f"metrics/{process[1]}_events.jsonl")
+
+
+def usage_figure(log_file, process_name):
+    return Figure("usage", (log_file,),
+                  f"metrics/plots/{process_name}_usage_plot.png",
+                  {"process_name": process_name})
+
+
+def comparison_figures(first_process, second_process,
+                       plot_dir=COMPARATIVE_DIR):
+    """CPU, memory and (when the VM log has vCPU columns) SMP figures.
+
+    Each process is ``(usage log, label[, events file])``; both series
+    are aligned on the load start recorded in the events files. Memory is
+    compared on the matched breakdown of :mod:`nanos_eval.memory` (PSS
+    first) when both logs carry it, and on ``Memory(MB)`` otherwise.
+    """
+    first, second = first_process[1], second_process[1]
+    inputs = (first_process[0], second_process[0],
+              events_file(first_process), events_file(second_process))
+    figures = [
+        Figure("comparison", inputs,
+               f"{plot_dir}/{first}_vs_{second}_cpu_usage.png",
+               {"column": "CPU%",
+                "labels": [f"{first} CPU Usage (%)", f"{second} CPU Usage (%)"],
+                "title": "Comparative CPU Usage Over Time",
+                "ylabel": "CPU Usage (%)"}),
+    ]
+    memory = comparable_columns(first_process[0], second_process[0])
+    if not memory:
+        figures.append(Figure(
+            "comparison", inputs,
+            f"{plot_dir}/{first}_vs_{second}_memory_usage.png",
+            {"column": "Memory(MB)",
+             "labels": [f"{first} Memory Usage (MB)",
+                        f"{second} Memory Usage (MB)"],
+             "title": "Comparative Memory Usage Over Time",
+             "ylabel": "Memory Usage (MB)"}))
+    for index, column in enumerate(memory):
+        name, _, unit = column.partition("(")
+        unit = unit.rstrip(")") or "per s"
+        name = name.replace("/s", "").strip()
+        suffix = ("memory_usage" if index == 0
+                  else name.lower().replace(" ", "_"))
+        figures.append(Figure(
+            "comparison", inputs,
+            f"{plot_dir}/{first}_vs_{second}_{suffix}.png",
+            {"column": column,
+             "labels": [f"{first} {name} ({unit})",
+                        f"{second} {name} ({unit})"],
+             "title": f"Comparative {name} Over Time",
+             "ylabel": f"{name} ({unit})"}))
+    # guest SMP scaling when the VM log carries a per-vCPU breakdown
+    header = pd.read_csv(second_process[0], nrows=0).columns
+    if any(c.startswith("vCPU") for c in header):
+        figures.append(Figure(
+            "smp_scaling",
+            (inputs[1], inputs[0], inputs[3], inputs[2]),
+            f"{plot_dir}/{second}_vs_{first}_smp_scaling.png",
+            {"labels": [second, first]}))
+    return figures
+
+
+def metrics_figures(metrics_dir="metrics", baseline="docker",
+                    plot_dir=COMPARATIVE_DIR):
+    """Every figure for the usage logs found in ``metrics_dir``.
+
+    Paths in the returned figures are relative to ``metrics_dir``'s
+    parent, like the ones the run scripts use.
+    """
+    root = os.path.dirname(os.path.abspath(metrics_dir))
+    logs = {}
+    for path in sorted(glob.glob(os.path.join(metrics_dir, "*_usage_log.csv"))):
+        name = os.path.basename(path)[:-len("_usage_log.csv")]
+        logs[name] = os.path.relpath(path, root)
+    figures = [usage_figure(log, name) for name, log in logs.items()]
+    if baseline in logs:
+        for name, log in logs.items():
+            if name == baseline:
+                continue
+            # Nginx monitors nanos under the "ops" name
+            events = f"metrics/{'nanos' if name == 'ops' else name}_events.jsonl"
+            figures.extend(comparison_figures(
+                (logs[baseline], baseline), (log, name, events), plot_dir))
+    return root, figures
+
+
+def _input_hash(figure):
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr((figure.kind, sorted(figure.options.items()))).encode())
+    for path in figure.inputs:
+        try:
+            with open(path, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(block)
+        except FileNotFoundError:
+            digest.update(b"\0missing")
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def _stamp_path(plot_path):
+    head, tail = os.path.split(plot_path)
+    return os.path.join(head, f".{tail}.sha")
+
+
+def _render(figure):
+    os.makedirs(os.path.dirname(figure.plot_path) or ".", exist_ok=True)
+    RENDERERS[figure.kind](*figure.inputs, plot_path=figure.plot_path,
+                           **figure.options)
+    return figure.plot_path
+
+
+def render_figures(figures, workers=None, force=False):
+    """Render ``figures``, skipping those whose inputs are unchanged.
+
+    Figures are drawn in a pool of ``workers`` processes (default: one per
+    CPU, capped at the number of figures to draw). Returns the paths that
+    were rendered.
+    """
+    pending = []
+    for figure in figures:
+        digest = _input_hash(figure)
+        stamp = _stamp_path(figure.plot_path)
+        if not force and os.path.exists(figure.plot_path):
+            try:
+                with open(stamp) as f:
+                    if f.read() == digest:
+                        continue
+            except FileNotFoundError:
+                pass
+        pending.append((figure, digest))
+
+    workers = max(1, min(workers or os.cpu_count(), len(pending)))
+    jobs = [figure for figure, _ in pending]
+    if workers == 1:
+        rendered = [_render(figure) for figure in jobs]
+    else:
+        with multiprocessing.Pool(workers) as pool:
+            rendered = pool.map(_render, jobs)
+    for figure, digest in pending:
+        with open(_stamp_path(figure.plot_path), "w") as f:
+            f.write(digest)
+    for path in rendered:
+        print(f"📈 Plot saved to {path}")
+    skipped = len(figures) - len(pending)
+    if skipped:
+        print(f"📈 {skipped} plot(s) unchanged, skipped")
+    return rendered
+
+
+def plot_metrics(log_file, process_name):
+    """Plot CPU and memory of a single processed usage log."""
+    return render_figures([usage_figure(log_file, process_name)])
+
+
+def comparative_plot(first_process, second_process, plot_dir=COMPARATIVE_DIR):
+    """Render the comparative figures of two platforms' usage logs."""
+    return render_figures(comparison_figures(first_process, second_process,
+                                             plot_dir))
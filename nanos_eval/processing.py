@@ -0,0 +1,174 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from .memory import PROCESSED_COLUMNS
+from .storage import follow_frames, iter_frames
+
+# Rows per chunk when post-processing a raw log. Bounds memory use on long
+# soak runs independently of how many samples were taken.
+CHUNK_ROWS = 250_000
+
+
+class UsageSummary:
+    """Running count/mean/std/min/max per column, in constant memory."""
+
+    def __init__(self):
+        self._count = None
+        self._sum = None
+        self._sumsq = None
+        self._min = None
+        self._max = None
+
+    def update(self, df):
+        values = df.astype("float64")
+        count, total = values.count(), values.sum()
+        sumsq = (values * values).sum()
+        low, high = values.min(), values.max()
+        if self._count is None:
+            self._count, self._sum, self._sumsq = count, total, sumsq
+            self._min, self._max = low, high
+        else:
+            self._count = self._count + count
+            self._sum = self._sum + total
+            self._sumsq = self._sumsq + sumsq
+            self._min = np.fmin(self._min, low)
+            self._max = np.fmax(self._max, high)
+
+    def to_frame(self):
+        if self._count is None:
+            return pd.DataFrame(columns=["count", "mean", "std", "min", "max"])
+        mean = self._sum / self._count
+        var = (self._sumsq - self._count * mean * mean) / (self._count - 1)
+        return pd.DataFrame({
+            "count": self._count,
+            "mean": mean,
+            "std": np.sqrt(var.clip(lower=0)),
+            "min": self._min,
+            "max": self._max,
+        })
+
+
+class UsageProcessor:
+    """Convert raw sample chunks into the processed usage log as they come.
+
+    ``feed()`` takes a DataFrame chunk of the raw log, transforms it with
+    column-wise operations only and appends it to ``final_log`` while
+    updating :attr:`summary`. With ``counters=True`` the chunk holds the
+    cumulative Docker stats counters (``TotalUsage``, ``SystemUsage``,
+    ``MemoryUsage``); the last row of each chunk is carried over so CPU%
+    deltas are exact across chunk boundaries.
+    """
+
+    def __init__(self, final_log, start_mem_kb, start_timestamp,
+                 counters=False, num_cores=None):
+        self.final_log = final_log
+        self.start_mem_kb = start_mem_kb
+        self.start_timestamp = start_timestamp
+        self.counters = counters
+        self.num_cores = num_cores or os.cpu_count()
+        self.summary = UsageSummary()
+        self.rows = 0
+        self._prev = None
+        self._out = open(final_log, "w", newline="")
+        self._header = True
+
+    def _cpu_from_counters(self, raw):
+        total = raw["TotalUsage"].to_numpy(dtype="float64")
+        system = raw["SystemUsage"].to_numpy(dtype="float64")
+        first = self._prev if self._prev is not None else (total[0], system[0])
+        cpu_delta = np.diff(total, prepend=first[0])
+        sys_delta = np.diff(system, prepend=first[1])
+        self._prev = (total[-1], system[-1])
+        cpu = np.zeros_like(cpu_delta)
+        busy = sys_delta > 0
+        cpu[busy] = cpu_delta[busy] / sys_delta[busy] * self.num_cores * 100.0
+        return cpu
+
+    def feed(self, raw):
+        if raw.empty:
+            return
+        df = pd.DataFrame({
+            "Time Elapsed": raw["Time Stamp"] - self.start_timestamp,
+            "Time Stamp": raw["Time Stamp"]})
+        if self.counters:
+            df["CPU%"] = self._cpu_from_counters(raw)
+            df["Memory(KB)"] = raw["MemoryUsage"] // 1024
+        else:
+            df["CPU%"] = raw["CPU"]
+            df["Memory(KB)"] = ((raw["Memory(KB)"] // 1024)
+                                - (self.start_mem_kb // 1024))
+        df["Memory(MB)"] = df["Memory(KB)"] // 1024
+        # Per-thread breakdowns (vCPUn%, IO%, ...) and the benchmark phase
+        # are carried through as-is.
+        for column in raw.columns:
+            if column.endswith("%") and column != "CPU%":
+                df[column] = raw[column]
+        # the matched memory breakdown (see nanos_eval.memory), in MB
+        for column, processed in PROCESSED_COLUMNS.items():
+            if column in raw.columns:
+                df[processed] = (raw[column] / 1048576
+                                 if column.startswith("Mem ") else raw[column])
+        if "Phase" in raw.columns:
+            df["Phase"] = raw["Phase"]
+
+        df.to_csv(self._out, header=self._header, index=False)
+        self._header = False
+        self.summary.update(df.drop(columns=["Time Elapsed", "Time Stamp",
+                                             "Phase"], errors="ignore"))
+        self.rows += len(df)
+
+    def close(self):
+        if not self._out.closed:
+            self._out.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def _process_log(frames, process_name, processor_args):
+    final_log = f"metrics/{process_name}_usage_log.csv"
+    # raw and final logs may share a path, so write beside it first
+    tmp_log = f"{final_log}.tmp"
+    with UsageProcessor(tmp_log, *processor_args) as processor:
+        for chunk in frames:
+            processor.feed(chunk)
+    os.replace(tmp_log, final_log)
+
+    summary_log = f"metrics/{process_name}_usage_summary.csv"
+    processor.summary.to_frame().to_csv(summary_log, index_label="metric")
+    print(f"📄 Processed metrics saved to {final_log} "
+          f"({processor.rows} rows, summary in {summary_log})")
+    return final_log
+
+
+def process_metrics(raw_log, start_mem_kb, start_timestamp, process_name,
+                    chunksize=CHUNK_ROWS):
+    """Turn a raw sample log (CSV or ``.col``) into the per-run usage log."""
+    return _process_log(iter_frames(raw_log, chunksize), process_name,
+                        (start_mem_kb, start_timestamp))
+
+
+def follow_metrics(raw_log, start_mem_kb, start_timestamp, process_name,
+                   keep_running, chunksize=CHUNK_ROWS, poll_interval=0.5):
+    """:func:`process_metrics` on a ``.col`` log that is still being written.
+
+    Chunks are processed as the monitor flushes them (see
+    :func:`~nanos_eval.storage.follow_frames`), so the usage log and its
+    summary are ready as soon as ``keep_running()`` turns False, and a
+    long run never holds more than ``chunksize`` rows.
+    """
+    frames = follow_frames(raw_log, keep_running, chunksize, poll_interval)
+    return _process_log(frames, process_name,
+                        (start_mem_kb, start_timestamp))
+
+
+def process_docker_metrics(raw_log, start_timestamp, process_name,
+                           num_cores=None, chunksize=CHUNK_ROWS):
+    """Turn a raw Docker stats log into the per-run usage log."""
+    return _process_log(iter_frames(raw_log, chunksize), process_name,
+                        (0, start_timestamp, True, num_cores))
@@ -0,0 +1,247 @@
+import asyncio
+import multiprocessing
+import time
+from array import array
+
+import numpy as np
+
+from .histogram import LatencyHistogram
+
+COMMANDS = ("GET", "SET", "INCR", "LPUSH", "HSET")
+
+# Connection-level failures, counted apart from ``-ERR`` replies:
+# ``connect`` attempts, commands ``read`` lost to a reset, ``reply`` errors
+# and commands left ``unsent`` once every connection gave up.
+ERROR_KINDS = ("connect", "read", "reply", "unsent")
+
+KEY_FORMAT = "key:{:012d}"
+
+
+def _bulk(*parts):
+    """Encode a command as a RESP array of bulk strings."""
+    out = [b"*%d\r\n" % len(parts)]
+    for part in parts:
+        out.append(b"$%d\r\n%s\r\n" % (len(part), part))
+    return b"".join(out)
+
+
+def encode_command(command, key, value):
+    """RESP bytes for one benchmark command on ``key``."""
+    if command == "GET":
+        return _bulk(b"GET", key)
+    if command == "SET":
+        return _bulk(b"SET", key, value)
+    if command == "INCR":
+        return _bulk(b"INCR", b"counter:" + key)
+    if command == "LPUSH":
+        return _bulk(b"LPUSH", b"list:" + key, value)
+    if command == "HSET":
+        return _bulk(b"HSET", b"hash:" + key, b"field", value)
+    raise ValueError(f"unsupported command {command!r}")
+
+
+def key_indices(count, keyspace, distribution="uniform", zipf_s=0.99,
+                seed=None):
+    """Draw ``count`` key indices in ``[0, keyspace)``.
+
+    ``"zipfian"`` follows a bounded Zipf law (``P(k) ~ 1 / (k + 1) ** s``)
+    sampled by inverse CDF, so a few hot keys get most of the traffic.
+    """
+    rng = np.random.default_rng(seed)
+    if distribution == "uniform":
+        return rng.integers(0, keyspace, count)
+    if distribution == "zipfian":
+        weights = 1.0 / np.arange(1, keyspace + 1) ** zipf_s
+        cdf = np.cumsum(weights)
+        cdf /= cdf[-1]
+        return np.searchsorted(cdf, rng.random(count))
+    raise ValueError(f"unknown key distribution {distribution!r}")
+
+
+async def _read_reply(reader):
+    """Consume one RESP reply; return True if it was an error reply."""
+    line = await reader.readuntil(b"\r\n")
+    kind = line[:1]
+    if kind == b"$":
+        size = int(line[1:-2])
+        if size >= 0:
+            await reader.readexactly(size + 2)
+        return False
+    if kind == b"*":
+        error = False
+        for _ in range(max(int(line[1:-2]), 0)):
+            error |= await _read_reply(reader)
+        return error
+    return kind == b"-"
+
+
+async def _connection(host, port, commands, ops, cursor, pipeline,
+                      latencies, errors, kinds, connect_retries):
+    """Send pipelined batches from the shared ``cursor`` until exhausted.
+
+    A refused connection is retried every 10 ms, and the connection gives
+    up after ``connect_retries`` failures in a row. A reset or truncated
+    reply loses the unanswered commands of the batch, which count as
+    ``read`` errors of their command, and the connection reconnects.
+    """
+    clock = time.perf_counter_ns
+    writer = None
+    failures = 0
+    try:
+        while cursor[0] < len(commands):
+            if writer is None:
+                try:
+                    reader, writer = await asyncio.open_connection(host, port)
+                except OSError:
+                    kinds["connect"] += 1
+                    failures += 1
+                    if failures > connect_retries:
+                        return
+                    await asyncio.sleep(0.01)
+                    continue
+                failures = 0
+            first = cursor[0]
+            last = min(first + pipeline, len(commands))
+            cursor[0] = last
+            start = clock()
+            i = first
+            try:
+                writer.write(b"".join(commands[first:last]))
+                for i in range(first, last):
+                    error = await _read_reply(reader)
+                    op = ops[i]
+                    latencies[op].append((clock() - start) // 1000)
+                    if error:
+                        errors[op] += 1
+                        kinds["reply"] += 1
+            except (OSError, ValueError, asyncio.IncompleteReadError,
+                    asyncio.LimitOverrunError):
+                for lost in range(i, last):
+                    errors[ops[lost]] += 1
+                kinds["read"] += last - i
+                writer.close()
+                writer = None
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def _run_worker(job):
+    """Run one event loop's share of the requests (in a worker process)."""
+    (host, port, connections, requests, mix, pipeline, value_size,
+     keyspace, distribution, seed, start_at, connect_retries) = job
+    names = list(mix)
+    weights = np.array([mix[name] for name in names], dtype=np.float64)
+    rng = np.random.default_rng(seed)
+    ops = rng.choice(len(names), size=requests, p=weights / weights.sum())
+    keys = key_indices(requests, keyspace, distribution, seed=rng)
+    value = b"x" * value_size
+    commands = [encode_command(names[op], KEY_FORMAT.format(key).encode(),
+                               value) for op, key in zip(ops, keys)]
+    ops = ops.tolist()
+    latencies = [array("q") for _ in names]
+    errors = [0] * len(names)
+    kinds = dict.fromkeys(ERROR_KINDS, 0)
+    cursor = [0]
+
+    async def main():
+        delay = start_at - time.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        started = time.time()
+        await asyncio.gather(*(
+            _connection(host, port, commands, ops, cursor, pipeline,
+                        latencies, errors, kinds, connect_retries)
+            for _ in range(connections)))
+        return started, time.time()
+
+    started, finished = asyncio.run(main())
+    # what is left once every connection ran out of connect retries
+    for lost in range(cursor[0], len(commands)):
+        errors[ops[lost]] += 1
+    kinds["unsent"] += len(commands) - cursor[0]
+    return (names, [lat.tobytes() for lat in latencies], errors, kinds,
+            started, finished)
+
+
+def run_resp_load(host, port, connections, requests, mix=None, pipeline=1,
+                  value_size=3, keyspace=100_000, distribution="uniform",
+                  workers=1, seed=None, connect_retries=100):
+    """Drive a Redis-compatible server and return per-command results.
+
+    ``requests`` commands drawn from ``mix`` (command name -> weight, one
+    of ``COMMANDS``; default an even SET/GET split) are sent over
+    ``connections`` connections, ``pipeline`` at a time per connection,
+    on ``keyspace`` keys chosen with a ``"uniform"`` or ``"zipfian"``
+    distribution. Connections and requests are split across ``workers``
+    processes, which all start at the same instant. Command payloads are
+    built before the clock starts.
+
+    Returns a dict with ``elapsed_s`` (from the common start to the last
+    worker's end), ``requests``, ``errors`` (counts per kind in
+    ``ERROR_KINDS``) and ``tests``: one entry per command with its
+    ``requests`` (replies received), ``rps``, ``errors`` (error replies,
+    and commands lost to a reset or never sent) and latency
+    ``histogram``.
+    """
+    mix = dict(mix or {"SET": 1, "GET": 1})
+    workers = max(1, min(workers, connections))
+    seeds = np.random.SeedSequence(seed).spawn(workers)
+    # give forked workers a moment so they all start at the same instant
+    start_at = time.time() + (0.25 if workers > 1 else 0.0)
+    jobs = [(host, port,
+             connections // workers + (i < connections % workers),
+             requests // workers + (i < requests % workers),
+             mix, pipeline, value_size, keyspace, distribution, seeds[i],
+             start_at, connect_retries)
+            for i in range(workers)]
+    if workers == 1:
+        outputs = [_run_worker(jobs[0])]
+    else:
+        with multiprocessing.Pool(workers) as pool:
+            outputs = pool.map(_run_worker, jobs)
+
+    # a worker that missed the start (slow to fork) starts the clock late
+    elapsed = (max(output[5] for output in outputs)
+               - min(output[4] for output in outputs))
+    tests = {name: {"histogram": LatencyHistogram(), "errors": 0}
+             for name in mix}
+    kinds = dict.fromkeys(ERROR_KINDS, 0)
+    for names, latencies, errors, worker_kinds, _, _ in outputs:
+        for name, data, error_count in zip(names, latencies, errors):
+            tests[name]["histogram"].record_many(
+                np.frombuffer(data, dtype=np.int64))
+            tests[name]["errors"] += error_count
+        for kind, count in worker_kinds.items():
+            kinds[kind] += count
+    for test in tests.values():
+        test["requests"] = test["histogram"].total
+        test["rps"] = test["requests"] / elapsed if elapsed else 0.0
+    return {"elapsed_s": elapsed, "requests": requests, "errors": kinds,
+            "tests": tests}
+
+
+def benchmark_rows(result, connection):
+    """redis-benchmark style CSV rows (``FIELDNAMES``) for each command.
+
+    ``requests`` is the number of replies to that command, not the size
+    of the whole mix.
+    """
+    rows = []
+    for name, test in result["tests"].items():
+        histogram = test["histogram"]
+        p50, p95, p99 = histogram.percentiles([50, 95, 99]) / 1000.0
+        rows.append({
+            "test": name,
+            "rps": round(test["rps"], 2),
+            "avg_latency_ms": round(histogram.mean / 1000.0, 3),
+            "min_latency_ms": (histogram.min or 0) / 1000.0,
+            "p50_latency_ms": round(float(p50), 3),
+            "p95_latency_ms": round(float(p95), 3),
+            "p99_latency_ms": round(float(p99), 3),
+            "max_latency_ms": (histogram.max or 0) / 1000.0,
+            "connection": connection,
+            "requests": test["requests"],
+            "errors": test["errors"],
+        })
+    return rows
@@ -0,0 +1,304 @@
+"""The run and compare flow shared by every category's ``run_script.py``.
+
+A script describes its workload with a :class:`Category` (the ``ops``
+command, the Docker image and ports, the load generator and the result
+files to compare) and hands it to :func:`main`:
+
+- ``run_script.py`` runs nanos and then Docker, and compares them,
+- ``run_script.py nanos`` (or ``docker``) runs one platform, and compares
+  it with the other platform's latest run when that is of the same pair,
+- ``run_script.py startup [nanos] [docker]`` measures startup instead.
+
+Every run is sampled by a sidecar, processed, plotted and ingested into
+the warehouse. pandas and matplotlib are only imported once the run is
+over, so they stay off the path to launching and sampling the VM.
+"""
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+
+import psutil
+
+from .affinity import Pinning
+from .cgroup import container_sampler
+from .discovery import wait_for_child
+from .memory import memory_sampler
+from .monitor import run_monitor
+from .phases import PHASE_IDLE, PhaseSampler, phase_summary
+from .samplers import DockerStatsSampler, process_sampler
+from .sidecar import run_sidecar_monitor
+from .startup import run_startup_bench
+from .threads import ThreadSampler, config_cpus
+from .trace import follow_console, profile_console
+
+PLATFORMS = ("nanos", "docker")
+DOCKER_CPUS = 4
+STARTUP_RUNS = 10
+DOCKER_STATS_INTERVAL = 1.0  # fallback Docker stats stream updates once a second
+
+
+def qemu_name():
+    if sys.platform == "linux" or sys.platform == "linux2":
+        return "qemu-system-x86_64"
+    return "qemu-system-aarch64"
+
+
+class Category:
+    """What a category runs on each platform and how the two compare.
+
+    ``benchmark(platform, phase)`` is the category's load generator and
+    ``loads`` its ``LOADS``; without one the workload runs until it
+    exits and no cores are kept for a load generator. ``docker_options``
+    are extra ``containers.run`` arguments (``ports``, ``mem_limit``).
+    ``port``, ``probe`` and ``publish`` (the ``docker run -p`` mapping)
+    are for the startup benchmark. ``results`` are the
+    :func:`~nanos_eval.stats.compare_files` arguments of the result files,
+    with ``{}`` for the platform: ``(files, keys, metrics, output)``.
+    ``log_name`` names the nanos logs (Nginx logs as ``ops``).
+    """
+
+    def __init__(self, workload, nanos_command, image, interval,
+                 benchmark=None, loads=None, docker_options=None, port=None,
+                 probe=None, publish=None, results=None, log_name="nanos",
+                 docker_stats=False):
+        self.workload = workload
+        self.nanos_command = nanos_command
+        self.image = image
+        self.interval = interval
+        self.benchmark = benchmark
+        self.loads = loads
+        self.docker_options = docker_options or {}
+        self.port = port
+        self.probe = probe
+        self.publish = publish
+        self.results = results
+        self.log_name = log_name
+        # sample `docker stats` when the container's cgroup is not readable
+        self.docker_stats = docker_stats
+
+    def follow_output(self, stream, console_log):
+        """Drain the ``ops`` console; returns what :meth:`finish` takes."""
+        return follow_console(stream, console_log)
+
+    def follow_container(self, container):
+        return None
+
+    def finish(self, platform, follower):
+        """Called once a platform's run and its monitor are done."""
+        if follower is not None:
+            follower.join(timeout=10)
+
+    def compare_results(self):
+        if self.results:
+            # imported here so the samplers stay light
+            from .stats import compare_files
+
+            files, keys, metrics, output = self.results
+            compare_files(files.format("docker"), files.format("nanos"),
+                          keys, metrics, output)
+
+
+def monitor(category, start_mem_kb, running_process, process_name, pinning,
+            platform, container=None, vcpus=None, sampler=None, launch=None):
+    start_timestamp = time.time()
+    log_file = f"metrics/raw_{process_name}_usage_log.col"
+
+    print(f"Monitoring {process_name} PID: {running_process.pid}")
+    pinning.pin_self()
+    samplers = []
+    keep_running = running_process.is_running
+    if category.benchmark is not None:
+        # the benchmark publishes the index of its running LOADS step here
+        phase = multiprocessing.Value("i", PHASE_IDLE, lock=False)
+        load = multiprocessing.Process(target=category.benchmark,
+                                       args=(platform, phase))
+        load.start()
+        # its load workers are started later and inherit the core set
+        pinning.pin(load.pid, "load")
+        samplers.append(PhaseSampler(phase))
+        keep_running = load.is_alive
+    samplers.extend(pinning.samplers())
+    metadata = {"pinning": pinning.plan, "launch": launch}
+    stats_stream = (container is not None and sampler is None
+                    and category.docker_stats)
+    if stats_stream:
+        # the stats stream paces itself at one update a second, far too
+        # coarse for sampling in-process to disturb it
+        stats = run_monitor([DockerStatsSampler(container), *samplers],
+                            log_file, DOCKER_STATS_INTERVAL,
+                            keep_running=keep_running, metadata=metadata)
+    else:
+        # the same memory definitions for QEMU and the container's cgroup
+        memory = memory_sampler(running_process.pid,
+                                sampler.cgroup_dir if sampler else None)
+        threads = ThreadSampler(
+            running_process.pid, vcpus,
+            thread_log=f"metrics/{process_name}_threads_log.csv"
+        ) if vcpus else None
+        own = [sampler or process_sampler(running_process), memory, threads]
+        stats = run_sidecar_monitor(
+            [s for s in own if s is not None] + samplers, log_file,
+            category.interval, keep_running=keep_running, metadata=metadata,
+            cpus=pinning.cpus("monitor"))
+    pinning.record(f"metrics/{process_name}_pinning.json")
+    if category.benchmark is not None:
+        # the load is done; a workload without one has already exited
+        if container is not None:
+            container.kill()
+        else:
+            running_process.kill()
+    print(
+        f"Monitoring {running_process.is_running()}")
+    print(f"✅ Monitoring complete. {stats.samples} samples "
+          f"({stats.missed} missed ticks). Log saved to {log_file}")
+    from .plotting import plot_metrics
+    from .processing import process_docker_metrics, process_metrics
+    if stats_stream:
+        final_log = process_docker_metrics(log_file, start_timestamp,
+                                           process_name)
+    else:
+        final_log = process_metrics(log_file, start_mem_kb, start_timestamp,
+                                    process_name)
+    if category.benchmark is not None:
+        phase_summary(final_log, f"metrics/{platform}_events.jsonl",
+                      category.loads, f"metrics/{process_name}_phases.csv")
+    plot_metrics(final_log, process_name)
+    return final_log
+
+
+def run_docker(category, process_name="docker"):
+    print(f"Starting {process_name} : Image Name {category.image}")
+    import docker
+    client = docker.from_env()
+    pinning = Pinning(DOCKER_CPUS, load=1 if category.benchmark else 0)
+    container = client.containers.run(
+        image=category.image,
+        detach=True,
+        remove=True,
+        cpu_count=DOCKER_CPUS,
+        cpuset_cpus=pinning.cpuset(),
+        name="sdk_monitor_container",
+        **category.docker_options
+    )
+    print(f"✅ Container started with ID: {container.id}")
+    follower = category.follow_container(container)
+    container.reload()
+    container_process = psutil.Process(container.attrs["State"]["Pid"])
+    pinning.watch(container_process.pid, "sut")
+    sampler = container_sampler(container)
+    # cgroup memory already covers the whole container; the starting RSS is
+    # only subtracted when falling back to sampling its main process.
+    start_mem = 0 if sampler else container_process.memory_info().rss
+    monitor(category, start_mem, container_process, process_name, pinning,
+            "docker", container=container, sampler=sampler)
+    return category.finish("docker", follower)
+
+
+def run_nanos(category):
+    vcpus = config_cpus()
+    pinning = Pinning(vcpus, load=1 if category.benchmark else 0)
+    launched = time.time()
+    # ops and the QEMU it starts inherit the system under test's cores
+    original_process = subprocess.Popen(category.nanos_command,
+                                        stdout=subprocess.PIPE,
+                                        stderr=subprocess.STDOUT,
+                                        preexec_fn=pinning.preexec())
+    # the guest's trace and debugsyscalls output, profiled after the run
+    console_log = f"metrics/{category.log_name}_console.log"
+    follower = category.follow_output(original_process.stdout, console_log)
+    running_pid = original_process.pid
+    process = psutil.Process(running_pid)
+    print(f"✅ Command started with PID: {running_pid}")
+
+    qemu = wait_for_child(running_pid, qemu_name())
+    if qemu is None:
+        print("QEMU process not found!")
+        original_process.terminate()
+        return
+    print(f"✅ QEMU started with PID: {qemu.pid}, "
+          f"{(qemu.started - launched) * 1000:.0f} ms after launch")
+    launch = {"launched": launched, "qemu_started": qemu.started,
+              "qemu_seen": qemu.seen}
+    starting_memory = process.memory_info().rss
+    pinning.pin(qemu.pid, "sut")
+
+    final_log = monitor(category, starting_memory, psutil.Process(qemu.pid),
+                        category.log_name, pinning, "nanos", vcpus=vcpus,
+                        launch=launch)
+    results = category.finish("nanos", follower)
+    profile_console(console_log, category.log_name, usage_log=final_log)
+    return results
+
+
+def run_startup(category, platforms):
+    launches = {
+        "nanos": {"command": category.nanos_command,
+                  "child_name": qemu_name()},
+        "docker": {
+            "command": ["docker", "run", "--rm", "--name",
+                        "sdk_startup_container", "-p", category.publish,
+                        category.image],
+            "stop_command": ["docker", "rm", "-f", "sdk_startup_container"],
+        },
+    }
+    os.makedirs("metrics/startup", exist_ok=True)
+    for platform in platforms:
+        print(f"Measuring {platform} startup over {STARTUP_RUNS} launches")
+        run_startup_bench(
+            runs=STARTUP_RUNS,
+            log_file=f"metrics/startup/startup_{platform}.csv",
+            port=category.port, probe=category.probe, **launches[platform])
+
+
+def compare(category, platforms):
+    """Ingest the runs, then compare both platforms' latest files."""
+    # imported here so the samplers stay light
+    from .matrix import mark_run, same_pair
+    from .memory import comparable_columns
+    from .stats import compare_files
+    from .warehouse import ingest_run
+
+    for platform in platforms:
+        ingest_run(category.workload, platform)
+        mark_run(platform)
+    docker_log = ("metrics/docker_usage_log.csv", "docker")
+    nanos_log = (f"metrics/{category.log_name}_usage_log.csv",
+                 category.log_name, "metrics/nanos_events.jsonl")
+    if not all(os.path.exists(log[0]) for log in (docker_log, nanos_log)):
+        # only one platform has run so far, nothing to compare yet
+        return
+    if not same_pair(list(PLATFORMS)):
+        # a matrix cell: the other platform's files are from another cell
+        print("⚠️ The other platform's last run in metrics/ is from a "
+              "different matrix cell, skipping the comparison")
+        return
+    # the category's own plot_usage.py, next to its run_script.py
+    from plot_usage import comparative_plot
+    comparative_plot(docker_log, nanos_log)
+    category.compare_results()
+    memory = comparable_columns(docker_log[0], nanos_log[0])
+    compare_files(docker_log[0], nanos_log[0], [],
+                  ["CPU%", *(memory or ["Memory(KB)"])],
+                  "metrics/usage_comparison.csv")
+
+
+def main(category, args=None):
+    """Run ``run_script.py [nanos|docker|startup [platforms...]]``."""
+    args = sys.argv[1:] if args is None else args
+    if args[:1] == ["startup"]:
+        if category.port is None:
+            sys.exit(f"{category.workload} has no startup benchmark")
+        run_startup(category, args[1:] or PLATFORMS)
+        return
+    if args:
+        platforms = ["nanos" if args[0] == "nanos" else "docker"]
+    else:
+        platforms = list(PLATFORMS)
+    for platform in platforms:
+        if platform == "nanos":
+            run_nanos(category)
+        else:
+            run_docker(category)
+    compare(category, platforms)
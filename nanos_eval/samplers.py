@@ -0,0 +1,80 @@
+import os
+
+import psutil
+
+
+class Sampler:
+    """Base class for monitor samplers.
+
+    ``columns`` names the values returned by ``sample()``, in order.
+    ``sample()`` must not block for longer than a sampling interval and
+    raises ``ProcessLookupError`` once its target has gone away.
+    """
+
+    columns = ()
+
+    def sample(self):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class PsutilSampler(Sampler):
+    """CPU% and RSS of a single process, read through psutil.
+
+    ``cpu_percent`` is called with ``interval=None`` so it reports usage
+    since the previous call instead of sleeping inside psutil.
+    """
+
+    columns = ("CPU", "Memory(KB)")
+
+    def __init__(self, process):
+        self.process = process
+        self.process.cpu_percent(interval=None)  # prime the CPU counter
+
+    def sample(self):
+        try:
+            with self.process.oneshot():
+                return (self.process.cpu_percent(interval=None),
+                        self.process.memory_info().rss)
+        except psutil.NoSuchProcess as e:
+            raise ProcessLookupError(str(e)) from e
+
+
+class DockerStatsSampler(Sampler):
+    """Raw cumulative counters from a container's Docker stats stream.
+
+    The stream yields roughly once per second, so ``next()`` paces the
+    sampler by itself; use an interval of at least one second with it.
+    """
+
+    columns = ("TotalUsage", "SystemUsage", "MemoryUsage")
+
+    def __init__(self, container):
+        self.stream = container.stats(decode=True, stream=True)
+
+    def sample(self):
+        try:
+            stat = next(self.stream)
+        except StopIteration:
+            raise ProcessLookupError("container stats stream ended")
+        try:
+            return (stat["cpu_stats"]["cpu_usage"]["total_usage"],
+                    stat["cpu_stats"]["system_cpu_usage"],
+                    stat["memory_stats"]["usage"])
+        except KeyError:
+            # The final object of a stopped container carries no counters.
+            raise ProcessLookupError("container stopped")
+
+
+def process_sampler(process):
+    """Pick the cheapest sampler available for ``process`` on this host.
+
+    Uses :class:`~nanos_eval.procfs.ProcSampler` wherever ``/proc`` exists
+    and falls back to :class:`PsutilSampler` elsewhere (e.g. macOS).
+    """
+    if os.path.isdir(f"/proc/{process.pid}"):
+        from .procfs import ProcSampler
+        return ProcSampler(process.pid)
+    return PsutilSampler(process)
@@ -0,0 +1,35 @@
+import time
+
+
+class FixedIntervalScheduler:
+    """Yield ticks at fixed offsets from a common start time.
+
+    Deadlines are ``start + n * interval`` rather than "sleep ``interval``
+    after each sample", so the time spent sampling never accumulates into
+    drift. Ticks whose deadline has already passed by a whole interval are
+    skipped and counted in ``missed`` instead of firing back to back.
+    """
+
+    def __init__(self, interval, clock=time.monotonic, sleep=time.sleep):
+        if interval <= 0:
+            raise ValueError(f"interval must be positive, got {interval}")
+        self.interval = interval
+        self.clock = clock
+        self.sleep = sleep
+        self.missed = 0
+
+    def ticks(self):
+        start = self.clock()
+        tick = 0
+        while True:
+            yield tick
+            tick += 1
+            now = self.clock()
+            late = now - (start + tick * self.interval)
+            if late >= self.interval:
+                skipped = int(late // self.interval)
+                self.missed += skipped
+                tick += skipped
+            delay = start + tick * self.interval - now
+            if delay > 0:
+                self.sleep(delay)
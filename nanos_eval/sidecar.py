@@ -0,0 +1,222 @@
+"""Sampling from a separate sidecar process.
+
+:func:`run_sidecar_monitor` is a drop-in for
+:func:`~nanos_eval.monitor.run_monitor` that moves the sampling loop out
+of the harness. A forked sidecar process runs the samplers on the
+fixed-interval schedule and stores every row as a fixed-size record in a
+shared-memory :class:`RingBuffer`. It does no formatting and no file
+I/O. The harness drains the buffer every ``drain_interval`` seconds and
+writes the log, so the load generator and the log writer never delay a
+sample. The per-thread records of a
+:class:`~nanos_eval.threads.ThreadSampler` travel through a ring of their
+own and are written to its thread log by the harness too. Each row ends
+with ``Sidecar%``, the CPU the sidecar itself used since the previous
+sample (over at least one interval). This keeps the monitor's own cost
+as its own series.
+"""
+import multiprocessing
+import os
+import signal
+import time
+from multiprocessing import shared_memory
+
+from .monitor import MonitorStats
+from .scheduler import FixedIntervalScheduler
+from .storage import open_writer
+from .threads import thread_logs
+
+SIDECAR_COLUMN = "Sidecar%"
+
+# The write counter, padded to keep the records 8-byte aligned.
+_HEADER_BYTES = 8
+
+
+class RingBuffer:
+    """``slots`` float64 records of ``width`` values in shared memory.
+
+    One process writes with :meth:`put` and one drains with :meth:`drain`.
+    The only shared state is a counter of records written, bumped after
+    each record is stored. A reader that falls more than ``slots``
+    records behind loses the oldest ones, and they are counted in
+    ``dropped``.
+    """
+
+    def __init__(self, width, slots):
+        # imported here so importing the sidecar does not load numpy
+        import numpy as np
+
+        self.width = width
+        self.slots = slots
+        self.shm = shared_memory.SharedMemory(
+            create=True, size=_HEADER_BYTES + slots * width * 8)
+        self._head = np.ndarray((1,), dtype=np.uint64, buffer=self.shm.buf)
+        self._head[0] = 0
+        self._records = np.ndarray((slots, width), dtype=np.float64,
+                                   buffer=self.shm.buf, offset=_HEADER_BYTES)
+        self.tail = 0
+        self.dropped = 0
+
+    def put(self, row):
+        head = int(self._head[0])
+        self._records[head % self.slots] = row
+        self._head[0] = head + 1
+
+    def drain(self):
+        """Copy out every record written since the last drain."""
+        head = int(self._head[0])
+        start = max(self.tail, head - self.slots)
+        self.dropped += start - self.tail
+        block = self._records.take(range(start, head), axis=0, mode="wrap")
+        # records the writer lapped while they were being copied
+        lapped = int(self._head[0]) - self.slots - start
+        if lapped > 0:
+            block = block[lapped:]
+            self.dropped += lapped
+        self.tail = head
+        return block
+
+    def close(self):
+        self._head = self._records = None
+        self.shm.close()
+        self.shm.unlink()
+
+
+def _sidecar(samplers, ring, thread_rings, interval, stop, conn, cpus):
+    # Ctrl-C is for the harness, which stops the sidecar itself.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if cpus:
+        os.sched_setaffinity(0, cpus)
+    scheduler = FixedIntervalScheduler(interval)
+    samples = 0
+    error = None
+    # thread names already sent to the harness, per thread ring
+    named = [len(sampler.names) for sampler, _ in thread_rings]
+    last_cpu = last_time = None
+    try:
+        for _ in scheduler.ticks():
+            if stop.is_set():
+                break
+            if last_time is None:
+                # the first window starts once the setup is done
+                last_cpu, last_time = time.process_time_ns(), time.monotonic()
+            row = [time.time()]
+            for sampler in samplers:
+                row.extend(sampler.sample())
+            for index, (sampler, thread_ring) in enumerate(thread_rings):
+                if len(sampler.names) > named[index]:
+                    # names only grow, so the new ones come last
+                    conn.send(("names", index,
+                               list(sampler.names.items())[named[index]:]))
+                    named[index] = len(sampler.names)
+                for tid, cpu in sampler.threads:
+                    thread_ring.put((row[0], tid, cpu))
+            cpu, now = time.process_time_ns(), time.monotonic()
+            row.append((cpu - last_cpu) / 1e7 / max(now - last_time, interval))
+            last_cpu, last_time = cpu, now
+            if not samples:
+                # which columns are floats, so the log keeps integer ones
+                conn.send(("types", [isinstance(v, float) for v in row]))
+            ring.put(row)
+            samples += 1
+    except ProcessLookupError as e:
+        error = str(e)
+    finally:
+        for sampler in samplers:
+            sampler.close()
+        conn.send(("done", samples, scheduler.missed, error))
+        conn.close()
+
+
+def run_sidecar_monitor(samplers, log_file, interval, keep_running=None,
+                        batch_size=256, metadata=None, drain_interval=0.25,
+                        slots=None, cpus=None, thread_slots=64):
+    """Like :func:`~nanos_eval.monitor.run_monitor`, sampling in a sidecar.
+
+    The samplers are handed to a forked sidecar process, so their open
+    ``/proc`` files carry over, and they are closed in the harness.
+    ``keep_running()`` is checked by the harness on every drain. The ring
+    holds ``slots`` records, by default a minute of samples (at least
+    4096), and each thread ring room for ``thread_slots`` threads per
+    sample. With ``cpus``, the sidecar pins itself to those CPUs.
+    """
+    columns = ["Time Stamp"]
+    for sampler in samplers:
+        columns.extend(sampler.columns)
+    columns.append(SIDECAR_COLUMN)
+    metadata = dict(metadata or {}, interval=interval, started=time.time(),
+                    samplers=[type(sampler).__name__ for sampler in samplers],
+                    sidecar=True, sidecar_cpus=cpus)
+
+    slots = slots or max(4096, int(60 / interval))
+    ring = RingBuffer(len(columns), slots)
+    # (time, tid, cpu) records of each sampler with a thread log
+    thread_rings = [(sampler, RingBuffer(3, slots * thread_slots))
+                    for sampler in samplers
+                    if getattr(sampler, "thread_log", None) is not None]
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("fork" if "fork" in methods else None)
+    stop = context.Event()
+    receiver, sender = context.Pipe(duplex=False)
+    sidecar = context.Process(target=_sidecar,
+                              args=(samplers, ring, thread_rings, interval,
+                                    stop, sender, cpus),
+                              daemon=True)
+    sidecar.start()
+    sender.close()
+    for sampler in samplers:
+        sampler.close()
+    # opened only now, so the sidecar never holds (or writes) their files
+    logs = thread_logs(sampler for sampler, _ in thread_rings)
+
+    state = {"types": None, "done": None}
+
+    def drain(writer):
+        # copied out before reading the names sent ahead of these records
+        threads = [thread_ring.drain() for _, thread_ring in thread_rings]
+        rows = ring.drain()
+        while receiver.poll():
+            try:
+                message = receiver.recv()
+            except EOFError:
+                break
+            if message[0] == "names":
+                logs[message[1]][1].names.update(message[2])
+            else:
+                state[message[0]] = message[1:]
+        if state["types"] is not None:
+            floats = state["types"][0]
+            for values in rows.tolist():
+                writer.write([v if is_float else int(v)
+                              for v, is_float in zip(values, floats)])
+        for (_, log), block in zip(logs, threads):
+            for timestamp, tid, cpu in block.tolist():
+                log.write(timestamp, int(tid), cpu)
+
+    with open_writer(log_file, columns, metadata, batch_size) as writer:
+        try:
+            while sidecar.is_alive() and (keep_running is None
+                                          or keep_running()):
+                time.sleep(drain_interval)
+                drain(writer)
+        finally:
+            stop.set()
+            sidecar.join(timeout=max(5.0, 4 * interval))
+            if sidecar.is_alive():
+                sidecar.terminate()
+                sidecar.join()
+            drain(writer)
+            receiver.close()
+            dropped = ring.dropped
+            ring.close()
+            for _, thread_ring in thread_rings:
+                thread_ring.close()
+            for _, log in logs:
+                log.close()
+
+    samples, missed, error = state["done"] or (0, 0, "sidecar died")
+    if error:
+        print(f"Error: {error}")
+    if dropped:
+        print(f"⚠️ {dropped} samples dropped: the ring buffer was not "
+              f"drained in time")
+    return MonitorStats(samples - dropped, missed, columns)
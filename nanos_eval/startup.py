@@ -0,0 +1,206 @@
+import csv
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import time
+
+from .discovery import exit_waiter, find_child
+
+STAGES = ("spawn", "child", "forward", "response")
+
+_HTTP_REQUEST = (b"GET / HTTP/1.1\r\nHost: localhost\r\n"
+                 b"Connection: close\r\n\r\n")
+_RESP_PING = b"*1\r\n$4\r\nPING\r\n"
+
+
+def probe_http(sock):
+    """True once the server answers a GET with an HTTP status line."""
+    sock.sendall(_HTTP_REQUEST)
+    return sock.recv(16).startswith(b"HTTP/")
+
+
+def probe_resp(sock):
+    """True once a Redis server answers PING."""
+    sock.sendall(_RESP_PING)
+    return sock.recv(16).startswith(b"+PONG")
+
+
+PROBES = {"http": probe_http, "resp": probe_resp}
+
+
+def _elapsed_ms(start_ns):
+    return (time.perf_counter_ns() - start_ns) / 1e6
+
+
+def _stop(proc, stop_command):
+    try:
+        os.killpg(proc.pid, signal.SIGTERM)
+        proc.wait(timeout=10)
+    except ProcessLookupError:
+        pass
+    except subprocess.TimeoutExpired:
+        os.killpg(proc.pid, signal.SIGKILL)
+        proc.wait()
+    if stop_command:
+        subprocess.run(stop_command, stdout=subprocess.DEVNULL,
+                       stderr=subprocess.DEVNULL)
+
+
+def measure_startup(command, host="127.0.0.1", port=None, probe=None,
+                    child_name=None, stop_command=None, timeout=60.0,
+                    poll_interval=0.0005, max_interval=0.01,
+                    probe_timeout=1.0):
+    """Launch ``command`` once and time each startup stage.
+
+    Returns a dict of milliseconds since launch for every stage in
+    ``STAGES`` (None for stages that were not reached or not asked for):
+
+    - ``spawn``: ``Popen`` returned,
+    - ``child``: a descendant whose name contains ``child_name`` (the
+      ``qemu-system-*`` process of ``ops run``) exists, found through the
+      launcher's ``/proc`` children lists
+      (:func:`~nanos_eval.discovery.find_child`),
+    - ``forward``: a TCP connection to ``host:port`` is accepted. With
+      QEMU's ``hostfwd`` (and Docker's userland proxy) the listener is on
+      the host side and accepts before the service in the guest or
+      container listens, so this is when the port forward is up, not the
+      service,
+    - ``response``: ``probe`` (a key of ``PROBES``) got a valid answer,
+      the first stage that shows the service itself is up.
+
+    Times come from ``perf_counter_ns``, taken as the connect or the
+    probe's read returns. While ``forward`` or ``response`` is pending,
+    the port is tried every ``poll_interval`` (0.5 ms), so both are
+    resolved to that: the price is one connection attempt per poll
+    during the boot, a few percent of a core. Once only ``child`` is left,
+    the interval doubles up to ``max_interval``. Between polls the
+    harness sleeps on a pidfd of the launcher, as
+    :func:`~nanos_eval.discovery.wait_for_child` does, so a launcher that
+    fails ends the wait at once. The command runs in its own session and
+    the whole group is stopped afterwards, followed by ``stop_command``
+    (e.g. ``docker rm -f``) if given.
+    """
+    probe = PROBES[probe] if isinstance(probe, str) else probe
+    result = dict.fromkeys(STAGES)
+    start = time.perf_counter_ns()
+    proc = subprocess.Popen(command, stdout=subprocess.DEVNULL,
+                            stderr=subprocess.DEVNULL, start_new_session=True)
+    result["spawn"] = _elapsed_ms(start)
+
+    wanted = {"child"} if child_name else set()
+    if port is not None:
+        wanted.add("forward")
+        if probe is not None:
+            wanted.add("response")
+    deadline = start + int(timeout * 1e9)
+    wait, close = exit_waiter(proc.pid)
+    interval = poll_interval
+    try:
+        while wanted and time.perf_counter_ns() < deadline:
+            if "child" in wanted:
+                if find_child(proc.pid, child_name) is not None:
+                    result["child"] = _elapsed_ms(start)
+                    wanted.discard("child")
+
+            if "forward" in wanted or "response" in wanted:
+                try:
+                    with socket.create_connection(
+                            (host, port), timeout=probe_timeout) as sock:
+                        if "forward" in wanted:
+                            result["forward"] = _elapsed_ms(start)
+                            wanted.discard("forward")
+                        if "response" in wanted and probe(sock):
+                            result["response"] = _elapsed_ms(start)
+                            wanted.discard("response")
+                except OSError:
+                    pass
+
+            if proc.poll() is not None:
+                break
+            if wanted == {"child"}:
+                wait(interval)
+                interval = min(interval * 2, max_interval)
+            elif wanted:
+                wait(poll_interval)
+    finally:
+        close()
+        _stop(proc, stop_command)
+    return result
+
+
+def wait_ready(host, port, probe=None, timeout=60.0, poll_interval=0.0005,
+               probe_timeout=1.0):
+    """Block until ``host:port`` accepts connections and answers ``probe``.
+
+    Returns the ``time.time()`` at which the service became ready, taken
+    as the answer arrives, or None after ``timeout`` seconds. The port is
+    tried every ``poll_interval`` seconds, which bounds how late that can
+    be, at the cost of a connection attempt per poll while waiting.
+    """
+    probe = PROBES[probe] if isinstance(probe, str) else probe
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection((host, port),
+                                          timeout=probe_timeout) as sock:
+                if probe is None or probe(sock):
+                    return time.time()
+        except OSError:
+            pass
+        time.sleep(poll_interval)
+    return None
+
+
+def summarize(results):
+    """min/p50/p90/max/mean per stage over several launches, in ms."""
+    summary = {}
+    for stage in STAGES:
+        values = sorted(r[stage] for r in results if r[stage] is not None)
+        if not values:
+            continue
+        deciles = (statistics.quantiles(values, n=10, method="inclusive")
+                   if len(values) > 1
+                   else [values[0]] * 9)
+        summary[stage] = {
+            "n": len(values),
+            "min": values[0],
+            "p50": statistics.median(values),
+            "p90": deciles[8],
+            "max": values[-1],
+            "mean": statistics.fmean(values),
+        }
+    return summary
+
+
+def run_startup_bench(command, runs, log_file, cooldown=1.0, **kwargs):
+    """Launch ``command`` ``runs`` times and log every stage of each launch.
+
+    Per-launch timings go to ``log_file`` and the distribution of each
+    stage to the same path with a ``_summary`` suffix. Keyword arguments
+    are passed on to :func:`measure_startup`.
+    """
+    results = []
+    with open(log_file, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["run"] + [f"{stage}_ms" for stage in STAGES])
+        for run in range(runs):
+            result = measure_startup(command, **kwargs)
+            results.append(result)
+            writer.writerow([run] + [result[stage] for stage in STAGES])
+            f.flush()
+            print(f"🚀 Launch {run + 1}/{runs}: " + ", ".join(
+                f"{stage} {result[stage]:.2f} ms" for stage in STAGES
+                if result[stage] is not None))
+            time.sleep(cooldown)
+
+    summary = summarize(results)
+    summary_file = log_file.replace(".csv", "_summary.csv")
+    with open(summary_file, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["stage", "n", "min", "p50", "p90", "max", "mean"])
+        for stage, stats in summary.items():
+            writer.writerow([stage] + list(stats.values()))
+    print(f"📄 Startup timings saved to {log_file} (summary in {summary_file})")
+    return summary
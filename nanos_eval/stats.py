@@ -0,0 +1,209 @@
+"""Statistical comparison of a candidate platform against a baseline.
+
+All tests work on long-format data (one row per observation, tagged with
+its group and platform) and are vectorized over every group at once:
+ranks for Mann-Whitney come from a single lexsort, and bootstrap
+resamples of all groups are drawn and summed together with ``bincount``.
+Only numpy and pandas are needed.
+"""
+import math
+
+import numpy as np
+import pandas as pd
+
+# Cliff's delta thresholds (Romano et al., 2006).
+MAGNITUDES = ((0.147, "negligible"), (0.33, "small"), (0.474, "medium"),
+              (math.inf, "large"))
+
+_UNITS_MS = {"us": 0.001, "ms": 1.0, "s": 1000.0, "m": 60000.0}
+
+_erfc = np.frompyfunc(math.erfc, 1, 1)
+
+
+def mann_whitney(groups, sides, values, n_groups):
+    """Two-sided Mann-Whitney U test in every group.
+
+    ``groups`` holds group codes in ``[0, n_groups)``, ``sides`` 0 for
+    baseline and 1 for candidate observations. Uses the normal
+    approximation with tie and continuity corrections. Returns
+    ``(u, p)``, where ``u`` counts candidate wins (ties as half).
+    """
+    order = np.lexsort((values, groups))
+    g, v, s = groups[order], values[order], sides[order]
+    starts = np.searchsorted(g, np.arange(n_groups))
+    position = np.arange(len(v)) - starts[g]
+    new_tie = np.ones(len(v), dtype=bool)
+    new_tie[1:] = (g[1:] != g[:-1]) | (v[1:] != v[:-1])
+    tie_id = np.cumsum(new_tie) - 1
+    tie_size = np.bincount(tie_id).astype(np.float64)
+    ranks = (position[new_tie] + (tie_size + 1) / 2)[tie_id]
+
+    n1 = np.bincount(g, weights=s, minlength=n_groups)
+    n0 = np.bincount(g, minlength=n_groups) - n1
+    n = n0 + n1
+    u = np.bincount(g, weights=ranks * s, minlength=n_groups) - n1 * (n1 + 1) / 2
+    ties = np.bincount(g[new_tie], weights=tie_size ** 3 - tie_size,
+                       minlength=n_groups)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sigma = np.sqrt(n0 * n1 / 12 * ((n + 1) - ties / (n * (n - 1))))
+        mu = n0 * n1 / 2
+        z = (u - mu - 0.5 * np.sign(u - mu)) / sigma
+    z[~(sigma > 0)] = np.nan
+    p = _erfc(np.abs(z) / math.sqrt(2)).astype(np.float64)
+    return u, p
+
+
+def bootstrap_mean_diff(groups, sides, values, n_groups, n_boot=2000,
+                        confidence=0.95, seed=None, block=4_000_000):
+    """Percentile bootstrap CI of ``mean(candidate) - mean(baseline)``.
+
+    Each platform's observations are resampled with replacement within
+    their group, for all groups in one pass; resamples are drawn
+    ``block`` values at a time to bound memory. Returns ``(low, high)``.
+    """
+    cells = groups * 2 + sides
+    order = np.argsort(cells, kind="stable")
+    v, c = values[order], cells[order]
+    counts = np.bincount(c, minlength=2 * n_groups)
+    starts = np.cumsum(counts) - counts
+    rng = np.random.default_rng(seed)
+    diffs = np.empty((n_boot, n_groups))
+    step = max(1, block // max(len(v), 1))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for first in range(0, n_boot, step):
+            rows = min(step, n_boot - first)
+            index = starts[c] + (rng.random((rows, len(v))) * counts[c]
+                                 ).astype(np.int64)
+            key = (np.arange(rows)[:, None] * 2 * n_groups + c).ravel()
+            sums = np.bincount(key, weights=v[index].ravel(),
+                               minlength=rows * 2 * n_groups)
+            means = sums.reshape(rows, 2 * n_groups) / counts
+            diffs[first:first + rows] = means[:, 1::2] - means[:, 0::2]
+    tail = (1 - confidence) / 2
+    low, high = np.quantile(diffs, [tail, 1 - tail], axis=0)
+    return low, high
+
+
+def holm(p):
+    """Holm-Bonferroni adjusted p-values (NaNs are left out)."""
+    p = np.asarray(p, dtype=np.float64)
+    adjusted = np.full_like(p, np.nan)
+    valid = np.flatnonzero(~np.isnan(p))
+    order = valid[np.argsort(p[valid])]
+    scaled = p[order] * (len(order) - np.arange(len(order)))
+    adjusted[order] = np.minimum(np.maximum.accumulate(scaled), 1.0)
+    return adjusted
+
+
+def magnitude(delta):
+    """Label ``|Cliff's delta|`` as negligible, small, medium or large."""
+    bounds = np.array([bound for bound, _ in MAGNITUDES])
+    labels = np.array([label for _, label in MAGNITUDES])
+    return labels[np.searchsorted(bounds, np.nan_to_num(np.abs(delta)),
+                                  side="right").clip(max=len(labels) - 1)]
+
+
+def to_number(series):
+    """Numeric values of a column, reading wrk-style ``"229.00us"`` as ms."""
+    if pd.api.types.is_numeric_dtype(series):
+        return series.astype(np.float64)
+    parts = series.astype(str).str.extract(r"^\s*([-\d.eE+]+)\s*([a-z]*)\s*$")
+    scale = parts[1].map(_UNITS_MS).fillna(1.0)
+    return pd.to_numeric(parts[0], errors="coerce") * scale
+
+
+def compare(frame, by, value, platform="platform", baseline="docker",
+            candidate="nanos", n_boot=2000, confidence=0.95, alpha=0.05,
+            seed=None):
+    """Compare ``value`` between two platforms within every ``by`` group.
+
+    ``frame`` holds one row per observation (a repetition of a load step,
+    or a monitor sample) with a ``platform`` column. Returns one row per
+    group with both means, the difference and its bootstrap CI, the
+    Mann-Whitney p-value (raw and Holm-adjusted over all groups), Cliff's
+    delta, Hedges' g and a verdict: ``"real"`` when the adjusted p-value
+    is below ``alpha``, the CI excludes zero and the effect is not
+    negligible, ``"noise"`` otherwise.
+
+    Monitor samples of one run are autocorrelated, so for usage logs the
+    intervals are optimistic; repetitions of a load step are the safer
+    unit of comparison.
+    """
+    by = [by] if isinstance(by, str) else list(by)
+    data = frame[frame[platform].isin([baseline, candidate])].copy()
+    data[value] = to_number(data[value])
+    data = data.dropna(subset=[value] + by)
+    if by:
+        groups = data.groupby(by, sort=True).ngroup().to_numpy()
+        keys = data[by].drop_duplicates().sort_values(by).reset_index(drop=True)
+    else:
+        groups = np.zeros(len(data), dtype=np.int64)
+        keys = pd.DataFrame(index=[0])
+    n_groups = len(keys)
+    sides = (data[platform] == candidate).to_numpy().astype(np.int64)
+    values = data[value].to_numpy(dtype=np.float64)
+
+    cells = groups * 2 + sides
+    count = np.bincount(cells, minlength=2 * n_groups).reshape(-1, 2)
+    total = np.bincount(cells, weights=values,
+                        minlength=2 * n_groups).reshape(-1, 2)
+    squares = np.bincount(cells, weights=values ** 2,
+                          minlength=2 * n_groups).reshape(-1, 2)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = total / count
+        var = (squares - count * mean ** 2) / (count - 1)
+        pooled = np.sqrt(((count - 1) * var).sum(axis=1)
+                         / (count.sum(axis=1) - 2))
+        diff = mean[:, 1] - mean[:, 0]
+        rel_diff = diff / mean[:, 0]
+        hedges_g = diff / pooled * (1 - 3 / (4 * count.sum(axis=1) - 9))
+
+        u, p = mann_whitney(groups, sides, values, n_groups)
+        delta = 2 * u / (count[:, 0] * count[:, 1]) - 1
+    low, high = bootstrap_mean_diff(groups, sides, values, n_groups, n_boot,
+                                    confidence, seed)
+    p_holm = holm(p)
+    size = magnitude(delta)
+    real = (p_holm < alpha) & ((low > 0) | (high < 0)) & (size != "negligible")
+
+    result = keys.assign(
+        metric=value,
+        n_baseline=count[:, 0],
+        n_candidate=count[:, 1],
+        mean_baseline=mean[:, 0],
+        mean_candidate=mean[:, 1],
+        diff=diff,
+        rel_diff=rel_diff,
+        ci_low=low,
+        ci_high=high,
+        p_value=p,
+        p_holm=p_holm,
+        cliffs_delta=delta,
+        hedges_g=hedges_g,
+        magnitude=size,
+        verdict=np.where(real, "real", "noise"),
+    )
+    return result
+
+
+def compare_files(baseline_file, candidate_file, by, metrics, out_file,
+                  baseline="docker", candidate="nanos", **kwargs):
+    """Compare ``metrics`` of two result CSVs and save the comparison.
+
+    Keyword arguments are passed on to :func:`compare`.
+    """
+    frame = pd.concat([pd.read_csv(baseline_file).assign(platform=baseline),
+                       pd.read_csv(candidate_file).assign(platform=candidate)],
+                      ignore_index=True)
+    result = pd.concat([compare(frame, by, metric, baseline=baseline,
+                                candidate=candidate, **kwargs)
+                        for metric in metrics], ignore_index=True)
+    result.to_csv(out_file, index=False)
+    by = [by] if isinstance(by, str) else list(by)
+    for row in result.itertuples(index=False):
+        group = "/".join(str(getattr(row, col)) for col in by) or "all"
+        print(f"📊 {row.metric} @ {group}: {candidate} {row.rel_diff:+.1%} "
+              f"vs {baseline} (p={row.p_holm:.3g}, {row.magnitude}) "
+              f"-> {row.verdict}")
+    print(f"📄 Comparison saved to {out_file}")
+    return result
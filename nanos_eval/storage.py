@@ -0,0 +1,214 @@
+"""Append-only binary sample logs.
+
+File layout::
+
+    b"NEVLOG1\\0"            magic, 8 bytes
+    <u4 header length>       4 bytes
+    header                   JSON: columns, dtypes, metadata
+    padding                  up to the next multiple of 8 bytes
+    records                  fixed-width little-endian rows
+
+Every column is ``float64`` (or ``int64`` when the writer is told so) and
+every row has the same size, so appending is a plain ``write`` and the row count follows from the file
+size (a torn final row after a crash is ignored). Loading maps the file
+with ``np.memmap``; each column comes back as a zero-copy view into it.
+"""
+import json
+import os
+import struct
+import time
+
+from .writer import BufferedCSVWriter
+
+MAGIC = b"NEVLOG1\0"
+SUFFIX = ".col"
+
+_DTYPES = {"f8": "<f8", "i8": "<i8"}
+
+
+class ColumnarWriter:
+    """Write sample rows to a binary columnar log.
+
+    Same interface as :class:`~nanos_eval.writer.BufferedCSVWriter`. Rows
+    are copied into a preallocated structured array and written out as raw
+    bytes once ``batch_size`` rows (or ``flush_interval`` seconds) have
+    accumulated. Columns are ``f8`` unless ``dtypes`` says otherwise:
+    sampler values switch between ints and floats from row to row, ``f8``
+    holds integers exactly up to 2**53, and a missing value (None or NaN)
+    is stored as NaN.
+    """
+
+    def __init__(self, path, columns, dtypes=None, metadata=None,
+                 batch_size=4096, flush_interval=5.0):
+        self.path = path
+        self.columns = list(columns)
+        self.metadata = dict(metadata or {})
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.rows_written = 0
+        self._file = open(path, "wb")
+        self._buf = None
+        self._n = 0
+        self._last_flush = time.monotonic()
+        self._start(list(dtypes or ["f8"] * len(self.columns)))
+
+    def _start(self, dtypes):
+        # imported here so CSV logs and ``--help`` never load numpy
+        import numpy as np
+
+        self.dtypes = dtypes
+        header = json.dumps({"columns": self.columns, "dtypes": dtypes,
+                             "metadata": self.metadata}).encode()
+        pad = -(len(MAGIC) + 4 + len(header)) % 8
+        self._file.write(MAGIC + struct.pack("<I", len(header) + pad)
+                         + header + b" " * pad)
+        self._buf = np.zeros(self.batch_size, dtype=_record_dtype(
+            self.columns, dtypes))
+
+    def write(self, row):
+        self._buf[self._n] = tuple(row)
+        self._n += 1
+        if (self._n == self.batch_size or
+                time.monotonic() - self._last_flush >= self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        if self._n:
+            self._file.write(self._buf[:self._n].tobytes())
+            self._file.flush()
+            self.rows_written += self._n
+            self._n = 0
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        if self._file.closed:
+            return
+        self.flush()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def _record_dtype(columns, dtypes):
+    import numpy as np
+
+    return np.dtype([(name, _DTYPES[dtype])
+                     for name, dtype in zip(columns, dtypes)])
+
+
+def read_header(path):
+    """Return ``(columns, dtypes, metadata, data_offset)`` of a log."""
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a columnar sample log")
+        (length,) = struct.unpack("<I", f.read(4))
+        header = json.loads(f.read(length))
+    return (header["columns"], header["dtypes"], header["metadata"],
+            len(MAGIC) + 4 + length)
+
+
+def load_records(path):
+    """Memory-map a log and return ``(records, metadata)``.
+
+    ``records`` is a structured ``np.memmap``; ``records["CPU"]`` and the
+    like are zero-copy views into the file.
+    """
+    import numpy as np
+
+    columns, dtypes, metadata, offset = read_header(path)
+    dtype = _record_dtype(columns, dtypes)
+    rows = (os.path.getsize(path) - offset) // dtype.itemsize
+    if rows == 0:
+        return np.zeros(0, dtype=dtype), metadata
+    return np.memmap(path, dtype=dtype, mode="r", offset=offset,
+                     shape=(rows,)), metadata
+
+
+def load_frame(path):
+    """Load a log as a DataFrame whose columns reference the mapped file."""
+    import pandas as pd
+
+    records, metadata = load_records(path)
+    df = pd.DataFrame({name: records[name] for name in records.dtype.names},
+                      copy=False)
+    df.attrs["metadata"] = metadata
+    return df
+
+
+def iter_frames(path, chunksize):
+    """Yield a sample log, CSV or columnar, as DataFrames of ``chunksize``."""
+    import pandas as pd
+
+    if not path.endswith(SUFFIX):
+        with pd.read_csv(path, chunksize=chunksize) as reader:
+            yield from reader
+        return
+    records, _ = load_records(path)
+    for start in range(0, len(records), chunksize):
+        chunk = records[start:start + chunksize]
+        yield pd.DataFrame({name: chunk[name] for name in chunk.dtype.names},
+                           copy=False)
+
+
+def follow_frames(path, keep_running, chunksize=250_000, poll_interval=0.5):
+    """Yield the rows appended to a columnar log while it is written.
+
+    Only whole rows are read; a row that is still being written waits for
+    the next poll. The header is written with the first row, so an empty
+    or partial file, or none yet, is waited on as well. Stops once
+    ``keep_running()`` returns False and every row written by then has
+    been yielded. At most ``chunksize`` rows are held in memory at a time.
+    """
+    import numpy as np
+    import pandas as pd
+
+    while not os.path.exists(path):
+        if not keep_running():
+            return
+        time.sleep(poll_interval)
+    header = None
+    position = 0
+    with open(path, "rb") as f:
+        while True:
+            # checked before reading so rows written just before the writer
+            # stopped are still picked up by this final read
+            running = keep_running()
+            size = os.fstat(f.fileno()).st_size
+            if header is None and size >= len(MAGIC) + 4:
+                f.seek(len(MAGIC))
+                (length,) = struct.unpack("<I", f.read(4))
+                if size >= len(MAGIC) + 4 + length:
+                    columns, dtypes, _, position = read_header(path)
+                    header = _record_dtype(columns, dtypes)
+            rows = (size - position) // header.itemsize if header else 0
+            if not rows:
+                if not running:
+                    return
+                time.sleep(poll_interval)
+                continue
+            f.seek(position)
+            chunk = np.fromfile(f, dtype=header, count=min(rows, chunksize))
+            position += len(chunk) * header.itemsize
+            yield pd.DataFrame({name: chunk[name] for name in header.names})
+
+
+def export_csv(path, csv_path, chunksize=250_000):
+    """Write a columnar log out as CSV, chunk by chunk."""
+    header = True
+    with open(csv_path, "w", newline="") as f:
+        for chunk in iter_frames(path, chunksize):
+            chunk.to_csv(f, header=header, index=False)
+            header = False
+    return csv_path
+
+
+def open_writer(path, columns, metadata=None, batch_size=256):
+    """Open a sample log writer, picking the format from the file suffix."""
+    if path.endswith(SUFFIX):
+        return ColumnarWriter(path, columns, metadata=metadata,
+                              batch_size=max(batch_size, 4096))
+    return BufferedCSVWriter(path, columns, batch_size)
@@ -0,0 +1,175 @@
+import json
+import os
+import re
+import time
+
+from .procfs import CLK_TCK
+from .samplers import Sampler
+from .writer import BufferedCSVWriter
+
+_VCPU_NAME = re.compile(r"CPU (\d+)/(?:KVM|TCG|HVF)")
+
+THREAD_LOG_COLUMNS = ["Time Stamp", "TID", "Name", "Class", "CPU%"]
+
+
+def classify_thread(pid, tid, name):
+    """Classify a QEMU thread by its comm name.
+
+    Returns ``("vcpu", n)`` for ``CPU n/KVM`` threads, ``("main", None)``
+    for the main loop (the thread group leader), ``("io", None)`` for the
+    thread pool ``worker`` and ``IO ...`` iothreads, and ``("other", None)``
+    for everything else (``call_rcu``, ``vnc_worker``, ...).
+    """
+    match = _VCPU_NAME.match(name)
+    if match:
+        return "vcpu", int(match.group(1))
+    if tid == pid:
+        return "main", None
+    if name.startswith("worker") or name.startswith("IO "):
+        return "io", None
+    return "other", None
+
+
+def config_cpus(config_path="myconfig.json"):
+    """Number of guest CPUs requested in an ops ``myconfig.json``."""
+    try:
+        with open(config_path) as f:
+            config = json.load(f)
+    except (OSError, ValueError):
+        return 1
+    return int(config.get("RunConfig", {}).get("CPUs", 1))
+
+
+class _Task:
+    __slots__ = ("fd", "name", "kind", "index", "last_ticks")
+
+    def __init__(self, fd, name, kind, index):
+        self.fd = fd
+        self.name = name
+        self.kind = kind
+        self.index = index
+        self.last_ticks = None
+
+
+class ThreadSampler(Sampler):
+    """Per-thread CPU% of a QEMU process, grouped by thread role.
+
+    Walks ``/proc/<pid>/task/*`` on every sample so threads QEMU starts
+    later (thread pool workers, late vCPUs) are picked up. The row holds
+    one ``vCPUn%`` column per guest CPU followed by the summed ``IO%``,
+    ``Main%`` and ``Other%``. When ``thread_log`` is given, each sample
+    also leaves ``(tid, cpu)`` records for every thread in ``threads``,
+    with their names and roles in ``names``. The sampler does no file I/O
+    itself: the monitor writes the records to ``thread_log`` as a
+    long-format time series through a :class:`ThreadLog`.
+    """
+
+    def __init__(self, pid, vcpus, thread_log=None):
+        self.pid = pid
+        self.vcpus = vcpus
+        self.columns = tuple(f"vCPU{n}%" for n in range(vcpus)) + (
+            "IO%", "Main%", "Other%")
+        self._offsets = {"io": vcpus, "main": vcpus + 1, "other": vcpus + 2}
+        self._task_dir = f"/proc/{pid}/task"
+        self._tasks = {}
+        self._buf = bytearray(1024)
+        self._last_time = None
+        self.thread_log = thread_log
+        self.threads = []
+        self.names = {}  # tid -> (name, role) of every thread seen
+        self.sample()  # prime the per-thread counters
+
+    def _open_task(self, tid):
+        try:
+            with open(f"{self._task_dir}/{tid}/comm") as f:
+                name = f.read().strip()
+            fd = os.open(f"{self._task_dir}/{tid}/stat", os.O_RDONLY)
+        except FileNotFoundError:
+            return None
+        kind, index = classify_thread(self.pid, tid, name)
+        if kind == "vcpu" and index >= self.vcpus:
+            kind, index = "other", None
+        if self.thread_log is not None:
+            self.names[tid] = (name, kind)
+        return _Task(fd, name, kind, index)
+
+    def _ticks(self, task):
+        size = os.preadv(task.fd, [self._buf], 0)
+        stat = bytes(self._buf[:size])
+        fields = stat[stat.rindex(b")") + 2:].split()
+        return int(fields[11]) + int(fields[12])
+
+    def sample(self):
+        try:
+            tids = os.listdir(self._task_dir)
+        except FileNotFoundError:
+            raise ProcessLookupError(
+                f"process no longer exists (pid={self.pid})")
+        now = time.monotonic()
+        elapsed = now - self._last_time if self._last_time else 0.0
+        self._last_time = now
+        threads = self.threads
+        threads.clear()
+
+        row = [0.0] * len(self.columns)
+        seen = set()
+        for tid_name in tids:
+            tid = int(tid_name)
+            task = self._tasks.get(tid)
+            if task is None:
+                task = self._open_task(tid)
+                if task is None:
+                    continue
+                self._tasks[tid] = task
+            try:
+                ticks = self._ticks(task)
+            except (ProcessLookupError, ValueError):
+                continue
+            seen.add(tid)
+            cpu = 0.0
+            if task.last_ticks is not None and elapsed > 0:
+                cpu = (ticks - task.last_ticks) / CLK_TCK / elapsed * 100.0
+            task.last_ticks = ticks
+            column = task.index if task.kind == "vcpu" else self._offsets[task.kind]
+            row[column] += cpu
+            if self.thread_log is not None and elapsed > 0:
+                threads.append((tid, round(cpu, 1)))
+
+        for tid in self._tasks.keys() - seen:
+            os.close(self._tasks.pop(tid).fd)
+        if not seen:
+            raise ProcessLookupError(f"process exited (pid={self.pid})")
+        return [round(cpu, 1) for cpu in row]
+
+    def close(self):
+        for task in self._tasks.values():
+            os.close(task.fd)
+        self._tasks.clear()
+
+
+class ThreadLog:
+    """The long-format per-thread log of a :class:`ThreadSampler`.
+
+    Written by the monitor, not the sampler, so the rows of a sampler
+    running in a sidecar (see :mod:`nanos_eval.sidecar`) are formatted
+    and written in the harness. ``names`` maps thread ids to their
+    ``(name, role)``.
+    """
+
+    def __init__(self, path, names):
+        self.names = names
+        self._writer = BufferedCSVWriter(path, THREAD_LOG_COLUMNS)
+
+    def write(self, timestamp, tid, cpu):
+        name, kind = self.names.get(tid, ("", "other"))
+        self._writer.write((timestamp, tid, name, kind, cpu))
+
+    def close(self):
+        self._writer.close()
+
+
+def thread_logs(samplers):
+    """A ``(sampler, ThreadLog)`` pair for each sampler with a thread log."""
+    return [(sampler, ThreadLog(sampler.thread_log, sampler.names))
+            for sampler in samplers
+            if getattr(sampler, "thread_log", None) is not None]
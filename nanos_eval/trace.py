@@ -0,0 +1,330 @@
+"""Profiles of the nanos ``trace`` and ``debugsyscalls`` console output.
+
+With ``"Debugflags": ["trace:pf,threadrun", "debugsyscalls"]`` the guest
+logs every syscall, page fault and thread dispatch to the console.
+:class:`ConsoleLog` saves that console during a run, each line prefixed
+with the host ``time.time()`` it arrived at. :class:`TraceParser` then
+reads it back one line at a time, keeping only fixed-size state. A
+multi-GB log is therefore parsed in the same memory as a small one. It
+writes three files:
+
+- ``<name>_syscalls.csv``: per syscall, its count, errors (-errno
+  returns), calls that blocked (returned on a later ``run thread``) and
+  the latency distribution from a :class:`~nanos_eval.histogram.LatencyHistogram`,
+- ``<name>_trace_rates.csv``: syscalls, errors, page faults and thread
+  dispatches per second, in ``bucket``-second buckets on the
+  ``Time Stamp`` clock of the usage logs,
+- ``<name>_thread_timeline.csv``: one row per stretch a thread ran on a
+  vCPU, written as each stretch ends.
+
+Trace lines look like ``[12.345678, 2, name] openat: ...`` or
+`` 2 [name] openat: ...``: a guest time (when the build prints one), the
+thread id and its name, then the message. Syscall entries are messages
+that start with a single lower-case word followed by ``:`` or nothing
+else. Their returns are ``direct return: <rv>`` lines, or the ``rv`` of
+the thread's next ``run thread`` when the call blocked. Guest times are
+moved onto the host clock by the offset seen on the first stamped line.
+Without guest times, the host arrival time is used, which is only as
+fine as the console's buffering. A line with only a bare thread id in
+front counts as trace output only if its message has a trace shape
+(``name: args``, ``run thread``, a return or a page fault), so that
+application output such as ``42 apples`` is left out.
+"""
+import csv
+import math
+import re
+import threading
+import time
+
+_HOST_STAMP = re.compile(r"(\d{9,}\.\d+) (.*)")
+_TRACE_LINE = re.compile(
+    r"\s*(?:\[\s*(?P<ts>\d+\.\d+)(?:,\s*(?P<tid>\d+)(?:,\s*(?P<name>[^\]]*))?)?\]\s*)?"
+    r"(?:(?P<tid2>\d{1,7})\s+(?:\[(?P<name2>[^\]]*)\]\s+)?)?(?P<msg>.*)")
+# Messages that mark a line with only a bare thread id as trace output.
+_TRACE_MESSAGE = re.compile(r"run thread\b|direct return\b|page fault|pf\b|"
+                            r"fault_handler|[a-z_][a-z0-9_]*:\s")
+_RUN_THREAD = re.compile(r"run thread, cpu (\d+)(?:.*?\brv (-?(?:0x)?[0-9a-fA-F]+))?")
+_RETURN = re.compile(r"(?:direct return|(?:[a-z_][a-z0-9_]*: )?returning):?\s*"
+                     r"(-?(?:0x[0-9a-fA-F]+|\d+))")
+_PAGE_FAULT = re.compile(r"page fault|^pf\b|fault_handler")
+_SYSCALL = re.compile(r"([a-z_][a-z0-9_]*)(?::\s|:?$)")
+
+SYSCALL_FIELDS = ["syscall", "count", "errors", "blocked", "total_ms",
+                  "latency_avg_ms", "latency_p50_ms", "latency_p90_ms",
+                  "latency_p99_ms", "latency_p999_ms", "latency_max_ms"]
+RATE_FIELDS = ["Time Stamp", "Syscalls/s", "Syscall Errors/s",
+               "Page Faults/s", "Thread Runs/s"]
+TIMELINE_FIELDS = ["tid", "name", "cpu", "start", "end", "duration_ms"]
+
+
+class ConsoleLog:
+    """Save console lines, each stamped with the host time it arrived."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "w", buffering=1 << 20)
+
+    def write(self, line, timestamp=None):
+        timestamp = time.time() if timestamp is None else timestamp
+        self._file.write(f"{timestamp:.6f} {line}\n")
+
+    def close(self):
+        self._file.close()
+
+
+def follow_console(stream, path):
+    """Copy a binary console pipe to a :class:`ConsoleLog` on a thread.
+
+    Keeps the pipe drained so the guest never blocks on its console.
+    Returns the thread, which ends at EOF.
+    """
+    def follow():
+        console = ConsoleLog(path)
+        try:
+            for raw in iter(stream.readline, b""):
+                console.write(raw.decode(errors="replace").rstrip("\r\n"))
+        finally:
+            console.close()
+
+    thread = threading.Thread(target=follow, daemon=True)
+    thread.start()
+    return thread
+
+
+def _return_value(text):
+    value = int(text, 0)
+    if text.startswith("0x") and value >= 1 << 63:
+        value -= 1 << 64  # a negative errno printed as unsigned hex
+    return value
+
+
+def _is_error(value):
+    return -4096 < value < 0
+
+
+class _Syscall:
+    __slots__ = ("count", "errors", "blocked", "histogram")
+
+    def __init__(self, histogram):
+        self.count = self.errors = self.blocked = 0
+        self.histogram = histogram
+
+
+class TraceParser:
+    """Fold trace lines into syscall, rate and timeline profiles.
+
+    Feed it lines with :meth:`feed` and finish with :meth:`close`. Only
+    the per-syscall histograms, the open syscall and vCPU of each thread
+    and a few unfinished rate buckets are held in memory; rate buckets
+    and timeline rows go to ``rates_file`` and ``timeline_file`` as they
+    complete.
+    """
+
+    def __init__(self, rates_file, timeline_file, bucket=0.1):
+        # imported here so the run scripts can import ConsoleLog without
+        # loading numpy before the guest is launched
+        from .histogram import LatencyHistogram
+
+        self._histogram = LatencyHistogram
+        self.bucket = bucket
+        self.syscalls = {}
+        self.lines = self.trace_lines = 0
+        self._offset = None
+        self._last = None
+        self._pending = {}  # tid -> (syscall, start)
+        self._names = {}
+        self._running = {}  # cpu -> (tid, start)
+        self._buckets = {}  # index -> [syscalls, errors, faults, runs]
+        self._rates = open(rates_file, "w", newline="")
+        self._rate_writer = csv.writer(self._rates)
+        self._rate_writer.writerow(RATE_FIELDS)
+        self._timeline = open(timeline_file, "w", newline="")
+        self._timeline_writer = csv.writer(self._timeline)
+        self._timeline_writer.writerow(TIMELINE_FIELDS)
+
+    def _time(self, host, guest):
+        if guest is None:
+            return host
+        if self._offset is None and host is not None:
+            self._offset = host - guest
+        return guest + (self._offset or 0.0)
+
+    def _count(self, when, field):
+        if when is None:
+            return
+        index = math.floor(when / self.bucket)
+        counts = self._buckets.get(index)
+        if counts is None:
+            counts = self._buckets[index] = [0, 0, 0, 0]
+            # late lines land at most a bucket back; older ones are done
+            for done in sorted(i for i in self._buckets if i < index - 1):
+                self._flush_bucket(done)
+        counts[field] += 1
+
+    def _flush_bucket(self, index):
+        counts = self._buckets.pop(index)
+        self._rate_writer.writerow(
+            [round(index * self.bucket, 6)]
+            + [round(c / self.bucket, 3) for c in counts])
+
+    def _end_run(self, cpu, when):
+        tid, start = self._running.pop(cpu)
+        self._timeline_writer.writerow(
+            [tid, self._names.get(tid, ""), cpu, start, when,
+             round((when - start) * 1000, 3)])
+
+    def _return(self, tid, value, when, blocked=False):
+        name, start = self._pending.pop(tid)
+        syscall = self.syscalls[name]
+        if blocked:
+            syscall.blocked += 1
+        if value is not None and _is_error(value):
+            syscall.errors += 1
+            self._count(when, 1)
+        if start is not None and when is not None and when >= start:
+            syscall.histogram.record(round((when - start) * 1e6))
+
+    def feed(self, line):
+        self.lines += 1
+        host = None
+        stamped = _HOST_STAMP.match(line)
+        if stamped:
+            host, line = float(stamped.group(1)), stamped.group(2)
+        match = _TRACE_LINE.match(line)
+        tid = match.group("tid") or match.group("tid2")
+        if tid is None:
+            return  # application or ops output
+        guest = match.group("ts")
+        msg = match.group("msg").strip()
+        if (guest is None and match.group("name2") is None
+                and not _TRACE_MESSAGE.match(msg)):
+            return  # application output that starts with a number
+        tid = int(tid)
+        self.trace_lines += 1
+        when = self._time(host, float(guest) if guest else None)
+        if when is not None:
+            self._last = when
+        name = match.group("name") or match.group("name2")
+        if name:
+            self._names[tid] = name.strip()
+
+        run = _RUN_THREAD.match(msg)
+        if run:
+            cpu = int(run.group(1))
+            self._count(when, 3)
+            if when is not None:
+                if cpu in self._running:
+                    self._end_run(cpu, when)
+                for other, (running, _) in list(self._running.items()):
+                    if running == tid:
+                        self._end_run(other, when)
+                self._running[cpu] = (tid, when)
+            if tid in self._pending:
+                rv = run.group(2)
+                self._return(tid, _return_value(rv) if rv else None, when,
+                             blocked=True)
+            return
+        if _PAGE_FAULT.search(msg):
+            self._count(when, 2)
+            return
+        returned = _RETURN.match(msg)
+        if returned:
+            if tid in self._pending:
+                self._return(tid, _return_value(returned.group(1)), when)
+            return
+        entry = _SYSCALL.match(msg)
+        if entry:
+            syscall = entry.group(1)
+            pending = self._pending.get(tid)
+            if pending is not None and pending[0] == syscall:
+                return  # the arguments of the call already open
+            if syscall not in self.syscalls:
+                self.syscalls[syscall] = _Syscall(self._histogram())
+            self.syscalls[syscall].count += 1
+            self._pending[tid] = (syscall, when)
+            self._count(when, 0)
+
+    def close(self):
+        for cpu in list(self._running):
+            self._end_run(cpu, self._last)
+        for index in sorted(self._buckets):
+            self._flush_bucket(index)
+        self._rates.close()
+        self._timeline.close()
+
+    def syscall_rows(self):
+        """One row of ``SYSCALL_FIELDS`` per syscall, most frequent first."""
+        rows = []
+        for name, syscall in self.syscalls.items():
+            histogram = syscall.histogram
+            rows.append(dict(
+                syscall=name, count=syscall.count, errors=syscall.errors,
+                blocked=syscall.blocked,
+                total_ms=round(histogram.sum / 1000.0, 3),
+                **histogram.summary()))
+        return sorted(rows, key=lambda row: -row["count"])
+
+
+def profile_console(console_log, name="nanos", out_dir="metrics", bucket=0.1,
+                    usage_log=None):
+    """Parse a console log into ``out_dir/<name>_*.csv`` profiles.
+
+    With ``usage_log``, the trace rates are also added to that processed
+    usage log as columns (see :func:`add_trace_rates`). Returns the
+    per-syscall rows.
+    """
+    rates_file = f"{out_dir}/{name}_trace_rates.csv"
+    parser = TraceParser(rates_file, f"{out_dir}/{name}_thread_timeline.csv",
+                         bucket)
+    try:
+        with open(console_log, "rb") as f:
+            for raw in f:
+                parser.feed(raw.decode(errors="replace").rstrip("\r\n"))
+    finally:
+        parser.close()
+    rows = parser.syscall_rows()
+    syscalls_file = f"{out_dir}/{name}_syscalls.csv"
+    with open(syscalls_file, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=SYSCALL_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"📄 {parser.trace_lines} of {parser.lines} console lines were "
+          f"trace output: {sum(r['count'] for r in rows)} syscalls profiled "
+          f"into {syscalls_file}")
+    if usage_log is not None:
+        add_trace_rates(usage_log, rates_file, bucket)
+    return rows
+
+
+def add_trace_rates(usage_log, rates_file, bucket=0.1):
+    """Add the trace rate columns to a processed usage log, in place.
+
+    Each sample gets the mean rate over its interval (after the previous
+    sample, up to its own time) of the ``bucket``-second buckets whose
+    middle falls in it. Buckets with no events are not in the rates file
+    and count as zero.
+    """
+    # imported here so the parser stays light
+    import numpy as np
+    import pandas as pd
+
+    usage = pd.read_csv(usage_log)
+    rates = pd.read_csv(rates_file)
+    if usage.empty:
+        return usage
+    times = usage["Time Stamp"].to_numpy(dtype=np.float64)
+    starts = rates["Time Stamp"].to_numpy(dtype=np.float64)
+    index = np.searchsorted(times, starts + bucket / 2, side="left")
+    inside = index < len(times)
+    # buckets per sample interval; the first sample's interval is taken
+    # to be as long as the typical one
+    intervals = np.diff(times, prepend=times[0] - (
+        np.median(np.diff(times)) if len(times) > 1 else bucket))
+    buckets = np.maximum(intervals / bucket, 1.0)
+    for column in RATE_FIELDS[1:]:
+        sums = np.bincount(index[inside],
+                           weights=rates[column].to_numpy()[inside],
+                           minlength=len(times))
+        usage[column] = sums / buckets
+    usage.to_csv(usage_log, index=False)
+    return usage
@@ -0,0 +1,381 @@
+"""SQLite warehouse of every benchmark run.
+
+Each run of one platform is ingested from its ``metrics`` directory (a
+category's own, or a matrix cell's copy of it) into five tables:
+
+- ``runs``: workload, platform, label (the matrix cell, if any), start
+  time and host metadata,
+- ``samples``: the processed usage log (time, CPU%, memory, phase),
+- ``phases``: the per-phase summary of :mod:`nanos_eval.phases`,
+- ``results``: one row per load step (or compute kernel) with
+  throughput and latency, normalised across the web server, Redis and
+  compute result files,
+- ``histograms``: the latency histograms of every step and level.
+
+Rows go in with ``executemany`` inside one transaction per run.
+:func:`trend` follows a metric across runs and :func:`check_regressions`
+compares a run against a baseline run with :func:`nanos_eval.stats.compare`.
+"""
+import json
+import os
+import platform as host
+import sqlite3
+import time
+
+import numpy as np
+import pandas as pd
+
+from .matrix import CELL_ENV
+from .phases import PHASE_IDLE
+from .stats import compare, to_number
+
+DEFAULT_DB = os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), "metrics", "results.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    workload TEXT NOT NULL,
+    platform TEXT NOT NULL,
+    label TEXT,
+    started REAL,
+    ingested REAL NOT NULL,
+    metadata TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_by_workload
+    ON runs (workload, platform, started);
+CREATE TABLE IF NOT EXISTS samples (
+    run_id INTEGER NOT NULL REFERENCES runs (id),
+    elapsed REAL,
+    timestamp REAL,
+    cpu REAL,
+    memory_kb REAL,
+    phase INTEGER
+);
+CREATE INDEX IF NOT EXISTS samples_by_run ON samples (run_id, phase);
+CREATE TABLE IF NOT EXISTS phases (
+    run_id INTEGER NOT NULL REFERENCES runs (id),
+    phase INTEGER NOT NULL,
+    connection INTEGER,
+    warm_up INTEGER,
+    samples INTEGER,
+    duration_s REAL,
+    mean_cpu REAL,
+    peak_memory_mb REAL,
+    cpu_seconds REAL,
+    requests INTEGER,
+    requests_per_sec REAL,
+    requests_per_cpu_second REAL,
+    requests_per_mb REAL,
+    PRIMARY KEY (run_id, phase)
+);
+CREATE TABLE IF NOT EXISTS results (
+    run_id INTEGER NOT NULL REFERENCES runs (id),
+    test TEXT NOT NULL,
+    connection INTEGER NOT NULL,
+    repetition INTEGER NOT NULL,
+    rps REAL,
+    latency_avg_ms REAL,
+    latency_p50_ms REAL,
+    latency_p99_ms REAL,
+    latency_max_ms REAL,
+    errors INTEGER
+);
+CREATE INDEX IF NOT EXISTS results_by_run
+    ON results (run_id, test, connection);
+CREATE TABLE IF NOT EXISTS histograms (
+    run_id INTEGER NOT NULL REFERENCES runs (id),
+    test TEXT NOT NULL,
+    connection INTEGER NOT NULL,
+    repetition INTEGER,
+    total INTEGER,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS histograms_by_run
+    ON histograms (run_id, test, connection);
+"""
+
+RESULT_COLUMNS = ("rps", "latency_avg_ms", "latency_p50_ms", "latency_p99_ms",
+                  "latency_max_ms", "errors")
+
+# Result file columns -> results columns, per result file layout.
+_RENAMES = {
+    "webserver": {"requests_per_sec": "rps", "latency_avg": "latency_avg_ms"},
+    "redis": {"avg_latency_ms": "latency_avg_ms",
+              "p50_latency_ms": "latency_p50_ms",
+              "p99_latency_ms": "latency_p99_ms",
+              "max_latency_ms": "latency_max_ms"},
+}
+
+# Metrics checked for regressions and the direction that is worse.
+REGRESSION_METRICS = {"rps": "lower", "latency_p99_ms": "higher",
+                      "rss": "higher"}
+
+
+def connect(path=DEFAULT_DB):
+    """Open (and if needed create) the warehouse at ``path``."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    db = sqlite3.connect(path)
+    db.execute("PRAGMA journal_mode = WAL")
+    db.execute("PRAGMA synchronous = NORMAL")
+    db.executescript(SCHEMA)
+    return db
+
+
+def _find(metrics_dir, names):
+    for name in names:
+        path = os.path.join(metrics_dir, name)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def _names(platform, pattern):
+    # Nginx monitors nanos under the "ops" name
+    names = [pattern.format(platform)]
+    if platform == "nanos":
+        names.append(pattern.format("ops"))
+    return names
+
+
+def _rows(frame, columns):
+    """``frame[columns]`` as plain Python tuples, NaN as NULL."""
+    frame = frame.reindex(columns=columns).astype(object)
+    return frame.where(frame.notna(), None).itertuples(index=False, name=None)
+
+
+def _result_frame(metrics_dir, platform):
+    """Load step results of a run in the ``results`` layout, or None."""
+    path = _find(metrics_dir, [
+        f"webserver/webserver_metrics_{platform}.csv",
+        f"database/redis_metrics_{platform}.csv"])
+    if path is not None:
+        layout = "redis" if "redis_metrics" in path else "webserver"
+        frame = pd.read_csv(path).rename(columns=_RENAMES[layout])
+        if "test" not in frame:
+            frame["test"] = ""
+    else:
+        path = _find(metrics_dir, [f"kernels_{platform}.json"])
+        if path is None:
+            return None, None
+        with open(path) as f:
+            kernels = [r for r in json.load(f) if "ops_per_sec" in r]
+        frame = pd.DataFrame({
+            "test": [r["kernel"] if "pool" not in r
+                     else f"{r['kernel']}@{r['pool']}" for r in kernels],
+            "connection": [r.get("workers", 1) for r in kernels],
+            "rps": [r["ops_per_sec"] for r in kernels]})
+    for column in RESULT_COLUMNS:
+        if column in frame:
+            frame[column] = to_number(frame[column])
+    frame["repetition"] = frame.groupby(["test", "connection"]).cumcount()
+    return frame, path
+
+
+def _histogram_rows(result_path):
+    path = result_path.replace(".csv", "_histograms.json")
+    if not result_path.endswith(".csv") or not os.path.exists(path):
+        return []
+    with open(path) as f:
+        document = json.load(f)
+    group_by = document["group_by"]
+    rows = []
+    for step in document["steps"]:
+        rows.append((step.get("test", ""), step["connection"],
+                     step["repetition"], step["histogram"]["total"],
+                     json.dumps(step["histogram"])))
+    for entry in document["merged"]:
+        test, _, connection = (str(entry[group_by]).rpartition("@")
+                               if group_by == "group"
+                               else ("", None, entry[group_by]))
+        rows.append((test, int(connection), None, entry["histogram"]["total"],
+                     json.dumps(entry["histogram"])))
+    return rows
+
+
+def ingest_run(workload, platform, metrics_dir="metrics", db_path=DEFAULT_DB,
+               label=None, metadata=None):
+    """Add one platform's run, read from ``metrics_dir``; return its id.
+
+    ``label`` defaults to the matrix cell in ``NANOS_EVAL_CELL``. Files a
+    run did not produce (phases for compute, say) are left out.
+    """
+    usage_log = _find(metrics_dir, _names(platform, "{}_usage_log.csv"))
+    samples = None
+    started = None
+    if usage_log is not None:
+        samples = pd.read_csv(usage_log)
+        if "Time Stamp" in samples and len(samples):
+            started = float(samples["Time Stamp"].iloc[0])
+    phases_file = _find(metrics_dir, _names(platform, "{}_phases.csv"))
+    results, result_path = _result_frame(metrics_dir, platform)
+    metadata = dict(metadata or {}, host=host.node(), kernel=host.release(),
+                    machine=host.machine(), cpus=os.cpu_count(),
+                    python=host.python_version(),
+                    metrics_dir=os.path.abspath(metrics_dir))
+    pinning_file = _find(metrics_dir, _names(platform, "{}_pinning.json"))
+    if pinning_file is not None:
+        with open(pinning_file) as f:
+            metadata["pinning"] = json.load(f)
+
+    db = connect(db_path)
+    with db:
+        run_id = db.execute(
+            "INSERT INTO runs (workload, platform, label, started, ingested,"
+            " metadata) VALUES (?, ?, ?, ?, ?, ?)",
+            (workload, platform, label or os.environ.get(CELL_ENV), started,
+             time.time(), json.dumps(metadata))).lastrowid
+        if samples is not None:
+            samples = samples.rename(columns={
+                "Time Elapsed": "elapsed", "Time Stamp": "timestamp",
+                "CPU%": "cpu", "Memory(KB)": "memory_kb", "Phase": "phase"})
+            samples.insert(0, "run_id", run_id)
+            db.executemany(
+                "INSERT INTO samples VALUES (?, ?, ?, ?, ?, ?)",
+                _rows(samples, ["run_id", "elapsed", "timestamp", "cpu",
+                                "memory_kb", "phase"]))
+        if phases_file is not None:
+            phases = pd.read_csv(phases_file)
+            phases.insert(0, "run_id", run_id)
+            columns = [row[1] for row in db.execute("PRAGMA table_info(phases)")]
+            db.executemany(
+                f"INSERT INTO phases VALUES ({', '.join('?' * len(columns))})",
+                _rows(phases, columns))
+        if results is not None:
+            results.insert(0, "run_id", run_id)
+            columns = ["run_id", "test", "connection", "repetition",
+                       *RESULT_COLUMNS]
+            db.executemany(
+                f"INSERT INTO results VALUES ({', '.join('?' * len(columns))})",
+                _rows(results, columns))
+            db.executemany(
+                "INSERT INTO histograms VALUES (?, ?, ?, ?, ?, ?)",
+                [(run_id, *row) for row in _histogram_rows(result_path)])
+    db.close()
+    print(f"📄 {workload}/{platform} run {run_id} ingested into {db_path}")
+    return run_id
+
+
+def runs(db, workload=None, platform=None):
+    """Runs in the warehouse, oldest first."""
+    query = "SELECT id, workload, platform, label, started FROM runs"
+    clauses, params = [], []
+    for column, value in (("workload", workload), ("platform", platform)):
+        if value is not None:
+            clauses.append(f"{column} = ?")
+            params.append(value)
+    if clauses:
+        query += " WHERE " + " AND ".join(clauses)
+    return pd.read_sql_query(query + " ORDER BY COALESCE(started, ingested), id",
+                             db, params=params)
+
+
+def _peak_rss(db, run_ids):
+    """One observation per run: the peak memory of its samples in KB."""
+    marks = ", ".join("?" * len(run_ids))
+    return pd.read_sql_query(
+        f"SELECT run_id, '' AS test, 0 AS connection, MAX(memory_kb) AS value"
+        f" FROM samples WHERE run_id IN ({marks}) GROUP BY run_id", db,
+        params=run_ids)
+
+
+def _metric_frame(db, run_ids, metric):
+    """Observations of ``metric`` in ``run_ids`` (long format).
+
+    Monitor samples are autocorrelated, so ``"rss"`` is never observed
+    per sample: it is the peak memory (in KB) of every measured load step
+    per connection level when all the runs have phases, and otherwise
+    the peak of each run.
+    """
+    marks = ", ".join("?" * len(run_ids))
+    if metric == "rss":
+        steps = pd.read_sql_query(
+            f"SELECT run_id, '' AS test, connection,"
+            f" peak_memory_mb * 1024 AS value FROM phases"
+            f" WHERE run_id IN ({marks}) AND phase != ? AND NOT warm_up",
+            db, params=[*run_ids, PHASE_IDLE])
+        if set(steps["run_id"]) == set(run_ids):
+            return steps
+        return _peak_rss(db, run_ids)
+    if metric not in RESULT_COLUMNS:
+        raise ValueError(f"unknown metric {metric!r}, choose from "
+                         f"{', '.join(RESULT_COLUMNS + ('rss',))}")
+    return pd.read_sql_query(
+        f"SELECT run_id, test, connection, {metric} AS value FROM results"
+        f" WHERE run_id IN ({marks})", db, params=run_ids)
+
+
+def trend(db, workload, metric, platform=None, test=None, connection=None):
+    """Mean ``metric`` of every run of ``workload``, per test and level.
+
+    ``metric`` is a ``results`` column or ``"rss"`` (peak memory of the
+    run's samples in KB). One row per run and group, oldest run first.
+    """
+    history = runs(db, workload, platform)
+    if history.empty:
+        return history
+    if metric == "rss":
+        frame = _peak_rss(db, history["id"].tolist())
+    else:
+        frame = _metric_frame(db, history["id"].tolist(), metric)
+    if test is not None:
+        frame = frame[frame["test"] == test]
+    if connection is not None:
+        frame = frame[frame["connection"] == connection]
+    frame = frame.groupby(["run_id", "test", "connection"], as_index=False
+                          ).agg(mean=("value", "mean"), n=("value", "size"))
+    return history.merge(frame, left_on="id", right_on="run_id"
+                         ).drop(columns="run_id").rename(
+                             columns={"mean": metric})
+
+
+def previous_run(db, run_id):
+    """The latest earlier run of the same workload and platform, or None."""
+    row = db.execute(
+        "SELECT b.id FROM runs a JOIN runs b ON b.workload = a.workload"
+        " AND b.platform = a.platform AND b.id < a.id WHERE a.id = ?"
+        " ORDER BY b.id DESC LIMIT 1", (run_id,)).fetchone()
+    return row[0] if row else None
+
+
+def check_regressions(db, run_id, baseline_id=None, metrics=None,
+                      alpha=0.05, seed=None):
+    """Flag statistically significant regressions of a run.
+
+    Compares ``run_id`` against ``baseline_id`` (default: the previous run
+    of the same workload and platform) for every metric in ``metrics``
+    (default ``REGRESSION_METRICS``: rps, p99 latency and RSS) within each
+    test and connection level. RSS is compared per load step, not per
+    sample (see :func:`_metric_frame`). A group is a regression when the
+    comparison's verdict is ``real`` and the change goes the worse way.
+    Returns the comparison rows with a ``regression`` column.
+    """
+    baseline_id = baseline_id or previous_run(db, run_id)
+    if baseline_id is None:
+        print(f"⚠️ Run {run_id} has no earlier run to compare with")
+        return None
+    metrics = metrics or REGRESSION_METRICS
+    frames = []
+    for metric in metrics:
+        frame = _metric_frame(db, [baseline_id, run_id], metric)
+        frame["run"] = np.where(frame["run_id"] == run_id, "run", "baseline")
+        if frame.empty:
+            continue
+        result = compare(frame, ["test", "connection"], "value",
+                         platform="run", baseline="baseline", candidate="run",
+                         alpha=alpha, seed=seed)
+        result["metric"] = metric
+        worse = (result["diff"] < 0 if REGRESSION_METRICS.get(metric) == "lower"
+                 else result["diff"] > 0)
+        result["regression"] = (result["verdict"] == "real") & worse
+        frames.append(result)
+    if not frames:
+        return None
+    result = pd.concat(frames, ignore_index=True)
+    for row in result.itertuples(index=False):
+        group = "/".join(str(part) for part in (row.test, row.connection)
+                         if part not in ("", 0)) or "all"
+        mark = "⚠️ regression" if row.regression else "ok"
+        print(f"📊 {row.metric} @ {group}: {row.rel_diff:+.1%} vs run "
+              f"{baseline_id} (p={row.p_holm:.3g}, {row.magnitude}) -> {mark}")
+    return result
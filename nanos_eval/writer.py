@@ -0,0 +1,48 @@
+import time
+
+
+class BufferedCSVWriter:
+    """Write sample rows to a CSV file in batches.
+
+    The file is opened once for the whole run. Rows are held in memory and
+    written with a single ``write`` call once ``batch_size`` rows have
+    accumulated or ``flush_interval`` seconds have passed, whichever comes
+    first, so the sampling loop does not pay for a syscall per sample.
+    """
+
+    def __init__(self, path, columns, batch_size=256, flush_interval=5.0):
+        self.path = path
+        self.columns = list(columns)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.rows_written = 0
+        self._rows = []
+        self._file = open(path, "w")
+        self._file.write(",".join(self.columns) + "\n")
+        self._last_flush = time.monotonic()
+
+    def write(self, row):
+        self._rows.append(row)
+        if (len(self._rows) >= self.batch_size or
+                time.monotonic() - self._last_flush >= self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        if self._rows:
+            self._file.write("".join(
+                ",".join(map(str, row)) + "\n" for row in self._rows))
+            self._file.flush()
+            self.rows_written += len(self._rows)
+            self._rows.clear()
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
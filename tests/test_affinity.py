@@ -0,0 +1,58 @@
+from nanos_eval.affinity import (AffinitySampler, format_cpu_list,
+                                 parse_cpu_list, plan_cores)
+
+
+def _topology(cores, threads_per_core=1):
+    """CPUs numbered like Linux: the SMT siblings of core n are n, n+cores."""
+    return [{"cpu": core + thread * cores, "package": 0, "core": core}
+            for thread in range(threads_per_core) for core in range(cores)]
+
+
+def test_cpu_lists():
+    assert parse_cpu_list("0-2,5,7-8\n") == [0, 1, 2, 5, 7, 8]
+    assert parse_cpu_list("") == []
+    assert format_cpu_list([8, 0, 1, 2, 5, 7]) == "0-2,5,7-8"
+
+
+def test_plan_splits_harness_and_workload():
+    plan = plan_cores(2, load=1, topology=_topology(8))
+    assert plan == {"sut": [0, 1], "monitor": [2], "harness": [3],
+                    "load": [4, 5, 6, 7]}
+    assert plan_cores(2, load=0, topology=_topology(4)) == {
+        "sut": [0, 1], "monitor": [2], "harness": [3]}
+
+
+def test_plan_hands_out_whole_cores():
+    # SMT siblings stay together, so a 3-CPU sut takes two whole cores
+    assert plan_cores(3, load=0,
+                      topology=_topology(4, threads_per_core=2)) == {
+        "sut": [0, 4, 1, 5], "monitor": [2, 6], "harness": [3, 7]}
+    # three cores for the sut, monitor and harness leave none for load
+    assert plan_cores(3, load=2,
+                      topology=_topology(4, threads_per_core=2)) is None
+    plan = plan_cores(1, load=2, topology=_topology(4, threads_per_core=2))
+    assert plan == {"sut": [0, 4], "monitor": [1, 5], "harness": [2, 6],
+                    "load": [3, 7]}
+    roles = [set(cpus) for cpus in plan.values()]
+    assert set.union(*roles) == set(range(8))
+    assert sum(map(len, roles)) == 8
+
+
+def test_plan_with_too_few_cores():
+    assert plan_cores(4, topology=_topology(4)) is None
+    assert plan_cores(2, load=3, topology=_topology(5)) is None
+    assert plan_cores(1, load=1, topology=_topology(4)) is not None
+
+
+def test_affinity_sampler_checks_every_few_samples(monkeypatch):
+    calls = []
+
+    def unpinned(pid, cpus):
+        calls.append(pid)
+        return [pid] * len(calls)
+
+    monkeypatch.setattr("nanos_eval.affinity.unpinned_threads", unpinned)
+    sampler = AffinitySampler({1: [0]}, every=3)
+    counts = [sampler.sample()[0] for _ in range(7)]
+    assert counts == [1, 1, 1, 2, 2, 2, 3]
+    assert len(calls) == 3
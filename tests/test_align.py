@@ -0,0 +1,79 @@
+import math
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+
+from nanos_eval.align import align_frames, align_logs, resample  # noqa: E402
+from nanos_eval.events import EventLog  # noqa: E402
+
+NAN = math.nan
+
+
+def _log(start, step, samples, cpu):
+    """A processed usage log whose monitor started at ``start``."""
+    elapsed = step * np.arange(samples)
+    return pd.DataFrame({"Time Elapsed": elapsed,
+                         "Time Stamp": start + elapsed,
+                         "CPU%": cpu(elapsed)})
+
+
+def _equal(actual, expected):
+    return np.allclose(actual, expected, equal_nan=True)
+
+
+def test_offset_runs_with_different_rates():
+    # the load started 1 s into the fast run and 2.5 s into the slow one
+    fast = _log(100.0, 0.5, 9, lambda t: 10 * t).assign(**{"Memory(MB)": 7.0})
+    slow = _log(200.0, 1.0, 7, lambda t: 5 * t)
+    aligned = align_frames([fast, slow], offsets=[1.0, 2.5])
+
+    # the coarser step wins, with a grid point at the shared event
+    grid = [-3.0, -2.0, -1.0, 0.0, 1.0, 2.0, 3.0]
+    for frame in aligned:
+        assert frame["Time Elapsed"].tolist() == grid
+        assert list(frame.columns) == ["Time Elapsed", "CPU%", "Memory(MB)"]
+    # the fast run covers -1..3 s, the slow one -2.5..3.5 s
+    assert _equal(aligned[0]["CPU%"], [NAN, NAN, 0, 10, 20, 30, 40])
+    assert _equal(aligned[1]["CPU%"], [NAN, 2.5, 7.5, 12.5, 17.5, 22.5, 27.5])
+    assert _equal(aligned[0]["Memory(MB)"], [NAN, NAN] + [7.0] * 5)
+    assert aligned[1]["Memory(MB)"].isna().all()
+
+
+def test_align_logs_on_an_event(tmp_path):
+    logs, events = [], []
+    for name, start, step, load_started in (("a", 100.0, 0.5, 101.0),
+                                            ("b", 200.0, 1.0, 202.5)):
+        log = tmp_path / f"{name}_usage_log.csv"
+        _log(start, step, 8, lambda t: 10 * t).to_csv(log, index=False)
+        with EventLog(str(tmp_path / f"{name}_events.jsonl")) as event_log:
+            event_log.record("service_ready", start + 0.2)
+            event_log.record("load_started", load_started)
+        logs.append(str(log))
+        events.append(str(tmp_path / f"{name}_events.jsonl"))
+    aligned = align_logs(logs, events)
+    assert aligned[0]["Time Elapsed"].tolist()[:3] == [-3.0, -2.0, -1.0]
+    assert _equal(aligned[0]["CPU%"][:4], [NAN, NAN, 0, 10])
+    assert _equal(aligned[1]["CPU%"][:4], [NAN, 5, 15, 25])
+
+    # without events a log stays relative to its own start
+    missing = str(tmp_path / "none.jsonl")
+    aligned = align_logs(logs, [missing, missing])
+    assert aligned[0]["Time Elapsed"].tolist()[0] == 0.0
+
+
+def test_resample_methods():
+    times = [np.array([0.0, 0.4, 1.0, 1.6]), np.array([0.5, 2.5])]
+    values = [np.array([1.0, 3.0, 5.0, 7.0]), np.array([10.0, 30.0])]
+    grid = np.array([0.0, 1.0, 2.0])
+    linear = resample(times, values, grid)[:, :, 0]
+    assert _equal(linear, [[1, 5, NAN], [NAN, 15, 25]])
+    previous = resample(times, values, grid, "previous")[:, :, 0]
+    assert _equal(previous, [[1, 5, NAN], [NAN, 10, 10]])
+    mean = resample(times, values, grid, "mean")[:, :, 0]
+    assert _equal(mean, [[2, 6, NAN], [10, NAN, 30]])
+    count = resample(times, values, grid, "count")[:, :, 0]
+    assert count.tolist() == [[2, 2, 0], [1, 0, 1]]
+    with pytest.raises(ValueError):
+        resample(times, values, grid, "median")
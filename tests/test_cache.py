@@ -0,0 +1,69 @@
+import os
+
+import pytest
+
+from nanos_eval.affinity import PIN_ENV
+from nanos_eval.cache import MANIFEST, ResultCache, changed_inputs
+from nanos_eval.matrix import Cell
+
+TOOLS = {"ops": "0.1.50", "docker": None, "qemu": None, "python": "3"}
+CELL = Cell("go", "nanos", "c10", [10], 0)
+
+
+@pytest.fixture
+def category(tmp_path, monkeypatch):
+    monkeypatch.delenv(PIN_ENV, raising=False)
+    go = tmp_path / "Go"
+    (go / "metrics").mkdir(parents=True)
+    (go / "main.go").write_text("package main\n")
+    (go / "myconfig.json").write_text('{"RunConfig": {"Memory": "1G"}}')
+    (go / "plot_usage.py").write_text("# plots\n")
+    (go / "metrics" / "nanos_usage_log.csv").write_text("CPU%\n1\n")
+    return go
+
+
+def _key(category, tmp_path):
+    return ResultCache(str(tmp_path / "cache"), {"go": str(category)},
+                       tools=TOOLS).key(CELL)
+
+
+def test_changed_input_changes_the_key(category, tmp_path, monkeypatch):
+    key, inputs = _key(category, tmp_path)
+    assert sorted(inputs["files"]) == ["main.go", "myconfig.json"]
+    assert _key(category, tmp_path)[0] == key
+
+    # neither results nor plotting are inputs
+    (category / "metrics" / "nanos_usage_log.csv").write_text("CPU%\n2\n")
+    (category / "plot_usage.py").write_text("# other plots\n")
+    assert _key(category, tmp_path)[0] == key
+
+    (category / "main.go").write_text("package main // v2\n")
+    changed_key, changed = _key(category, tmp_path)
+    assert changed_key != key
+    assert changed_inputs(inputs, changed) == ["main.go"]
+
+    monkeypatch.setenv(PIN_ENV, "off")
+    pinned_key, pinned = _key(category, tmp_path)
+    assert pinned_key != changed_key
+    assert changed_inputs(changed, pinned) == ["settings.pin"]
+
+
+def test_restored_cell_matches_the_stored_one(category, tmp_path):
+    cache = ResultCache(str(tmp_path / "cache"), {"go": str(category)},
+                        tools=TOOLS)
+    key, inputs = cache.key(CELL)
+    assert not cache.has(key)
+    results = category / "metrics"
+    (results / "webserver").mkdir()
+    (results / "webserver" / "webserver_metrics_nanos.csv").write_bytes(
+        b"connection,requests_per_sec\n10,1000.5\n")
+    cache.store(key, inputs, str(results))
+    assert cache.has(key) and cache.manifest(key) == inputs
+
+    restored = tmp_path / "restored"
+    files = cache.restore(key, str(restored))
+    assert files == ["nanos_usage_log.csv",
+                     os.path.join("webserver", "webserver_metrics_nanos.csv")]
+    for name in files:
+        assert (restored / name).read_bytes() == (results / name).read_bytes()
+    assert not (restored / MANIFEST).exists()
@@ -0,0 +1,147 @@
+import math
+import os
+
+import pytest
+
+from nanos_eval.cgroup import CgroupSampler, _read_keyed, resolve_cgroup_dir
+from nanos_eval.memory import (CgroupMemorySampler,
+                               ProcessMemorySampler, comparable_columns,
+                               memory_sampler, read_smaps_rollup)
+
+CONTAINER = "c0ffee"
+
+
+def _write(cgroup, usage_usec, memory, rbytes=0):
+    (cgroup / "cpu.stat").write_text(
+        f"usage_usec {usage_usec}\nuser_usec {usage_usec}\nsystem_usec 0\n")
+    (cgroup / "memory.current").write_text(f"{memory}\n")
+    (cgroup / "pids.current").write_text("3\n")
+    (cgroup / "io.stat").write_text(
+        f"8:0 rbytes={rbytes} wbytes=4096 rios=1 wios=1\n"
+        f"8:16 rbytes={rbytes} wbytes=0 rios=1 wios=0\n")
+
+
+@pytest.fixture
+def cgroup(tmp_path):
+    path = tmp_path / "system.slice" / f"docker-{CONTAINER}.scope"
+    path.mkdir(parents=True)
+    _write(path, 1000, 8 << 20)
+    return path
+
+
+def test_resolve_cgroup_dir(tmp_path, cgroup):
+    proc = tmp_path / "proc"
+    (proc / "42").mkdir(parents=True)
+    (proc / "42" / "cgroup").write_text(
+        f"0::/system.slice/docker-{CONTAINER}.scope\n")
+    assert resolve_cgroup_dir(pid=42, root=str(tmp_path),
+                              proc_root=str(proc)) == str(cgroup)
+    assert resolve_cgroup_dir(container_id=CONTAINER,
+                              root=str(tmp_path)) == str(cgroup)
+    with pytest.raises(FileNotFoundError):
+        resolve_cgroup_dir(pid=43, container_id="missing",
+                           root=str(tmp_path), proc_root=str(proc))
+
+
+def test_read_keyed():
+    data = b"anon 10\nfile 20\nanon_thp 5\nanon 1\n"
+    assert _read_keyed(data, ("anon", "file", "shmem")) == {
+        "anon": 11, "file": 20, "shmem": 0}
+
+
+def test_cgroup_sampler(cgroup):
+    sampler = CgroupSampler(str(cgroup))
+    _write(cgroup, 1000, 16 << 20, rbytes=512)
+    cpu, memory, peak, threads, cost, read_bytes, write_bytes = (
+        sampler.sample())
+    assert cpu == 0.0 and cost >= 0
+    assert (memory, peak, threads) == (16 << 20, 16 << 20, 3)
+    assert (read_bytes, write_bytes) == (1024, 4096)
+
+    _write(cgroup, 2000, 4 << 20)
+    cpu, memory, peak = sampler.sample()[:3]
+    assert cpu > 0.0
+    # the peak is the largest memory.current seen while sampling
+    assert (memory, peak) == (4 << 20, 16 << 20)
+    sampler.close()
+
+
+def test_cgroup_sampler_needs_cpu_and_memory(cgroup):
+    (cgroup / "io.stat").unlink()
+    (cgroup / "pids.current").unlink()
+    sampler = CgroupSampler(str(cgroup))
+    row = sampler.sample()
+    assert (row[3], row[5], row[6]) == (0, 0, 0)
+    sampler.close()
+    (cgroup / "memory.current").unlink()
+    with pytest.raises(FileNotFoundError):
+        CgroupSampler(str(cgroup))
+
+
+def _memory_stat(cgroup, anon, file, mapped, pgfault):
+    (cgroup / "memory.stat").write_text(
+        f"anon {anon}\nfile {file}\nkernel 4096\nfile_mapped {mapped}\n"
+        f"pgfault {pgfault}\npgmajfault 2\n")
+
+
+@pytest.fixture
+def memory_cgroup(cgroup):
+    _memory_stat(cgroup, 8 << 20, 6 << 20, 2 << 20, 100)
+    # this process, and one that has exited
+    (cgroup / "cgroup.procs").write_text(f"{os.getpid()}\n999999999\n")
+    return cgroup
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc/self"),
+                    reason="reads smaps_rollup from /proc")
+def test_cgroup_memory_sampler(memory_cgroup):
+    sampler = CgroupMemorySampler(str(memory_cgroup), every=2)
+    row = list(sampler.sample())
+    assert row[:3] == [8 << 20, 2 << 20, 4 << 20]
+    uss, pss = read_smaps_rollup(os.getpid())
+    assert 0 < row[3] <= row[4] and 0 < uss <= pss
+    assert row[5:] == [0.0, 0.0]
+
+    _memory_stat(memory_cgroup, 8 << 20, 1 << 20, 2 << 20, 300)
+    (memory_cgroup / "cgroup.procs").write_text("")
+    row = list(sampler.sample())
+    # a mapped page cache larger than the file total is not negative
+    assert row[2] == 0.0
+    # set sizes are only read every other sample
+    assert row[3] > 0 and row[5] > 0 and row[6] == 0.0
+    row = list(sampler.sample())
+    assert math.isnan(row[3]) and math.isnan(row[4])
+    sampler.close()
+
+    (memory_cgroup / "memory.stat").unlink()
+    with pytest.raises(FileNotFoundError):
+        CgroupMemorySampler(str(memory_cgroup))
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc/self"),
+                    reason="reads /proc/<pid>/status")
+def test_process_memory_sampler():
+    sampler = memory_sampler(pid=os.getpid(), every=1)
+    assert isinstance(sampler, ProcessMemorySampler)
+    anon, mapped, cache, uss, pss = sampler.sample()[:5]
+    assert anon > 0 and mapped > 0 and cache == 0.0
+    assert 0 < uss <= pss
+    sampler.close()
+    with pytest.raises(ProcessLookupError):
+        ProcessMemorySampler(999999999)
+    assert memory_sampler(pid=999999999) is None
+
+
+def test_comparable_columns_skip_unread_pss(tmp_path):
+    pd = pytest.importorskip("pandas")
+    nan = math.nan
+    nanos, docker = tmp_path / "nanos.csv", tmp_path / "docker.csv"
+    pd.DataFrame({"CPU%": [1, 2], "PSS(MB)": [40.0, 41.0],
+                  "USS(MB)": [30.0, 31.0], "Anon(MB)": [20.0, 21.0],
+                  "Page Cache(MB)": [0.0, 0.0]}).to_csv(nanos, index=False)
+    # smaps_rollup of the container was not readable
+    pd.DataFrame({"CPU%": [1, 2], "PSS(MB)": [nan, nan],
+                  "USS(MB)": [nan, 12.0], "Anon(MB)": [10.0, 11.0],
+                  "File(MB)": [5.0, 5.0]}).to_csv(docker, index=False)
+    assert comparable_columns(str(nanos), str(docker)) == ["USS(MB)",
+                                                           "Anon(MB)"]
@@ -0,0 +1,80 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = ("numpy", "pandas", "matplotlib")
+
+
+def _imported(*args):
+    """``{module: cumulative us}`` of a ``python -X importtime`` run."""
+    result = subprocess.run([sys.executable, "-X", "importtime", *args],
+                            cwd=ROOT, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    modules = {}
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line.split(":", 1)[1].split("|")
+            if cumulative.strip().isdigit():
+                modules[name.strip()] = int(cumulative)
+    return modules
+
+
+def _heavy(modules):
+    return sorted(name for name in modules if name.split(".")[0] in HEAVY)
+
+
+def test_help_imports_only_the_standard_library():
+    modules = _imported("-m", "nanos_eval", "--help")
+    assert _heavy(modules) == []
+    # a loose bound that only a heavy import at startup would break
+    assert modules["nanos_eval.cli"] < 500_000
+
+
+def test_sampling_modules_do_not_import_numpy():
+    modules = _imported("-c", "import nanos_eval.monitor, nanos_eval.sidecar,"
+                              " nanos_eval.trace, nanos_eval.memory,"
+                              " nanos_eval.affinity, nanos_eval.discovery")
+    assert _heavy(modules) == []
+
+
+def _monitor(tmp_path, *args):
+    target = subprocess.Popen([sys.executable, "-c",
+                               "import time; time.sleep(30)"])
+    try:
+        env = dict(os.environ, PYTHONPATH=ROOT)
+        result = subprocess.run(
+            [sys.executable, "-m", "nanos_eval", "monitor", str(target.pid),
+             "--name", "sleeper", *args],
+            cwd=tmp_path, env=env, capture_output=True, text=True,
+            timeout=60)
+    finally:
+        target.kill()
+        target.wait()
+    assert result.returncode == 0, result.stderr
+    return result
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc/self/task"),
+                    reason="the thread sampler reads /proc")
+def test_monitor_creates_metrics_first(tmp_path):
+    _monitor(tmp_path, "--vcpus", "1", "--duration", "0.3")
+    with open(tmp_path / "metrics" / "sleeper_threads_log.csv") as f:
+        assert f.readline().startswith("Time Stamp,TID")
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc/self/task"),
+                    reason="the sampler reads /proc")
+def test_sidecar_monitor_processes_while_sampling(tmp_path):
+    (tmp_path / "metrics").mkdir()
+    # a stale raw log of another run must not end up in this one
+    (tmp_path / "metrics" / "raw_sleeper_usage_log.col").write_bytes(
+        b"stale")
+    result = _monitor(tmp_path, "--duration", "0.5", "--interval", "0.05",
+                      "--sidecar")
+    samples = int(result.stdout.split("Monitoring complete. ")[1].split()[0])
+    with open(tmp_path / "metrics" / "sleeper_usage_log.csv") as f:
+        assert len(f.readlines()) == samples + 1
+
@@ -0,0 +1,58 @@
+import pytest
+
+from nanos_eval import discovery
+
+# pid: (ppid, argv, comm, children of each task)
+TREE = {
+    100: (1, ["ops", "run"], "ops", {100: [200], 101: []}),
+    200: (100, ["/usr/local/bin/ops"], "ops", {200: [300, 301]}),
+    300: (200, ["sh", "-c", "qemu-img"], "sh", {300: [302]}),
+    301: (200, ["/usr/bin/qemu-system-x86_64", "-m", "2G"],
+          "qemu-system-x86", {301: []}),
+    # a zombie's cmdline is empty, so only comm is left
+    302: (300, [], "qemu-img", {302: []}),
+}
+
+
+@pytest.fixture
+def proc(tmp_path, monkeypatch):
+    for pid, (ppid, argv, comm, tasks) in TREE.items():
+        root = tmp_path / str(pid)
+        for tid, children in tasks.items():
+            (root / "task" / str(tid)).mkdir(parents=True)
+            (root / "task" / str(tid) / "children").write_text(
+                "".join(f"{child} " for child in children))
+        (root / "cmdline").write_bytes(
+            b"".join(arg.encode() + b"\0" for arg in argv))
+        (root / "comm").write_text(comm + "\n")
+        (root / "stat").write_text(f"{pid} ({comm}) S {ppid} {pid} 0 0")
+    (tmp_path / "self").mkdir()
+    monkeypatch.setattr(discovery, "PROC", str(tmp_path))
+    monkeypatch.setattr(discovery, "HAS_PROC", True)
+    monkeypatch.setattr(discovery, "HAS_CHILDREN_LIST", True)
+    return tmp_path
+
+
+def test_descendants_closest_first(proc):
+    assert discovery.descendants(100) == [200, 300, 301, 302]
+    assert discovery.descendants(302) == []
+    assert discovery.descendants(999) == []
+
+
+def test_descendants_without_children_lists(proc, monkeypatch):
+    monkeypatch.setattr(discovery, "HAS_CHILDREN_LIST", False)
+    assert sorted(discovery.descendants(100)) == [200, 300, 301, 302]
+    assert discovery.descendants(200)[:2] == [300, 301]
+
+
+def test_process_name(proc):
+    assert discovery.process_name(301) == "qemu-system-x86_64"
+    assert discovery.process_name(302) == "qemu-img"
+    assert discovery.process_name(999) is None
+
+
+def test_find_child(proc):
+    assert discovery.find_child(100, "qemu-system") == 301
+    assert discovery.find_child(100, "qemu-img") == 302
+    assert discovery.find_child(200, "ops") is None
+    assert discovery.find_child(100, "dockerd") is None
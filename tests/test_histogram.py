@@ -0,0 +1,89 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from nanos_eval.histogram import (SUMMARY_PERCENTILES,  # noqa: E402
+                                  LatencyHistogram, load_histograms,
+                                  merge_histograms, save_histograms)
+
+
+def test_small_values_are_exact():
+    histogram = LatencyHistogram()
+    for value in range(256):
+        histogram.record(value)
+    low, high = histogram._bounds(np.arange(256))
+    assert (low == np.arange(256)).all() and (high == low).all()
+    assert histogram.percentile(50) == pytest.approx(127.5, abs=0.5)
+    assert histogram.percentile(100) == 255
+
+
+def test_buckets_cover_every_value_once():
+    histogram = LatencyHistogram(sub_bucket_bits=4, max_bits=12)
+    values = np.arange(1 << 12)
+    index = histogram._indices(values)
+    assert (index == [histogram._index(int(v)) for v in values]).all()
+    low, high = histogram._bounds(index)
+    assert (low <= values).all() and (values <= high).all()
+    # buckets are contiguous and never wider than the promised error
+    assert (np.diff(index) >= 0).all()
+    assert ((high - low + 1) <= np.maximum(values * 2 ** (1 - 4), 1)).all()
+
+
+def test_percentiles_are_within_the_bucket_error():
+    values = np.random.default_rng(0).lognormal(8, 1.5, 20000).astype(
+        np.int64)
+    histogram = LatencyHistogram()
+    histogram.record_many(values)
+    for quantile in (50, 90, 99, 99.9):
+        exact = np.percentile(values, quantile, method="inverted_cdf")
+        assert histogram.percentile(quantile) == pytest.approx(
+            exact, rel=2 ** -7)
+    assert histogram.percentile(100) == values.max()
+    assert histogram.mean == pytest.approx(values.mean())
+    assert (histogram.min, histogram.max) == (values.min(), values.max())
+
+
+def test_values_are_clamped():
+    histogram = LatencyHistogram(max_bits=10)
+    histogram.record(-5)
+    histogram.record_many([1 << 20])
+    assert (histogram.min, histogram.max) == (0, (1 << 10) - 1)
+    assert histogram.counts.sum() == 2
+
+
+def test_merge_and_round_trip(tmp_path):
+    steps = []
+    for connection, repetition, values in ((10, 0, [100, 200]),
+                                           (10, 1, [300]),
+                                           (50, 0, [1000, 5000])):
+        histogram = LatencyHistogram()
+        histogram.record_many(values)
+        steps.append({"connection": connection, "repetition": repetition,
+                      "histogram": histogram})
+    path = str(tmp_path / "histograms.json")
+    merged = save_histograms(path, steps)
+    assert merged[10].total == 3 and merged[10].max == 300
+    assert merged[50].summary()["latency_max_ms"] == 5.0
+
+    loaded_steps, loaded = load_histograms(path)
+    assert [s["repetition"] for s in loaded_steps] == [0, 1, 0]
+    for key in merged:
+        assert (loaded[key].counts == merged[key].counts).all()
+        assert loaded[key].summary() == merged[key].summary()
+
+    assert merge_histograms([]).total == 0
+    with pytest.raises(ValueError):
+        LatencyHistogram().merge(LatencyHistogram(sub_bucket_bits=4))
+
+
+def test_summary_columns():
+    histogram = LatencyHistogram()
+    histogram.record_many([1000] * 1998 + [250000] * 2)
+    summary = histogram.summary()
+    assert list(summary) == ["latency_avg_ms"] + [
+        f"latency_{name}_ms" for name in SUMMARY_PERCENTILES]
+    # bucket midpoints, within the 0.4% bucket error of the exact 1 ms
+    assert summary["latency_p50_ms"] == summary["latency_p99_ms"] == 1.002
+    assert summary["latency_max_ms"] == 250.0
+    assert summary["latency_avg_ms"] == 1.249
+    assert LatencyHistogram().summary()["latency_p99_ms"] == 0.0
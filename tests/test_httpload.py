@@ -0,0 +1,117 @@
+import asyncio
+import socket
+import threading
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from nanos_eval.httpload import ERROR_KINDS, parse_duration, run_load  # noqa: E402
+
+
+class StandInServer:
+    """A keep-alive HTTP server on its own event loop thread.
+
+    ``/`` answers 200, ``/missing`` 404 and ``/drop`` closes the
+    connection without answering. ``requests`` counts requests read.
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.loop = asyncio.new_event_loop()
+        started = threading.Event()
+        self.thread = threading.Thread(target=self._run, args=(started,),
+                                       daemon=True)
+        self.thread.start()
+        started.wait()
+
+    def _run(self, started):
+        asyncio.set_event_loop(self.loop)
+        self.server = self.loop.run_until_complete(
+            asyncio.start_server(self._handle, "127.0.0.1", 0))
+        self.port = self.server.sockets[0].getsockname()[1]
+        started.set()
+        self.loop.run_forever()
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                self.requests += 1
+                path = head.split(b" ", 2)[1]
+                if path == b"/drop":
+                    break
+                status = b"404 Not Found" if path == b"/missing" else b"200 OK"
+                writer.write(b"HTTP/1.1 " + status
+                             + b"\r\nContent-Length: 5\r\n\r\nhello")
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    def close(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+
+
+@pytest.fixture
+def server():
+    server = StandInServer()
+    yield server
+    server.close()
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_parse_duration():
+    assert parse_duration("10s") == 10.0
+    assert parse_duration("250ms") == 0.25
+    assert parse_duration("2m") == 120.0
+    assert parse_duration(5) == 5.0
+
+
+def test_every_answered_request_is_counted(server):
+    result = run_load(f"http://127.0.0.1:{server.port}/", 4, 0.3, workers=1)
+    assert result["connections"] == 4
+    assert result["requests"] > 0
+    assert result["requests"] == server.requests
+    assert result["errors"] == dict.fromkeys(ERROR_KINDS, 0)
+    histogram = result["histogram"]
+    assert histogram.total == result["requests"]
+    assert 0 < histogram.min <= histogram.max
+    assert result["latency_avg_ms"] == pytest.approx(histogram.mean / 1000)
+    assert result["requests_per_sec"] == pytest.approx(
+        result["requests"] / 0.3, rel=0.5)
+
+
+def test_workers_are_merged(server):
+    result = run_load(f"http://127.0.0.1:{server.port}/", 2, 0.2, workers=2)
+    assert result["requests"] == server.requests > 0
+    assert result["histogram"].total == result["requests"]
+
+
+def test_error_statuses_are_counted(server):
+    result = run_load(f"http://127.0.0.1:{server.port}/missing", 1, 0.2,
+                      workers=1)
+    assert result["requests"] > 0
+    assert result["errors"]["status"] == result["requests"]
+
+
+def test_dropped_connections_are_read_errors(server):
+    result = run_load(f"http://127.0.0.1:{server.port}/drop", 1, 0.2,
+                      workers=1)
+    assert result["requests"] == 0
+    assert result["errors"]["read"] == server.requests > 0
+
+
+def test_unreachable_port():
+    result = run_load(f"http://127.0.0.1:{_free_port()}/", 2, 0.1, workers=1)
+    assert result["requests"] == 0
+    assert result["requests_per_sec"] == 0.0
+    assert result["errors"]["connect"] > 0
+    assert result["histogram"].total == 0
@@ -0,0 +1,101 @@
+import pytest
+
+from nanos_eval.matrix import (CELL_ENV, PAIR_ENV, Checkpoint, FakeDriver,
+                               cell_id, expand, mark_run, order_cells,
+                               run_matrix, same_pair, select_loads)
+
+MATRIX = {"repetitions": 2, "platforms": ["nanos", "docker"],
+          "workloads": {"go": {"loads": {"c10": [10], "c50": [50]}},
+                        "compute": {"repetitions": 1}}}
+
+
+def test_expand():
+    cells = expand(MATRIX)
+    assert len(cells) == 2 * 2 * 2 + 2
+    assert cells[0] == ("go", "nanos", "c10", [10], 0)
+    assert {c.load for c in cells if c.workload == "compute"} == {"all"}
+    assert cell_id(cells[-1]) == "compute-docker-all-r0"
+
+
+def test_sequential_runs_one_platform_after_the_other():
+    cells = order_cells(expand(MATRIX), "sequential")
+    go = [c.platform for c in cells if c.workload == "go"]
+    assert go == ["nanos"] * 4 + ["docker"] * 4
+
+
+def test_interleaved_alternates_abba():
+    cells = order_cells(expand(MATRIX), "interleaved")
+    go = [c.platform[0] for c in cells if c.workload == "go"]
+    assert "".join(go) == "ndd" "nnd" "dn"
+    # both platforms of a load and repetition still run back to back
+    for first, second in zip(cells[::2], cells[1::2]):
+        assert (first.workload, first.load, first.repetition) == (
+            second.workload, second.load, second.repetition)
+
+
+def test_randomized_is_a_seeded_permutation():
+    cells = expand(MATRIX)
+    ordered = order_cells(cells, "randomized", seed=3)
+    assert sorted(ordered) == sorted(cells)
+    assert ordered == order_cells(cells, "randomized", seed=3)
+
+
+def test_unknown_order():
+    with pytest.raises(ValueError, match="unknown order"):
+        order_cells(expand(MATRIX), "alphabetical")
+
+
+def test_resume_retries_only_failed_cells(tmp_path):
+    cells = order_cells(expand(MATRIX), "interleaved")
+    out_dir = str(tmp_path / "matrix")
+    path = str(tmp_path / "matrix" / "checkpoint.jsonl")
+    failing = cell_id(cells[3])
+
+    driver = FakeDriver(fail=[failing])
+    with Checkpoint(path) as checkpoint:
+        assert run_matrix(cells, driver, checkpoint, out_dir) == (
+            len(cells) - 1, 0, 0, 1)
+    # a crash mid-write leaves a torn last line behind
+    with open(path, "a") as f:
+        f.write('{"cell": "go-nan')
+
+    driver = FakeDriver()
+    with Checkpoint(path) as checkpoint:
+        assert run_matrix(cells, driver, checkpoint, out_dir) == (
+            1, 0, len(cells) - 1, 0)
+    assert [cell_id(c) for c in driver.calls] == [failing]
+    assert (tmp_path / "matrix" / failing / "cell.json").exists()
+
+    driver = FakeDriver()
+    with Checkpoint(path) as checkpoint:
+        run_matrix(cells, driver, checkpoint, out_dir)
+    assert driver.calls == []
+
+
+def test_select_loads_keeps_warm_up(monkeypatch):
+    loads = [{"connection": 10, "warm_up": True}, {"connection": 10},
+             {"connection": 50}]
+    monkeypatch.delenv("NANOS_EVAL_CONNECTIONS", raising=False)
+    assert select_loads(loads) == loads
+    assert select_loads(loads, [50]) == [loads[0], loads[2]]
+
+
+def test_only_runs_of_one_pair_are_compared(tmp_path, monkeypatch):
+    metrics = str(tmp_path)
+    monkeypatch.delenv(PAIR_ENV, raising=False)
+    mark_run("nanos", metrics)
+    mark_run("docker", metrics)
+    assert same_pair(["nanos", "docker"], metrics)
+
+    monkeypatch.setenv(CELL_ENV, "go-nanos-c10-r0")
+    monkeypatch.setenv(PAIR_ENV, "go-c10-r0")
+    mark_run("nanos", metrics)
+    assert not same_pair(["nanos", "docker"], metrics)
+    monkeypatch.setenv(CELL_ENV, "go-docker-c10-r0")
+    mark_run("docker", metrics)
+    assert same_pair(["nanos", "docker"], metrics)
+
+    monkeypatch.setenv(CELL_ENV, "go-docker-c50-r0")
+    monkeypatch.setenv(PAIR_ENV, "go-c50-r0")
+    mark_run("docker", metrics)
+    assert not same_pair(["nanos", "docker"], metrics)
@@ -0,0 +1,68 @@
+import threading
+import time
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+from nanos_eval.processing import follow_metrics, process_metrics  # noqa: E402
+from nanos_eval.storage import ColumnarWriter, follow_frames  # noqa: E402
+
+COLUMNS = ["Time Stamp", "CPU", "Memory(KB)", "Peak(KB)"]
+
+
+def _row(n):
+    return [1000.0 + n / 10, float(n % 7), 4096.0 * (n + 1), 4096.0 * (n + 1)]
+
+
+def _write_slowly(path, rows):
+    with ColumnarWriter(path, COLUMNS, batch_size=8) as writer:
+        for n in range(rows):
+            writer.write(_row(n))
+            if n % 8 == 7:
+                time.sleep(0.01)
+
+
+def test_follow_frames_reads_rows_as_they_are_flushed(tmp_path):
+    path = str(tmp_path / "raw.col")
+    writer = threading.Thread(target=_write_slowly, args=(path, 100))
+    writer.start()
+    frames = list(follow_frames(path, writer.is_alive, chunksize=16,
+                                poll_interval=0.005))
+    writer.join()
+    assert len(frames) > 1
+    assert max(len(frame) for frame in frames) <= 16
+    rows = pd.concat(frames, ignore_index=True)
+    assert rows["Time Stamp"].tolist() == [_row(n)[0] for n in range(100)]
+
+
+def test_follow_frames_ignores_a_torn_row(tmp_path):
+    path = str(tmp_path / "raw.col")
+    with ColumnarWriter(path, COLUMNS) as writer:
+        for n in range(5):
+            writer.write(_row(n))
+    with open(path, "ab") as f:
+        f.write(b"\0" * 12)
+    frames = list(follow_frames(path, lambda: False))
+    assert sum(len(frame) for frame in frames) == 5
+
+
+def test_follow_frames_without_a_log(tmp_path):
+    assert list(follow_frames(str(tmp_path / "none.col"), lambda: False)) == []
+
+
+def test_follow_metrics_matches_process_metrics(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "metrics").mkdir()
+    path = "metrics/raw.col"
+    writer = threading.Thread(target=_write_slowly, args=(path, 200))
+    writer.start()
+    followed = follow_metrics(path, 0, 1000.0, "live", writer.is_alive,
+                              chunksize=32, poll_interval=0.005)
+    writer.join()
+    after = process_metrics(path, 0, 1000.0, "after")
+    assert followed == "metrics/live_usage_log.csv"
+    pd.testing.assert_frame_equal(pd.read_csv(followed), pd.read_csv(after))
+    pd.testing.assert_frame_equal(
+        pd.read_csv("metrics/live_usage_summary.csv"),
+        pd.read_csv("metrics/after_usage_summary.csv"))
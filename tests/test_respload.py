@@ -0,0 +1,194 @@
+import asyncio
+import collections
+import socket
+import threading
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from nanos_eval.respload import (ERROR_KINDS, _read_reply,  # noqa: E402
+                                 benchmark_rows, encode_command, key_indices,
+                                 run_resp_load)
+
+
+def test_encode_command():
+    assert encode_command("GET", b"key:1", b"v") == (
+        b"*2\r\n$3\r\nGET\r\n$5\r\nkey:1\r\n")
+    assert encode_command("SET", b"k", b"xyz") == (
+        b"*3\r\n$3\r\nSET\r\n$1\r\nk\r\n$3\r\nxyz\r\n")
+    assert encode_command("INCR", b"k", b"") == (
+        b"*2\r\n$4\r\nINCR\r\n$9\r\ncounter:k\r\n")
+    assert encode_command("HSET", b"k", b"") == (
+        b"*4\r\n$4\r\nHSET\r\n$6\r\nhash:k\r\n$5\r\nfield\r\n$0\r\n\r\n")
+    with pytest.raises(ValueError):
+        encode_command("FLUSHALL", b"k", b"")
+
+
+def _replies(data):
+    """``(errors, leftover)`` of reading replies until ``data`` runs out."""
+    async def read():
+        reader = asyncio.StreamReader()
+        reader.feed_data(data)
+        reader.feed_eof()
+        errors = []
+        while not reader.at_eof():
+            errors.append(await _read_reply(reader))
+        return errors
+    return asyncio.run(read())
+
+
+def test_read_reply():
+    assert _replies(b"+OK\r\n:42\r\n$3\r\nbar\r\n$-1\r\n"
+                    b"-ERR wrong type\r\n") == [False, False, False, False,
+                                                True]
+    # a value that itself holds CRLF is read by length, not by line
+    assert _replies(b"$4\r\na\r\nb\r\n+OK\r\n") == [False, False]
+    # arrays are read to the end, and an error anywhere in them counts
+    assert _replies(b"*2\r\n$1\r\na\r\n-ERR\r\n*0\r\n*-1\r\n") == [
+        True, False, False]
+
+
+def test_truncated_reply():
+    with pytest.raises(asyncio.IncompleteReadError):
+        _replies(b"$10\r\nshort\r\n")
+
+
+def test_key_indices():
+    uniform = key_indices(1000, 50, seed=1)
+    assert uniform.min() >= 0 and uniform.max() < 50
+    assert (uniform == key_indices(1000, 50, seed=1)).all()
+    zipf = key_indices(10000, 1000, "zipfian", seed=1)
+    assert zipf.min() >= 0 and zipf.max() < 1000
+    # the hottest key gets far more than its uniform share
+    assert (zipf == 0).sum() > 10000 / 1000 * 20
+    with pytest.raises(ValueError):
+        key_indices(1, 10, "gaussian")
+
+
+class FakeRedis:
+    """A RESP server on its own event loop thread.
+
+    Counts the commands it gets by name and the most commands a
+    connection had waiting for replies at once. ``INCR`` gets an error
+    reply and ``LPUSH`` closes the connection without one.
+    """
+
+    def __init__(self):
+        self.commands = collections.Counter()
+        self.in_flight = 0
+        self.loop = asyncio.new_event_loop()
+        started = threading.Event()
+        self.thread = threading.Thread(target=self._run, args=(started,),
+                                       daemon=True)
+        self.thread.start()
+        started.wait()
+
+    def _run(self, started):
+        asyncio.set_event_loop(self.loop)
+        server = self.loop.run_until_complete(
+            asyncio.start_server(self._handle, "127.0.0.1", 0))
+        self.port = server.sockets[0].getsockname()[1]
+        started.set()
+        self.loop.run_forever()
+
+    async def _handle(self, reader, writer):
+        buffer = b""
+        try:
+            while True:
+                data = await reader.read(65536)
+                if not data:
+                    break
+                buffer += data
+                names = []
+                while True:
+                    name, buffer = _parse_command(buffer)
+                    if name is None:
+                        break
+                    names.append(name)
+                self.in_flight = max(self.in_flight, len(names))
+                for name in names:
+                    self.commands[name] += 1
+                    if name == "LPUSH":
+                        return
+                    writer.write(b"-ERR not an integer\r\n"
+                                 if name == "INCR" else b"+OK\r\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    def close(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+
+
+def _parse_command(buffer):
+    """``(name, rest)`` of the first whole command, or ``(None, buffer)``."""
+    lines = buffer.split(b"\r\n")
+    if len(lines) < 2 or not lines[0].startswith(b"*"):
+        return None, buffer
+    parts = int(lines[0][1:])
+    if len(lines) < 2 * parts + 2:
+        return None, buffer
+    size = sum(len(line) + 2 for line in lines[:2 * parts + 1])
+    return lines[2].decode(), buffer[size:]
+
+
+@pytest.fixture
+def redis():
+    server = FakeRedis()
+    yield server
+    server.close()
+
+
+def test_requests_follow_the_mix(redis):
+    result = run_resp_load("127.0.0.1", redis.port, 2, 1000,
+                           mix={"GET": 9, "SET": 1}, pipeline=8, seed=1)
+    tests = result["tests"]
+    assert {name: test["requests"] for name, test in tests.items()} == dict(
+        redis.commands)
+    assert tests["GET"]["requests"] + tests["SET"]["requests"] == 1000
+    assert 850 < tests["GET"]["requests"] < 950
+    assert result["errors"] == dict.fromkeys(ERROR_KINDS, 0)
+    # every command is answered, and a batch is sent in one write
+    assert redis.in_flight == 8
+    rows = {row["test"]: row for row in benchmark_rows(result, 2)}
+    assert rows["GET"]["requests"] == tests["GET"]["requests"]
+    assert rows["SET"]["requests"] == tests["SET"]["requests"]
+    assert rows["SET"]["connection"] == 2
+
+
+def test_pipeline_depth_is_a_ceiling(redis):
+    run_resp_load("127.0.0.1", redis.port, 1, 200, pipeline=1, seed=1)
+    assert redis.in_flight == 1
+
+
+def test_error_replies_and_lost_commands(redis):
+    result = run_resp_load("127.0.0.1", redis.port, 1, 40,
+                           mix={"INCR": 1}, pipeline=4, seed=1)
+    assert result["tests"]["INCR"]["errors"] == 40
+    assert result["errors"]["reply"] == 40
+
+    result = run_resp_load("127.0.0.1", redis.port, 1, 12,
+                           mix={"LPUSH": 1}, pipeline=4, seed=1)
+    # each batch of 4 loses all four commands when the server hangs up
+    assert result["tests"]["LPUSH"]["requests"] == 0
+    assert result["tests"]["LPUSH"]["errors"] == 12
+    assert result["errors"]["read"] == 12
+
+
+def test_unreachable_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    result = run_resp_load("127.0.0.1", port, 2, 50, connect_retries=2,
+                           seed=1)
+    errors = result["errors"]
+    # each connection tries once and retries twice before giving up
+    assert errors["connect"] == 2 * 3
+    assert (errors["read"], errors["reply"]) == (0, 0)
+    assert errors["unsent"] == 50
+    assert sum(test["errors"] for test in result["tests"].values()) == 50
+    assert sum(row["requests"] for row in benchmark_rows(result, 2)) == 0
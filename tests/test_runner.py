@@ -0,0 +1,70 @@
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+pytest.importorskip("pandas")
+pytest.importorskip("matplotlib")
+psutil = pytest.importorskip("psutil")
+
+from nanos_eval.affinity import Pinning  # noqa: E402
+from nanos_eval.events import EventLog  # noqa: E402
+from nanos_eval.runner import Category, compare, main, monitor  # noqa: E402
+
+LOADS = [{"connection": 10, "warm_up": True}, {"connection": 50}]
+
+
+def _benchmark(platform, phase):
+    """Two load steps of 0.3 s, noted like a category's test server."""
+    with EventLog(f"metrics/{platform}_events.jsonl") as events:
+        events.record("load_started")
+        for step in range(len(LOADS)):
+            phase.value = step
+            time.sleep(0.3)
+    phase.value = -1
+
+
+@pytest.fixture
+def metrics(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "metrics").mkdir()
+    return tmp_path / "metrics"
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc/self"),
+                    reason="samples through /proc")
+def test_monitor_runs_the_benchmark_and_stops_the_workload(metrics):
+    workload = subprocess.Popen([sys.executable, "-c",
+                                 "import time; time.sleep(30)"])
+    category = Category("go", ["true"], "image", 0.05, benchmark=_benchmark,
+                        loads=LOADS)
+    try:
+        final_log = monitor(category, 0, psutil.Process(workload.pid),
+                            "nanos", Pinning(1, mode="off"), "nanos")
+        # the workload is killed once the load is done
+        assert workload.wait(timeout=10) != 0
+    finally:
+        workload.kill()
+    assert final_log == "metrics/nanos_usage_log.csv"
+    for name in ("nanos_usage_log.csv", "nanos_phases.csv",
+                 "nanos_pinning.json", "raw_nanos_usage_log.col"):
+        assert (metrics / name).exists()
+
+
+def test_compare_needs_both_platforms(metrics, capsys, monkeypatch):
+    ingested = []
+    monkeypatch.setattr("nanos_eval.warehouse.ingest_run",
+                        lambda workload, platform: ingested.append(
+                            (workload, platform)))
+    category = Category("nginx", ["true"], "image", 0.1, log_name="ops")
+    (metrics / "docker_usage_log.csv").write_text("CPU%\n1\n")
+    compare(category, ["docker"])
+    assert ingested == [("nginx", "docker")]
+    assert capsys.readouterr().out == ""
+
+
+def test_startup_needs_a_port(metrics):
+    with pytest.raises(SystemExit, match="compute has no startup benchmark"):
+        main(Category("compute", ["true"], "image", 0.1), ["startup"])
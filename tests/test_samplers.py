@@ -0,0 +1,80 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from nanos_eval.scheduler import FixedIntervalScheduler
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def _run(scheduler, clock, costs):
+    """Tick times of a loop whose body takes ``costs[n]`` seconds."""
+    times = []
+    for cost, tick in zip(costs, scheduler.ticks()):
+        times.append((tick, round(clock.now - 1000.0, 6)))
+        clock.now += cost
+    return times
+
+
+def test_ticks_stay_on_the_grid():
+    clock = FakeClock()
+    scheduler = FixedIntervalScheduler(0.01, clock=clock, sleep=clock.sleep)
+    times = _run(scheduler, clock, [0.003, 0.007, 0.0, 0.0099])
+    assert times == [(0, 0.0), (1, 0.01), (2, 0.02), (3, 0.03)]
+    assert scheduler.missed == 0
+    # the time spent sampling is taken off the next sleep
+    assert clock.sleeps == pytest.approx([0.007, 0.003, 0.01])
+
+
+def test_late_ticks_are_skipped_not_bunched():
+    clock = FakeClock()
+    scheduler = FixedIntervalScheduler(0.01, clock=clock, sleep=clock.sleep)
+    times = _run(scheduler, clock, [0.035, 0.002, 0.012, 0.0])
+    # a tick more than an interval late fires at once, without the ticks
+    # it overran; a slightly late one fires at once and keeps its number
+    assert times == [(0, 0.0), (3, 0.035), (4, 0.04), (5, 0.052)]
+    assert scheduler.missed == 2
+
+
+def test_interval_must_be_positive():
+    with pytest.raises(ValueError):
+        FixedIntervalScheduler(0)
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc/self"),
+                    reason="ProcSampler reads /proc")
+def test_proc_sampler_on_a_local_process():
+    from nanos_eval.procfs import ProcSampler
+
+    target = subprocess.Popen([sys.executable, "-c",
+                               "import sys; sys.stdin.read()"],
+                              stdin=subprocess.PIPE)
+    try:
+        sampler = ProcSampler(target.pid)
+        cpu, memory, peak, threads, cost = sampler.sample()
+        assert cpu >= 0.0 and threads >= 1 and cost >= 0
+        assert 0 < memory <= peak
+        target.stdin.close()
+        target.wait()
+        with pytest.raises(ProcessLookupError):
+            sampler.sample()
+        sampler.close()
+    finally:
+        target.kill()
+        target.wait()
+
+    with pytest.raises(ProcessLookupError):
+        ProcSampler(target.pid)
@@ -0,0 +1,62 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from nanos_eval.sidecar import RingBuffer  # noqa: E402
+
+
+@pytest.fixture
+def ring():
+    ring = RingBuffer(2, 4)
+    yield ring
+    ring.close()
+
+
+def _put(ring, first, last):
+    for n in range(first, last):
+        ring.put((n, -n))
+
+
+def test_drain_across_the_wrap(ring):
+    assert ring.drain().shape == (0, 2)
+    _put(ring, 0, 3)
+    assert ring.drain()[:, 0].tolist() == [0, 1, 2]
+    # slots 3, 0 and 1: the block wraps around the end of the ring
+    _put(ring, 3, 6)
+    assert ring.drain().tolist() == [[3, -3], [4, -4], [5, -5]]
+    assert ring.dropped == 0
+
+
+def test_overfilled_ring_drops_the_oldest(ring):
+    _put(ring, 0, 2)
+    ring.drain()
+    _put(ring, 2, 13)
+    # 11 records behind a ring of 4: the 7 oldest are lost
+    assert ring.drain()[:, 0].tolist() == [9, 10, 11, 12]
+    assert ring.dropped == 7
+    _put(ring, 13, 15)
+    assert ring.drain()[:, 0].tolist() == [13, 14]
+    assert ring.dropped == 7
+
+
+class _Lapping:
+    """Records that the writer laps while :meth:`take` copies them."""
+
+    def __init__(self, ring, records):
+        self.ring, self.records = ring, records
+
+    def take(self, *args, **kwargs):
+        block = self.records.take(*args, **kwargs)
+        self.ring._records = self.records
+        _put(self.ring, 4, 7)
+        return block
+
+
+def test_records_lapped_during_the_copy_are_dropped(ring):
+    _put(ring, 0, 4)
+    ring._records = _Lapping(ring, ring._records)
+    # 4, 5 and 6 overwrote 0, 1 and 2 before the copy was checked
+    assert ring.drain()[:, 0].tolist() == [3]
+    assert ring.dropped == 3
+    assert ring.drain()[:, 0].tolist() == [4, 5, 6]
+    assert ring.dropped == 3
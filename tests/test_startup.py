@@ -0,0 +1,84 @@
+import os
+import socket
+import sys
+
+import pytest
+
+from nanos_eval import startup
+from nanos_eval.startup import STAGES, measure_startup, summarize
+
+# Starts a child, then a listener that accepts well before it answers,
+# like a host-side port forward in front of a booting guest.
+LAUNCHER = """
+import socket, subprocess, sys, time
+child = subprocess.Popen(["sleep", "30"])
+listener = socket.create_server(("127.0.0.1", int(sys.argv[1])))
+ready = time.monotonic() + 0.3
+while True:
+    conn, _ = listener.accept()
+    if time.monotonic() >= ready:
+        conn.recv(1024)
+        conn.sendall(b"HTTP/1.1 200 OK\\r\\nContent-Length: 0\\r\\n\\r\\n")
+    conn.close()
+"""
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc/self"),
+                    reason="find_child reads /proc")
+def test_measure_startup_stages():
+    port = _free_port()
+    result = measure_startup([sys.executable, "-c", LAUNCHER, str(port)],
+                             port=port, probe="http", child_name="sleep",
+                             timeout=20, probe_timeout=0.2)
+    assert list(result) == list(STAGES)
+    assert None not in result.values()
+    assert result["spawn"] <= result["child"]
+    assert result["spawn"] <= result["forward"] <= result["response"]
+    assert result["response"] - result["forward"] >= 250
+
+
+def test_measure_startup_stops_when_the_launcher_exits():
+    result = measure_startup([sys.executable, "-c", "pass"],
+                             port=_free_port(), probe="http", timeout=20)
+    assert result["spawn"] is not None
+    assert (result["forward"], result["response"]) == (None, None)
+
+
+def _recorded_waits(monkeypatch, **kwargs):
+    waits = []
+    monkeypatch.setattr(startup, "exit_waiter",
+                        lambda pid: (waits.append, lambda: None))
+    measure_startup([sys.executable, "-c", "import time; time.sleep(5)"],
+                    timeout=0.2, **kwargs)
+    return waits
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc/self"),
+                    reason="find_child reads /proc")
+def test_port_is_polled_without_backoff(monkeypatch):
+    waits = _recorded_waits(monkeypatch, port=_free_port(), probe="http",
+                            child_name="qemu")
+    assert len(waits) > 10
+    assert set(waits) == {0.0005}
+    # with only the child left to find, the interval backs off
+    waits = _recorded_waits(monkeypatch, child_name="qemu")
+    assert waits[:3] == [0.0005, 0.001, 0.002]
+    assert max(waits) == 0.01
+
+
+def test_summarize():
+    results = [dict(spawn=float(n), child=None, forward=10.0 * n,
+                    response=None) for n in range(1, 11)]
+    summary = summarize(results)
+    assert set(summary) == {"spawn", "forward"}
+    assert summary["spawn"]["n"] == 10
+    assert (summary["spawn"]["min"], summary["spawn"]["max"]) == (1.0, 10.0)
+    assert summary["spawn"]["p50"] == 5.5
+    assert summary["forward"]["p90"] == pytest.approx(91.0)
+    assert summarize([dict.fromkeys(STAGES)]) == {}
@@ -0,0 +1,83 @@
+import math
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+
+from nanos_eval.stats import (bootstrap_mean_diff, compare,  # noqa: E402
+                              holm, magnitude, mann_whitney, to_number)
+
+
+def _long(*groups):
+    """``(groups, sides, values)`` of ``[(baseline, candidate), ...]``."""
+    g, s, v = [], [], []
+    for code, (baseline, candidate) in enumerate(groups):
+        for side, values in enumerate((baseline, candidate)):
+            g += [code] * len(values)
+            s += [side] * len(values)
+            v += list(values)
+    return (np.array(g), np.array(s), np.array(v, dtype=np.float64))
+
+
+def test_mann_whitney_with_tied_ranks():
+    # ranks 1, 2.5, 2.5, 4.5, 4.5, 6: the candidate's sum is 13, so
+    # U = 13 - 3 * 4 / 2 = 7; two ties of two correct the variance
+    u, p = mann_whitney(*_long(([1, 2, 3], [2, 3, 4])), 1)
+    assert u.tolist() == [7.0]
+    sigma = math.sqrt(3 * 3 / 12 * (7 - 12 / 30))
+    assert p[0] == pytest.approx(math.erfc((7 - 4.5 - 0.5) / sigma
+                                           / math.sqrt(2)))
+    assert p[0] == pytest.approx(0.368688, abs=1e-6)
+
+
+def test_mann_whitney_groups_are_independent():
+    u, p = mann_whitney(*_long(([1, 2, 3, 4, 5], [6, 7, 8, 9, 10]),
+                               ([6, 7, 8, 9, 10], [1, 2, 3, 4, 5]),
+                               ([1, 1], [1, 1])), 3)
+    assert u.tolist() == [25.0, 0.0, 2.0]
+    assert p[0] == pytest.approx(0.012186, abs=1e-6) and p[1] == p[0]
+    # all values tied: no spread to test
+    assert math.isnan(p[2])
+
+
+def test_holm():
+    adjusted = holm([0.01, 0.04, 0.03, np.nan, 0.5])
+    # sorted: 0.01 * 4, 0.03 * 3, 0.04 * 2 (raised to 0.09), 0.5 * 1
+    assert adjusted[[0, 1, 2, 4]] == pytest.approx([0.04, 0.09, 0.09, 0.5])
+    assert math.isnan(adjusted[3])
+    assert holm([0.6, 0.7]).tolist() == [1.0, 1.0]
+
+
+def test_bootstrap_ci():
+    groups, sides, values = _long(([1.0] * 5, [3.0] * 5),
+                                  ([1, 2, 3, 4], [11, 12, 13, 14]))
+    low, high = bootstrap_mean_diff(groups, sides, values, 2, seed=0)
+    # nothing to resample in a constant group
+    assert (low[0], high[0]) == (2.0, 2.0)
+    assert 5 < low[1] < 10 < high[1] < 15
+    again = bootstrap_mean_diff(groups, sides, values, 2, seed=0, block=7)
+    assert np.allclose(again, (low, high), atol=0.5)
+
+
+def test_cliffs_delta_of_disjoint_samples():
+    frame = pd.DataFrame({
+        "load": [10] * 10 + [50] * 10,
+        "platform": (["docker"] * 5 + ["nanos"] * 5) * 2,
+        "rps": [1, 2, 3, 4, 5, 6, 7, 8, 9, 10,
+                16, 17, 18, 19, 20, 11, 12, 13, 14, 15]})
+    result = compare(frame, "load", "rps", seed=0).set_index("load")
+    assert result["cliffs_delta"].tolist() == [1.0, -1.0]
+    assert result["magnitude"].tolist() == ["large", "large"]
+    assert result["diff"].tolist() == [5.0, -5.0]
+    assert result["p_holm"].tolist() == pytest.approx([0.024372] * 2,
+                                                      abs=1e-6)
+    assert result["verdict"].tolist() == ["real", "real"]
+
+
+def test_magnitude_and_units():
+    assert magnitude(np.array([0.1, -0.2, 0.4, -0.9, np.nan])).tolist() == [
+        "negligible", "small", "medium", "large", "negligible"]
+    values = to_number(pd.Series(["229.00us", "1.5s", "12", "n/a"]))
+    assert values[:3].tolist() == pytest.approx([0.229, 1500.0, 12.0])
+    assert math.isnan(values[3])
@@ -0,0 +1,79 @@
+import math
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from nanos_eval.storage import (ColumnarWriter, export_csv,  # noqa: E402
+                                iter_frames, load_frame, load_records,
+                                open_writer, read_header)
+from nanos_eval.writer import BufferedCSVWriter  # noqa: E402
+
+COLUMNS = ["Time Stamp", "CPU", "Memory(KB)", "Threads"]
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "raw.col")
+    rows = [[1000.0, 0, 4096, 3],
+            # a column that starts out int keeps the fraction of later rows
+            [1000.1, 12.5, 8192, 3],
+            [1000.2, None, 1 << 40, float("nan")]]
+    with ColumnarWriter(path, COLUMNS, metadata={"vcpus": 2},
+                        batch_size=2) as writer:
+        for row in rows:
+            writer.write(row)
+    columns, dtypes, metadata, offset = read_header(path)
+    assert columns == COLUMNS and dtypes == ["f8"] * 4
+    assert metadata == {"vcpus": 2} and offset % 8 == 0
+
+    records, _ = load_records(path)
+    assert records["CPU"][:2].tolist() == [0.0, 12.5]
+    assert math.isnan(records["CPU"][2]) and math.isnan(records["Threads"][2])
+    assert records["Memory(KB)"].tolist() == [4096, 8192, 1 << 40]
+    frame = load_frame(path)
+    assert frame.attrs["metadata"] == {"vcpus": 2}
+    assert frame["Time Stamp"].tolist() == [1000.0, 1000.1, 1000.2]
+    assert [len(chunk) for chunk in iter_frames(path, 2)] == [2, 1]
+
+
+def test_declared_int_columns(tmp_path):
+    path = str(tmp_path / "raw.col")
+    with ColumnarWriter(path, ["Time Stamp", "TID"],
+                        dtypes=["f8", "i8"]) as writer:
+        writer.write([1.5, 2 ** 62])
+    records, _ = load_records(path)
+    assert records["TID"].dtype == np.int64
+    assert records["TID"][0] == 2 ** 62
+
+
+def test_torn_final_row_is_ignored(tmp_path):
+    path = str(tmp_path / "raw.col")
+    with ColumnarWriter(path, COLUMNS) as writer:
+        for n in range(3):
+            writer.write([1000.0 + n, n, n, n])
+    with open(path, "ab") as f:
+        f.write(b"\x01" * 20)  # part of a fourth row
+    records, _ = load_records(path)
+    assert records["Time Stamp"].tolist() == [1000.0, 1001.0, 1002.0]
+
+
+def test_empty_log(tmp_path):
+    path = str(tmp_path / "raw.col")
+    ColumnarWriter(path, COLUMNS).close()
+    records, metadata = load_records(path)
+    assert len(records) == 0 and records.dtype.names == tuple(COLUMNS)
+    assert list(load_frame(path).columns) == COLUMNS
+    assert list(iter_frames(path, 10)) == []
+
+
+def test_export_csv_and_open_writer(tmp_path):
+    path = str(tmp_path / "raw.col")
+    with open_writer(path, COLUMNS) as writer:
+        assert isinstance(writer, ColumnarWriter)
+        writer.write([1000.0, 1.5, 2, 3])
+    csv_path = export_csv(path, str(tmp_path / "raw.csv"))
+    with open(csv_path) as f:
+        assert f.read().splitlines() == [",".join(COLUMNS),
+                                         "1000.0,1.5,2.0,3.0"]
+    with open_writer(str(tmp_path / "raw.csv"), COLUMNS) as writer:
+        assert isinstance(writer, BufferedCSVWriter)
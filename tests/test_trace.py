@@ -0,0 +1,77 @@
+import csv
+import os
+
+import pytest
+
+from nanos_eval.trace import TraceParser, profile_console
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures",
+                       "nanos_console.log")
+
+
+def _read(path):
+    with open(path, newline="") as f:
+        return list(csv.DictReader(f))
+
+
+def test_profile_console(tmp_path):
+    rows = profile_console(FIXTURE, "nanos", str(tmp_path))
+    syscalls = {r["syscall"]: r for r in rows}
+    assert list(syscalls) == ["openat", "read", "epoll_wait", "futex",
+                              "getpid"]
+    assert (syscalls["openat"]["count"], syscalls["openat"]["errors"],
+            syscalls["openat"]["blocked"]) == (2, 1, 0)
+    assert syscalls["read"]["latency_max_ms"] == pytest.approx(0.2)
+    # blocked calls return through the rv of the thread's next run
+    assert (syscalls["epoll_wait"]["blocked"],
+            syscalls["epoll_wait"]["errors"]) == (1, 0)
+    assert syscalls["epoll_wait"]["total_ms"] == pytest.approx(199.9)
+    assert (syscalls["futex"]["blocked"], syscalls["futex"]["errors"]) == (1, 1)
+    assert _read(tmp_path / "nanos_syscalls.csv")[0]["syscall"] == "openat"
+
+    rates = _read(tmp_path / "nanos_trace_rates.csv")
+    total = {field: sum(float(r[field]) for r in rates) * 0.1
+             for field in rates[0] if field != "Time Stamp"}
+    assert total == pytest.approx({"Syscalls/s": 6, "Syscall Errors/s": 2,
+                                   "Page Faults/s": 1, "Thread Runs/s": 4})
+
+    timeline = _read(tmp_path / "nanos_thread_timeline.csv")
+    stretches = sorted((int(r["tid"]), r["name"], int(r["cpu"]),
+                        round(float(r["duration_ms"]), 1)) for r in timeline)
+    assert stretches == [(1, "main", 0, 60.1), (1, "main", 0, 530.0),
+                         (2, "worker", 1, 200.0), (2, "worker", 1, 370.1)]
+
+
+def test_application_output_is_not_trace(tmp_path):
+    parser = TraceParser(str(tmp_path / "rates.csv"),
+                         str(tmp_path / "timeline.csv"))
+    parser.feed("1700000000.5 42 apples")
+    parser.feed("1700000000.6 3 errors happened")
+    parser.feed("1700000000.7 2024 was a good year: really")
+    assert parser.trace_lines == 0
+    parser.feed("1700000000.8     3 [server] getpid")
+    parser.feed("1700000000.9 3 direct return: 7")
+    parser.close()
+    assert parser.trace_lines == 2
+    assert [r["syscall"] for r in parser.syscall_rows()] == ["getpid"]
+
+
+def test_rates_are_averaged_over_the_sample_interval(tmp_path):
+    pd = pytest.importorskip("pandas")
+    from nanos_eval.trace import add_trace_rates
+
+    usage_log = tmp_path / "usage.csv"
+    rates_file = tmp_path / "rates.csv"
+    pd.DataFrame({"Time Stamp": [100.0, 100.5, 101.0]}).to_csv(
+        usage_log, index=False)
+    # two busy 0.1 s buckets in the second half second, none in the third
+    pd.DataFrame({"Time Stamp": [100.1, 100.2], "Syscalls/s": [50.0, 30.0],
+                  "Syscall Errors/s": [0.0, 10.0],
+                  "Page Faults/s": [0.0, 0.0],
+                  "Thread Runs/s": [20.0, 0.0]}).to_csv(rates_file,
+                                                        index=False)
+    usage = add_trace_rates(str(usage_log), str(rates_file))
+    assert usage["Syscalls/s"].tolist() == pytest.approx([0.0, 16.0, 0.0])
+    assert usage["Syscall Errors/s"].tolist() == pytest.approx([0.0, 2.0, 0.0])
+    assert pd.read_csv(usage_log)["Thread Runs/s"].tolist() == pytest.approx(
+        [0.0, 4.0, 0.0])
@@ -0,0 +1,83 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+
+from nanos_eval.matrix import CELL_ENV  # noqa: E402
+from nanos_eval.phases import PHASE_IDLE  # noqa: E402
+from nanos_eval.warehouse import (check_regressions, connect,  # noqa: E402
+                                  ingest_run, runs, trend)
+
+
+def _run(metrics_dir, started, rps, p99, peak_mb, seed):
+    """Write a Go-style run of 8 repetitions at one connection level."""
+    rng = np.random.default_rng(seed)
+    (metrics_dir / "webserver").mkdir(parents=True)
+    pd.DataFrame({
+        "connection": [50] * 8,
+        "requests_per_sec": rps + rng.normal(0, rps * 0.01, 8),
+        "latency_avg": [f"{v:.2f}us" for v in rng.normal(900, 5, 8)],
+        "latency_p99_ms": p99 + rng.normal(0, 0.05, 8),
+        "errors": 0,
+    }).to_csv(metrics_dir / "webserver" / "webserver_metrics_nanos.csv",
+              index=False)
+    phases = list(range(8))
+    pd.DataFrame({
+        "phase": phases + [PHASE_IDLE],
+        "connection": [50] * 8 + [None],
+        "warm_up": [1] + [0] * 7 + [0],
+        "peak_memory_mb": list(peak_mb + rng.normal(0, 0.5, 8)) + [900.0],
+    }).to_csv(metrics_dir / "nanos_phases.csv", index=False)
+    elapsed = np.arange(100) * 0.1
+    pd.DataFrame({
+        "Time Elapsed": elapsed, "Time Stamp": started + elapsed,
+        "CPU%": 50.0, "Memory(KB)": peak_mb * 1024.0,
+        "Phase": np.repeat(phases, 13)[:100],
+    }).to_csv(metrics_dir / "nanos_usage_log.csv", index=False)
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    monkeypatch.delenv(CELL_ENV, raising=False)
+    return str(tmp_path / "results.db")
+
+
+def test_a_single_run_is_not_compared(tmp_path, db_path):
+    _run(tmp_path / "first", 1000.0, 20000, 3.0, 120.0, seed=1)
+    run_id = ingest_run("go", "nanos", str(tmp_path / "first"), db_path)
+    db = connect(db_path)
+    assert check_regressions(db, run_id) is None
+    db.close()
+
+
+def test_regression_is_flagged(tmp_path, db_path):
+    _run(tmp_path / "first", 1000.0, 20000, 3.0, 120.0, seed=1)
+    _run(tmp_path / "second", 2000.0, 20000, 3.0, 120.0, seed=2)
+    _run(tmp_path / "third", 3000.0, 15000, 3.0, 120.0, seed=3)
+    ids = [ingest_run("go", "nanos", str(tmp_path / name), db_path,
+                      label=name)
+           for name in ("first", "second", "third")]
+    db = connect(db_path)
+    assert runs(db, "go")["label"].tolist() == ["first", "second", "third"]
+    assert db.execute("SELECT COUNT(*) FROM samples").fetchone()[0] == 300
+
+    history = trend(db, "go", "rps")
+    assert history["id"].tolist() == ids
+    assert history["rps"].tolist() == pytest.approx([20000, 20000, 15000],
+                                                    rel=0.02)
+    assert trend(db, "go", "rss")["rss"].tolist() == [120.0 * 1024] * 3
+
+    # same distribution as the run before: nothing is flagged
+    steady = check_regressions(db, ids[1], seed=0)
+    assert not steady["regression"].any()
+    assert set(steady["metric"]) == {"rps", "latency_p99_ms", "rss"}
+
+    drop = check_regressions(db, ids[2], seed=0).set_index("metric")
+    assert drop.loc["rps", "regression"]
+    assert drop.loc["rps", "rel_diff"] == pytest.approx(-0.25, abs=0.02)
+    assert not drop.loc["latency_p99_ms", "regression"]
+    # RSS is compared per measured load step: 7 each, not 100 samples
+    assert (drop.loc["rss", "n_baseline"], drop.loc["rss", "n_candidate"]) == (
+        7, 7)
+    assert not drop.loc["rss", "regression"]
+    db.close()